@@ -1,9 +1,10 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import messagebox, ttk, filedialog
 import os
+import threading
 
 # Import database
-from database import InventoryDB, CounterDB
+from database import InventoryDB, CounterDB, QueryStats
 # Import style configuration and application sections
 from styles import apply_styles
 from dashboard import DashboardSection
@@ -20,6 +21,8 @@ EMOJI_FALLBACKS = {
     "cashier": "💰",
     "logout": "🚪"
 }
+DB_STATS_FILE = "db_stats.json"  # Written on exit, for comparing releases
+AUTO_ARCHIVE_MONTHS = False  # Archive closed months in the background at startup (admins can also run it)
 
 class InventoryApp:
     """Main application class for Inventory Management System"""
@@ -27,8 +30,15 @@ class InventoryApp:
     def __init__(self, root):
         """Initialize the application"""
         self.root = root
-        self.db = InventoryDB()
-        self.counter_db = CounterDB()
+        self.stats = QueryStats(slow_ms=100)
+        self.db = InventoryDB(use_cache=True, compact_rows=True, result_cache_ttl=30,
+                              fuzzy_search=True, stats=self.stats)
+        self.counter_db = CounterDB(compact_rows=True, stats=self.stats)
+        # Searches use full-text matching until the fuzzy index is built
+        self.db.start_search_index_build()
+        if AUTO_ARCHIVE_MONTHS:
+            # Move closed months' sales into their archive files off the Tk thread
+            threading.Thread(target=self.archive_closed_months, daemon=True).start()
         self.setup_main_window()
         self.create_assets_directory()
         self.current_user = None  
@@ -45,12 +55,25 @@ class InventoryApp:
         # Start with login UI
         self.create_login_ui()
 
+    def archive_closed_months(self):
+        """Background startup job: archive closed months, reporting only failures"""
+        try:
+            result = self.counter_db.archive_closed_months()
+            if not result['success']:
+                print(f"Error archiving closed months: {result['error']}")
+        except Exception as e:
+            print(f"Error archiving closed months: {e}")
+        finally:
+            self.counter_db.release_connection()
+
     def setup_main_window(self):
         """Configure the main application window"""
         self.root.title("Inventory Management System")
         self.root.geometry("1200x700")
         self.root.configure(bg='#f5f7fa')
         self.root.minsize(1000, 600)  # Set minimum window size
+        self.root.bind('<Control-D>', self.show_db_stats)  # Ctrl+Shift+D
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def create_assets_directory(self):
         """Create assets directory if it doesn't exist"""
@@ -171,14 +194,13 @@ class InventoryApp:
             return
         
         # Check for cashier login in database - now using cashier_name instead of cashier_id
-        cashiers = self.counter_db.get_counters(active_only=True)
-        for cashier in cashiers:
-            if cashier['cashier_name'].lower() == username.lower() and cashier['password'] == password:
-                self.current_user = cashier['cashier_name']  # Use name instead of ID
-                self.current_user_role = "cashier"
-                self.initialize_sections()
-                self.create_dashboard_ui(cashier['cashier_name'])
-                return
+        cashier = self.counter_db.authenticate(username, password)
+        if cashier:
+            self.current_user = cashier['cashier_name']  # Use name instead of ID
+            self.current_user_role = "cashier"
+            self.initialize_sections()
+            self.create_dashboard_ui(cashier['cashier_name'])
+            return
         
         # If no match found
         messagebox.showerror("Login Failed", "Incorrect username or password")
@@ -405,6 +427,67 @@ class InventoryApp:
         self.current_section = self.sections[section_name]
         self.current_section.show(self.main_content)
 
+    # ======================
+    # DATABASE STATS
+    # ======================
+    def show_db_stats(self, event=None):
+        """Show per-method database timings and the slow-query count"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Database Stats")
+        dialog.geometry("920x480")
+        dialog.transient(self.root)
+        dialog.configure(background='#ffffff')
+
+        btn_frame = ttk.Frame(dialog)
+        btn_frame.pack(side='bottom', fill='x', padx=10, pady=(0, 10))
+
+        text = tk.Text(dialog, font=('Courier', 10), wrap='none', background='#ffffff')
+        text.pack(fill='both', expand=True, padx=10, pady=10)
+
+        def refresh():
+            text.configure(state='normal')
+            text.delete('1.0', 'end')
+            text.insert('1.0', self.stats.report())
+            text.configure(state='disabled')
+
+        def reset():
+            self.stats.reset()
+            refresh()
+
+        # Recording SQL slows bulk writes down, so it is only on while asked for
+        capture_sql = tk.BooleanVar(value=self.stats.capture_sql)
+
+        def toggle_capture():
+            self.stats.set_capture_sql(capture_sql.get())
+            refresh()
+
+        ttk.Checkbutton(btn_frame, text="Capture SQL for slow queries", variable=capture_sql,
+                        command=toggle_capture).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Save JSON", command=lambda: self.save_db_stats(dialog)).pack(side='right', padx=5)
+        ttk.Button(btn_frame, text="Reset", command=reset).pack(side='right', padx=5)
+        ttk.Button(btn_frame, text="Refresh", command=refresh).pack(side='right', padx=5)
+        refresh()
+
+    def save_db_stats(self, parent):
+        """Save the full stats, including the slow-query log, as JSON"""
+        path = filedialog.asksaveasfilename(
+            parent=parent,
+            defaultextension=".json",
+            initialfile=DB_STATS_FILE,
+            filetypes=[("JSON files", "*.json")]
+        )
+        if path:
+            self.stats.dump(path)
+            messagebox.showinfo("Database Stats", f"Stats saved to {path}", parent=parent)
+
+    def on_close(self):
+        """Write this session's database stats, then quit"""
+        try:
+            self.stats.dump(DB_STATS_FILE)
+        except OSError as e:
+            print(f"Error saving database stats: {e}")
+        self.root.destroy()
+
     # ======================
     # UTILITY METHODS
     # ======================
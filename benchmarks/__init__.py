@@ -0,0 +1,16 @@
+"""Scale benchmarks for the database layer.
+
+    python -m benchmarks.generate --sales 100000 --out bench_store
+    python -m benchmarks.run --sales 10000 100000 1000000 --out results.json
+    python -m benchmarks.run --baseline results.json
+    python -m benchmarks.run --scenario product_quantities --workdir bench_store
+    python -m benchmarks.run --scenario compact_rows --workdir bench_store
+    python -m benchmarks.run --scenario checkout --workdir bench_store
+    python -m benchmarks.run --scenario group_commit --workdir bench_store
+
+generate fills inventory.db and Counter.db with a synthetic store; run
+times the hot InventoryDB / CounterDB paths against stores of each size
+and writes the timings as JSON, optionally compared with a stored baseline.
+With --scenario it instead runs one of the before/after comparisons
+registered in run.SCENARIOS, each on a scratch copy of the store.
+"""
@@ -0,0 +1,159 @@
+"""Synthetic store generator: products, counters and a year of sales."""
+import argparse
+import os
+import random
+import sys
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict, Iterator, List, Tuple
+
+from database import InventoryDB, CounterDB, SALES_COLUMNS, SALE_ITEM_COLUMNS
+
+CATEGORIES = ["Beverages", "Bakery", "Dairy", "Snacks", "Frozen", "Produce", "Meat", "Seafood",
+              "Household", "Personal Care", "Baby", "Pet", "Pharmacy", "Stationery", "Electronics",
+              "Spices", "Grains", "Canned", "Confectionery", "Cleaning"]
+COMPANIES = [f"{prefix} {suffix}" for prefix in ("Nova", "Prime", "Zen", "Apex", "Royal", "Green",
+                                                  "Blue", "Golden", "Pure", "Alpha")
+             for suffix in ("Foods", "Traders", "Industries", "Brands", "Co")]
+ADJECTIVES = ["Fresh", "Classic", "Premium", "Organic", "Spicy", "Sweet", "Crunchy", "Light",
+              "Family", "Mini", "Extra", "Natural", "Golden", "Smart", "Daily"]
+NOUNS = ["Juice", "Bread", "Milk", "Chips", "Biscuits", "Rice", "Tea", "Coffee", "Soap", "Shampoo",
+         "Cereal", "Yogurt", "Butter", "Noodles", "Sauce", "Oil", "Flour", "Sugar", "Candy", "Water"]
+
+# Basket sizes: most sales are one to three lines with a long tail (mean about 3.4)
+ITEMS_PER_SALE = {1: 28, 2: 20, 3: 15, 4: 11, 5: 8, 6: 6, 7: 4, 8: 3, 10: 2, 12: 1.5, 15: 1, 20: 0.5}
+QUANTITY_PER_LINE = {1: 70, 2: 18, 3: 7, 5: 3, 10: 2}
+PAYMENT_METHODS = {'cash': 60, 'card': 35, 'mobile': 5}
+# Relative traffic per hour of the day (shop open 08:00-22:00, evening peak)
+HOUR_WEIGHTS = [0] * 8 + [2, 4, 6, 7, 9, 8, 6, 6, 7, 9, 10, 9, 6, 3] + [0] * 2
+
+SALES_BATCH = 50000
+
+
+def weighted(rng: random.Random, table: Dict, k: int) -> List:
+    """k draws from a {value: weight} table"""
+    return rng.choices(list(table), weights=list(table.values()), k=k)
+
+
+def product_rows(count: int, seed: int = 0) -> Iterator[Dict]:
+    """Product dicts in the shape add_products_bulk expects"""
+    rng = random.Random(seed)
+    for i in range(count):
+        trade_price = round(rng.lognormvariate(5, 0.9), 2) + 1
+        yield {
+            'name': f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            'category': rng.choice(CATEGORIES),
+            'company': rng.choice(COMPANIES),
+            'code': f"SKU{i:07d}",
+            'trade_price': trade_price,
+            'mfg_price': round(trade_price * rng.uniform(0.6, 0.9), 2),
+            'quantity': rng.choice((0, 3, 8)) if rng.random() < 0.1 else rng.randint(20, 5000),
+            'low_stock_threshold': rng.choice((5, 10, 10, 10, 20)),
+        }
+
+
+def sale_times(count: int, days: int, rng: random.Random) -> List[str]:
+    """count sorted sale_time strings spread over the last `days` days in shop hours"""
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+    offsets = sorted(rng.randrange(days) * 86400 + hour * 3600 + rng.randrange(3600)
+                     for hour in hours)
+    return [(start + timedelta(seconds=offset)).strftime("%Y-%m-%d %H:%M:%S") for offset in offsets]
+
+
+def generate_sales(counter_db: CounterDB, prices: List[Tuple[int, str, float]], counters: List[Dict],
+                   count: int, days: int, seed: int = 0, zipf: float = 1.0) -> int:
+    """Bulk-insert `count` sales with items, then rebuild the daily summary.
+
+    Product popularity follows a Zipf distribution over a shuffled product
+    order, so a few hundred items account for most lines. Returns the
+    number of sale items written.
+    """
+    rng = random.Random(seed)
+    popularity = prices[:]
+    rng.shuffle(popularity)
+    cumulative = list(accumulate(1 / (rank + 1) ** zipf for rank in range(len(popularity))))
+    times = sale_times(count, days, rng)
+    next_id = (counter_db.conn.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0])
+    item_count = 0
+
+    for batch_start in range(0, count, SALES_BATCH):
+        batch = range(batch_start, min(batch_start + SALES_BATCH, count))
+        sizes = weighted(rng, ITEMS_PER_SALE, len(batch))
+        payments = weighted(rng, PAYMENT_METHODS, len(batch))
+        sales, items = [], []
+        for n, size, payment in zip(batch, sizes, payments):
+            sale_id = next_id + n + 1
+            counter = counters[n % len(counters)]
+            picks = [popularity[bisect_left(cumulative, rng.random() * cumulative[-1])]
+                     for _ in range(size)]
+            quantities = weighted(rng, QUANTITY_PER_LINE, size)
+            total = 0.0
+            for (product_id, name, price), quantity in zip(picks, quantities):
+                items.append((sale_id, product_id, name, quantity, price, price * quantity))
+                total += price * quantity
+            customer = f"Customer {rng.randrange(5000)}" if rng.random() < 0.3 else ''
+            sales.append((sale_id, f"BENCH-{sale_id:08d}", counter['id'], counter['cashier_id'],
+                          counter['cashier_name'], customer, round(total, 2), payment, times[n]))
+        counter_db.conn.executemany(
+            f"INSERT INTO sales ({SALES_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", sales)
+        counter_db.conn.executemany(
+            f"INSERT INTO sale_items ({SALE_ITEM_COLUMNS}) VALUES (NULL, ?, ?, ?, ?, ?, ?)", items)
+        counter_db.conn.commit()
+        item_count += len(items)
+
+    counter_db.rebuild_daily_summary()
+    return item_count
+
+
+def generate_store(directory: str, products: int = 20000, counters: int = 8, sales: int = 100000,
+                   days: int = 365, seed: int = 0) -> Dict:
+    """Create inventory.db and Counter.db in directory (which must not hold a store yet)"""
+    if counters < 1:
+        raise ValueError("a store needs at least one counter")
+    os.makedirs(directory, exist_ok=True)
+    inventory_path = os.path.join(directory, 'inventory.db')
+    counter_path = os.path.join(directory, 'Counter.db')
+    if os.path.exists(inventory_path) or os.path.exists(counter_path):
+        raise FileExistsError(f"{directory} already contains a store")
+
+    db = InventoryDB(inventory_path)
+    result = db.add_products_bulk(product_rows(products, seed))
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    prices = db.conn.execute("SELECT id, name, trade_price FROM products ORDER BY id").fetchall()
+
+    counter_db = CounterDB(counter_path)
+    for i in range(counters):
+        counter_db.add_counter(f"cashier{i + 1:02d}", 1000 + i, f"TILL-{i + 1:02d}", "bench")
+    counter_list = counter_db.get_counters(active_only=False)
+    items = generate_sales(counter_db, prices, counter_list, sales, days, seed)
+
+    db.close()
+    counter_db.close()
+    return {'inventory': inventory_path, 'counter': counter_path, 'products': result['imported'],
+            'counters': counters, 'sales': sales, 'sale_items': items}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill inventory.db and Counter.db with a synthetic store")
+    parser.add_argument('--out', default='bench_store', help="directory for the two databases")
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--counters', type=int, default=8)
+    parser.add_argument('--sales', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help="spread sales over this many days")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    try:
+        store = generate_store(args.out, args.products, args.counters, args.sales, args.days, args.seed)
+    except (FileExistsError, RuntimeError, ValueError) as e:
+        print(f"Error generating store: {e}")
+        return 1
+    print(f"Wrote {store['products']} products, {store['counters']} counters, {store['sales']} sales "
+          f"and {store['sale_items']} sale items to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
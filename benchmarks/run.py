@@ -0,0 +1,547 @@
+"""Time the hot database paths against synthetic stores of several sizes."""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from database import InventoryDB, CounterDB
+from benchmarks.generate import generate_store
+
+DEFAULT_SCALES = (10000, 100000, 1000000)
+DB_FILES = ('inventory.db', 'Counter.db')
+WRITE_RUNS = 200
+
+SYNCHRONOUS_LEVELS = ('NORMAL', 'FULL')
+
+# Before/after comparisons run with --scenario, filled in by @scenario below
+SCENARIOS: Dict[str, Dict] = {}
+
+
+def measure(fn: Callable, runs: int, warmup: int = 1) -> Dict:
+    """Call fn repeatedly and summarise its latency in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        'runs': runs,
+        'median_ms': round(times[len(times) // 2], 4),
+        'p95_ms': round(times[int(0.95 * (len(times) - 1))], 4),
+        'min_ms': round(times[0], 4),
+        'mean_ms': round(sum(times) / len(times), 4),
+    }
+
+
+def read_cases(db: InventoryDB, counter_db: CounterDB, fuzzy_db: InventoryDB) -> Dict[str, Callable]:
+    """Read paths, named by the screen or graph that triggers them"""
+    today = datetime.now()
+    day = lambda days_ago: (today - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+    counters = counter_db.get_counters()
+    counter = counters[min(2, len(counters) - 1)]
+    max_sale = counter_db.conn.execute("SELECT MAX(id) FROM sales").fetchone()[0]
+    rng = random.Random(1)
+
+    def counter_performance():
+        counter_db.get_counters(active_only=True)
+        counter_db.get_counter_sales_summary(day(30), day(0))
+
+    def inventory_status():
+        for status in InventoryDB.PRODUCT_STATUSES:
+            db.get_products({'status': status})
+
+    return {
+        'products.all': lambda: db.get_products(),
+        'products.first_page': lambda: db.get_products(limit=200),
+        'products.category': lambda: db.get_products({'category': 'Dairy'}),
+        'products.company': lambda: db.get_products({'company': 'Nova Foods'}),
+        'products.status': lambda: db.get_products({'status': 'Low Stock'}),
+        'products.price_range': lambda: db.get_products(
+            {'range_type': "Price Range", 'min_price': 100, 'max_price': 200}),
+        'products.quantity_range': lambda: db.get_products(
+            {'range_type': "Quantity Range", 'min_qty': 0, 'max_qty': 50}),
+        'products.search': lambda: db.get_products({'search_query': 'Organic Tea'}),
+        'products.search_page': lambda: db.get_products({'search_query': 'Organic Tea'}, limit=50),
+        'products.fuzzy_search': lambda: fuzzy_db.get_products({'search_query': 'orgnic tea'}),
+        'products.fuzzy_search_page': lambda: fuzzy_db.get_products({'search_query': 'orgnic tea'}, limit=50),
+        'products.get_product': lambda: db.get_product(rng.randint(1, 1000)),
+        'sales.history_page': lambda: counter_db.get_sales_history(limit=200),
+        'sales.history_week': lambda: counter_db.get_sales_history({'start_date': day(7), 'end_date': day(0)}),
+        'sales.history_cashier_page': lambda: counter_db.get_sales_history(
+            {'cashier_name': counter['cashier_name']}, limit=200),
+        'sales.by_cashier_page': lambda: counter_db.get_sales_by_cashier(counter['cashier_name'], limit=200),
+        'sales.details': lambda: counter_db.get_sale_details(rng.randint(1, max_sale)),
+        'dashboard.sales_trend': lambda: counter_db.get_daily_sales_summary(day(30), day(0)),
+        'dashboard.counter_performance': counter_performance,
+        'dashboard.inventory_status': inventory_status,
+        'dashboard.daily_comparison': lambda: counter_db.get_daily_sales_summary(day(61), day(0)),
+        'dashboard.cashier_performance': lambda: counter_db.get_daily_sales_summary(
+            day(30), day(0), counter_id=counter['id']),
+        'dashboard.hourly_sales': lambda: counter_db.get_sales_totals(
+            day(30), day(0), group_by='hour', cashier_name=counter['cashier_name']),
+        'dashboard.product_popularity': lambda: counter_db.get_product_quantities(
+            day(30), day(0), cashier_name=counter['cashier_name'], limit=10),
+    }
+
+
+def write_cases(db: InventoryDB, counter_db: CounterDB) -> Dict[str, Callable]:
+    """Write paths; each call writes a new sale or moves stock by one unit"""
+    counter = counter_db.get_counters()[0]
+    products = db.get_products(limit=50)
+    sequence = iter(range(10 ** 9))
+
+    def sale_data():
+        n = next(sequence)
+        lines = [products[(n + i) % len(products)] for i in range(3)]
+        items = [{'product_id': p['id'], 'product_name': p['name'], 'quantity': 1,
+                  'unit_price': p['trade_price'], 'total_price': p['trade_price']} for p in lines]
+        return {'receipt_id': f"RUN-{time.time_ns()}-{n}", 'counter_id': counter['id'],
+                'cashier_id': counter['cashier_id'], 'cashier_name': counter['cashier_name'],
+                'total_amount': sum(item['total_price'] for item in items), 'items': items}
+
+    def update_quantity():
+        n = next(sequence)
+        db.update_product_quantity(products[n % len(products)]['id'], 1 if n % 2 else -1)
+
+    return {
+        'writes.record_sale': lambda: counter_db.record_sale(sale_data()),
+        'writes.update_product_quantity': update_quantity,
+        'writes.checkout': lambda: db.checkout(sale_data(), counter_db),
+    }
+
+
+def load_store(directory: str, sales: int, products: int, counters: int) -> Dict:
+    """Generate a store, or reuse the one already in directory (described by store.json)"""
+    info_path = os.path.join(directory, 'store.json')
+    if os.path.exists(info_path):
+        with open(info_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    started = time.perf_counter()
+    store = generate_store(directory, products, counters, sales)
+    info = {
+        'generated_at': datetime.now().strftime("%Y-%m-%d"),
+        'generate_s': round(time.perf_counter() - started, 2),
+        'products': store['products'],
+        'counters': store['counters'],
+        'sales': store['sales'],
+        'sale_items': store['sale_items'],
+        'file_mb': {name: round(os.path.getsize(os.path.join(directory, name)) / 2 ** 20, 1)
+                    for name in DB_FILES},
+    }
+    with open(info_path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def store_directory(workdir: str, sales: int, products: int) -> str:
+    """Where the store of one size lives under workdir"""
+    return os.path.join(workdir, f"store_{sales}_{products}")
+
+
+def scratch_store(directory: str) -> str:
+    """Copy a generated store into a new sibling directory that writes can freely change"""
+    scratch = tempfile.mkdtemp(prefix='run_', dir=os.path.dirname(os.path.abspath(directory)))
+    for name in DB_FILES:
+        shutil.copy(os.path.join(directory, name), scratch)
+    return scratch
+
+
+def run_scale(directory: str, sales: int, products: int, counters: int, runs: int) -> Dict:
+    """Time every case against a scratch copy of one store.
+
+    The write cases add sales and move stock, so they never touch the
+    generated store itself and a reused store gives comparable runs.
+    """
+    store = load_store(directory, sales, products, counters)
+    scratch = scratch_store(directory)
+
+    db = InventoryDB(os.path.join(scratch, 'inventory.db'), use_cache=True, compact_rows=True)
+    fuzzy_db = InventoryDB(os.path.join(scratch, 'inventory.db'), use_cache=True, compact_rows=True,
+                           fuzzy_search=True)
+    fuzzy_db.build_search_index()
+    counter_db = CounterDB(os.path.join(scratch, 'Counter.db'), compact_rows=True)
+    cases = {}
+    try:
+        for name, fn in read_cases(db, counter_db, fuzzy_db).items():
+            cases[name] = measure(fn, runs)
+            print(f"  {name:<34}{cases[name]['median_ms']:>10.3f} ms")
+        for name, fn in write_cases(db, counter_db).items():
+            cases[name] = measure(fn, WRITE_RUNS)
+            print(f"  {name:<34}{cases[name]['median_ms']:>10.3f} ms")
+    finally:
+        db.close()
+        fuzzy_db.close()
+        counter_db.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {'store': store, 'cases': cases}
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Median-latency ratios against a baseline run; flags anything slower than 1 + tolerance"""
+    rows = []
+    for scale, current in results['scales'].items():
+        base_cases = baseline.get('scales', {}).get(scale, {}).get('cases', {})
+        for name, timing in current['cases'].items():
+            base = base_cases.get(name)
+            if not base or not base['median_ms']:
+                continue
+            ratio = timing['median_ms'] / base['median_ms']
+            rows.append({'scale': scale, 'case': name, 'baseline_ms': base['median_ms'],
+                         'median_ms': timing['median_ms'], 'ratio': round(ratio, 3),
+                         'regression': ratio > 1 + tolerance})
+    return rows
+
+
+def scenario(name: str, **defaults):
+    """Register fn(scratch, args) as --scenario name; defaults replace the run-wide option defaults"""
+    def register(fn: Callable) -> Callable:
+        SCENARIOS[name] = {'run': fn, 'defaults': defaults}
+        return fn
+    return register
+
+
+def run_scenario(args: argparse.Namespace) -> int:
+    """Run one scenario against a scratch copy of the store at each size; non-zero on failure"""
+    run = SCENARIOS[args.scenario]['run']
+    workdir = args.workdir or tempfile.mkdtemp(prefix='inventory_bench_')
+    try:
+        for sales in args.sales:
+            print(f"{sales} sales")
+            directory = store_directory(workdir, sales, args.products)
+            load_store(directory, sales, args.products, args.counters)
+            scratch = scratch_store(directory)
+            try:
+                status = run(scratch, args)
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+            if status:
+                return status
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+def per_sale_quantities(counter_db: CounterDB, start: str, end: str, cashier_name: str) -> Dict[str, int]:
+    """The old dashboard path: one get_sale_details call per sale"""
+    sales = counter_db.get_sales_history({'start_date': start, 'end_date': end, 'cashier_name': cashier_name})
+    product_counts = {}
+    for sale in sales:
+        details = counter_db.get_sale_details(sale['id'])
+        if details:
+            for item in details['items']:
+                product_counts[item['product_name']] = product_counts.get(item['product_name'], 0) + item['quantity']
+    return product_counts
+
+
+def bulk_quantities(counter_db: CounterDB, start: str, end: str, cashier_name: str) -> Dict[str, int]:
+    """The current path: one aggregate query"""
+    rows = counter_db.get_product_quantities(start, end, cashier_name=cashier_name)
+    return {row['product_name']: row['quantity'] for row in rows}
+
+
+def count_statements(counter_db: CounterDB, fn: Callable) -> int:
+    """Statements fn runs on counter_db's connection, counted with a trace callback"""
+    statements = []
+    counter_db.conn.set_trace_callback(statements.append)
+    try:
+        fn()
+    finally:
+        counter_db.conn.set_trace_callback(None)
+    return len(statements)
+
+
+@scenario('product_quantities', sales=[100000], runs=5)
+def product_quantities(scratch: str, args: argparse.Namespace) -> int:
+    """Product popularity for one cashier: per-sale detail fetches vs get_product_quantities.
+
+    The dashboard used to read a cashier's sales for the date range and call
+    get_sale_details on each one; it now asks get_product_quantities for the
+    totals. This counts the SQL statements each way runs and times both.
+    """
+    counter_db = CounterDB(os.path.join(scratch, 'Counter.db'))
+    try:
+        cashier_name = counter_db.get_counters()[0]['cashier_name']
+        today = datetime.now()
+        print(f"{'range':<8}{'sales':>8}{'per-sale stmts':>16}{'per-sale ms':>13}{'bulk stmts':>12}{'bulk ms':>10}")
+        for days in args.days:
+            start = (today - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+            end = today.strftime("%Y-%m-%d")
+            old = lambda: per_sale_quantities(counter_db, start, end, cashier_name)
+            new = lambda: bulk_quantities(counter_db, start, end, cashier_name)
+            if old() != new():
+                print(f"Results differ for the last {days} days")
+                return 1
+            sales = len(counter_db.get_sales_history({'start_date': start, 'end_date': end,
+                                                      'cashier_name': cashier_name}))
+            old_ms = measure(old, args.runs)['median_ms']
+            new_ms = measure(new, args.runs)['median_ms']
+            print(f"{days:>4} d  {sales:>8}{count_statements(counter_db, old):>16}{old_ms:>13.2f}"
+                  f"{count_statements(counter_db, new):>12}{new_ms:>10.2f}")
+    finally:
+        counter_db.close()
+    return 0
+
+
+def held_mb(fn: Callable) -> float:
+    """MB still allocated while fn's result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        held = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return held / 2 ** 20
+
+
+@scenario('compact_rows', sales=[100000], products=100000, runs=5)
+def compact_rows(scratch: str, args: argparse.Namespace) -> int:
+    """Dict rows vs compact slotted rows: time and memory of the large list reads.
+
+    Memory is what tracemalloc reports as still held once the result list
+    has been built.
+    """
+    print(f"{'case':<34}{'mode':<9}{'rows':>9}{'median ms':>11}{'MB':>8}")
+    for compact in (False, True):
+        db = InventoryDB(os.path.join(scratch, 'inventory.db'), compact_rows=compact)
+        counter_db = CounterDB(os.path.join(scratch, 'Counter.db'), compact_rows=compact)
+        try:
+            cases = {
+                'get_products()': db.get_products,
+                "get_products(category='Dairy')": lambda: db.get_products({'category': 'Dairy'}),
+                'get_all_sales()': counter_db.get_all_sales,
+            }
+            for name, fn in cases.items():
+                rows = len(fn())
+                timing = measure(fn, args.runs)
+                print(f"{name:<34}{'compact' if compact else 'dict':<9}{rows:>9}"
+                      f"{timing['median_ms']:>11.1f}{held_mb(fn):>8.1f}")
+        finally:
+            db.close()
+            counter_db.close()
+    return 0
+
+
+def set_synchronous(db: InventoryDB, counter_db: CounterDB, level: str):
+    """Apply one synchronous level to both files, including Counter.db attached for checkout"""
+    schema = db.attach_counter_db(counter_db)
+    for conn, target in ((db.conn, 'main'), (db.conn, schema), (counter_db.conn, 'main')):
+        conn.execute(f"PRAGMA {target}.synchronous = {level}")
+
+
+def median_ms(times: List[float]) -> float:
+    times = sorted(times)
+    return times[len(times) // 2] * 1000
+
+
+@scenario('checkout', sales=[10000], runs=300)
+def checkout(scratch: str, args: argparse.Namespace) -> int:
+    """Per-sale latency: record_sale plus one committed stock update per line, vs checkout().
+
+    complete_sale used to record the sale in Counter.db and then commit one
+    update_product_quantity per cart line to inventory.db; checkout() writes
+    both in one transaction. The two paths are run interleaved, at each cart
+    size and synchronous level.
+    """
+    db = InventoryDB(os.path.join(scratch, 'inventory.db'), use_cache=True, compact_rows=True)
+    counter_db = CounterDB(os.path.join(scratch, 'Counter.db'), compact_rows=True)
+    try:
+        counter = counter_db.get_counters()[0]
+        products = db.get_products(limit=max(args.lines))
+        # Enough stock that no run is refused for overselling
+        for product in products:
+            db.restock_product(product['id'], 10 ** 7)
+        receipts = itertools.count()
+
+        def sale_data(lines: int) -> Dict:
+            items = [{'product_id': p['id'], 'product_name': p['name'], 'quantity': 1,
+                      'unit_price': p['trade_price'], 'total_price': p['trade_price']} for p in products[:lines]]
+            return {'receipt_id': f"CHK-{time.time_ns()}-{next(receipts)}", 'counter_id': counter['id'],
+                    'cashier_id': counter['cashier_id'], 'cashier_name': counter['cashier_name'],
+                    'total_amount': sum(item['total_price'] for item in items), 'items': items}
+
+        def per_line_commits(sale: Dict) -> bool:
+            if not counter_db.record_sale(sale)['success']:
+                return False
+            return all(db.update_product_quantity(item['product_id'], -item['quantity'])
+                       for item in sale['items'])
+
+        def single_commit(sale: Dict) -> bool:
+            return db.checkout(sale, counter_db)['success']
+
+        paths: Dict[str, Callable] = {'per-line commits': per_line_commits, 'checkout': single_commit}
+        print(f"{'synchronous':<13}{'lines':>6}{'per-line ms':>13}{'checkout ms':>13}{'speedup':>9}")
+        for level in SYNCHRONOUS_LEVELS:
+            set_synchronous(db, counter_db, level)
+            for lines in args.lines:
+                times = {name: [] for name in paths}
+                for _ in range(args.runs):
+                    # Interleaved, so drift in disk or cache state hits both paths alike
+                    for name, path in paths.items():
+                        sale = sale_data(lines)
+                        start = time.perf_counter()
+                        if not path(sale):
+                            print(f"{name} failed at {lines} lines")
+                            return 1
+                        times[name].append(time.perf_counter() - start)
+                old, new = median_ms(times['per-line commits']), median_ms(times['checkout'])
+                print(f"{level:<13}{lines:>6}{old:>13.3f}{new:>13.3f}{old / new:>8.1f}x")
+    finally:
+        db.close()
+        counter_db.close()
+    return 0
+
+
+def run_tills(tills: int, sales_per_till: int, record: Callable[[Dict], Dict],
+              sale_data: Callable[[], Dict], setup: Callable = None) -> float:
+    """Sales per second with `tills` threads each recording sales_per_till sales"""
+    failures = []
+
+    def till():
+        if setup:
+            setup()
+        for _ in range(sales_per_till):
+            if not record(sale_data())['success']:
+                failures.append(1)
+
+    threads = [threading.Thread(target=till) for _ in range(tills)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if failures:
+        raise RuntimeError(f"{len(failures)} sales failed")
+    return tills * sales_per_till / elapsed
+
+
+@scenario('group_commit', sales=[10000])
+def group_commit(scratch: str, args: argparse.Namespace) -> int:
+    """Sale throughput: one commit per sale vs the group-commit SaleWriter.
+
+    Each till is a thread that records a sale and waits for it before ringing
+    up the next, as a real till would. Per-sale commits run at synchronous
+    NORMAL (the app's default) and FULL; the writer always commits at FULL,
+    so FULL vs group is the like-for-like durability comparison.
+    """
+    counter_db = CounterDB(os.path.join(scratch, 'Counter.db'))
+    try:
+        counter = counter_db.get_counters()[0]
+        receipts = itertools.count()
+
+        def sale_data() -> Dict:
+            items = [{'product_id': i + 1, 'product_name': f"Product {i + 1}", 'quantity': 1,
+                      'unit_price': 2.0, 'total_price': 2.0} for i in range(args.items)]
+            return {'receipt_id': f"GRP-{time.time_ns()}-{next(receipts)}", 'counter_id': counter['id'],
+                    'cashier_id': counter['cashier_id'], 'cashier_name': counter['cashier_name'],
+                    'total_amount': 2.0 * args.items, 'items': items}
+
+        def synchronous(level: str) -> Callable:
+            return lambda: counter_db.conn.execute(f"PRAGMA synchronous = {level}")
+
+        writer = counter_db.enable_group_commit()
+        print(f"{'tills':>5}{'per-sale NORMAL':>17}{'per-sale FULL':>15}{'group FULL':>12}{'avg batch':>11}  (sales/s)")
+        for tills in args.tills:
+            normal = run_tills(tills, args.sales_per_till, counter_db.record_sale, sale_data, synchronous('NORMAL'))
+            full = run_tills(tills, args.sales_per_till, counter_db.record_sale, sale_data, synchronous('FULL'))
+            batches, written = writer.batches, writer.sales
+            group = run_tills(tills, args.sales_per_till,
+                              lambda sale: counter_db.record_sale_async(sale).result(), sale_data)
+            batch = (writer.sales - written) / max(writer.batches - batches, 1)
+            print(f"{tills:>5}{normal:>17.0f}{full:>15.0f}{group:>12.0f}{batch:>11.1f}")
+    finally:
+        counter_db.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the database layer at several store sizes")
+    parser.add_argument('--sales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                        help="store sizes to run, in sales")
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--counters', type=int, default=8)
+    parser.add_argument('--runs', type=int, default=20, help="timed calls per read case, or per case in a scenario")
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS),
+                        help="run one before/after comparison instead of the timing cases")
+    parser.add_argument('--workdir', help="keep generated stores here and reuse them on later runs")
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown before a case counts as a regression (0.2 = 20%%)")
+    scenarios = parser.add_argument_group("scenario options")
+    scenarios.add_argument('--days', type=int, nargs='+', default=[1, 7, 30],
+                           help="product_quantities: date ranges to compare")
+    scenarios.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50],
+                           help="checkout: cart sizes to compare")
+    scenarios.add_argument('--tills', type=int, nargs='+', default=[1, 8],
+                           help="group_commit: concurrent tills to compare")
+    scenarios.add_argument('--sales-per-till', type=int, default=300, help="group_commit: sales each till records")
+    scenarios.add_argument('--items', type=int, default=5, help="group_commit: lines per sale")
+    chosen = parser.parse_known_args(argv)[0].scenario
+    if chosen:
+        parser.set_defaults(**SCENARIOS[chosen]['defaults'])
+    args = parser.parse_args(argv)
+    if args.scenario:
+        return run_scenario(args)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='inventory_bench_')
+    results = {
+        'meta': {
+            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'products': args.products,
+            'counters': args.counters,
+            'runs': args.runs,
+        },
+        'scales': {},
+    }
+    try:
+        for sales in args.sales:
+            print(f"{sales} sales")
+            directory = store_directory(workdir, sales, args.products)
+            results['scales'][str(sales)] = run_scale(directory, sales, args.products,
+                                                      args.counters, args.runs)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            rows = compare(results, json.load(f), args.tolerance)
+        for row in rows:
+            flag = "  REGRESSION" if row['regression'] else ""
+            print(f"{row['scale']:>8} {row['case']:<34}{row['baseline_ms']:>10.3f}"
+                  f"{row['median_ms']:>10.3f}{row['ratio']:>8.2f}x{flag}")
+        if any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,9 @@
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from cashier_employee import CashierEmployee
+from paging import TreePager
 
 class CashierAdmin:
     """Admin interface for managing cashiers and counters"""
@@ -125,6 +127,11 @@ class CashierAdmin:
                 style="Cashier.Button.TButton",
                 command=self.delete_counter).pack(side='left', padx=5)
         
+        ttk.Button(button_frame, 
+                text="📦 Archive Old Sales", 
+                style="Cashier.Button.TButton",
+                command=self.archive_old_sales).pack(side='left', padx=5)
+        
         # Removed the View Reports button completely
 
     def load_counters(self):
@@ -215,7 +222,7 @@ class CashierAdmin:
             except ValueError:
                 raise ValueError("Cashier ID must be a number")
             
-            # Add to database with plain text password
+            # Add to database; CounterDB stores only the password hash
             counter_id = self.counter_db.add_counter(
                 cashier_name=cashier_name,
                 cashier_id=cashier_id,
@@ -339,7 +346,7 @@ class CashierAdmin:
                 style="Cashier.Dialog.Info.TLabel").pack(anchor='w', pady=5)
         
         ttk.Label(info_frame, 
-                text=f"Password: {counter['password']}", 
+                text="Password: ********", 
                 style="Cashier.Dialog.Info.TLabel").pack(anchor='w', pady=5)
         
         ttk.Label(info_frame, 
@@ -405,7 +412,7 @@ class CashierAdmin:
             messagebox.showerror("Error", "Password cannot be empty")
             return
             
-        # Update in database with plain text password
+        # Update in database; CounterDB stores only the password hash
         success = self.counter_db.update_counter(counter_id, {"password": new_password})
         
         if success:
@@ -429,7 +436,7 @@ class CashierAdmin:
             ("Cashier Name", "entry", counter['cashier_name']),
             ("Cashier ID", "entry", counter['cashier_id']),
             ("Device ID", "entry", counter.get('device_id', '')),
-            ("Status", "combobox", ["active", "inactive", "maintenance"], counter['status'])
+            ("Status", "combobox", ["active", "inactive", "maintenance", "archived"], counter['status'])
         ]
         
         self.add_form_fields(container, fields)
@@ -516,7 +523,12 @@ class CashierAdmin:
         
         # Add vertical scrollbar only (removed horizontal scrollbar)
         vsb = ttk.Scrollbar(transactions_frame, orient="vertical", command=self.transactions_table.yview)
-        self.transactions_table.configure(yscrollcommand=vsb.set)
+        self.transactions_pager = TreePager(
+            self.transactions_table, vsb,
+            fetch_page=None,
+            key=self.counter_db.sale_page_key,
+            insert_row=self.insert_transaction_row
+        )
         
         # Grid layout (removed hsb grid)
         self.transactions_table.grid(row=0, column=0, sticky='nsew')
@@ -575,24 +587,21 @@ class CashierAdmin:
             messagebox.showerror("Error", f"Failed to load receipt: {str(e)}")
 
     def load_transactions(self, counter_id):
-        """Load transactions for a specific counter"""
-        # Clear existing data
-        for item in self.transactions_table.get_children():
-            self.transactions_table.delete(item)
-        
-        # Get transactions from database
-        transactions = self.counter_db.get_transactions_for_counter(counter_id)
-        
-        # Add to table
-        for trans in transactions:
-            self.transactions_table.insert("", 'end', values=(
-                trans['id'],
-                trans['receipt_id'],
-                trans.get('customer_name', 'N/A'),
-                f"PKR {trans['total_amount']:,.2f}",
-                trans.get('payment_method', 'cash').title(),
-                trans['sale_time']
-            ))
+        """Load transactions for a specific counter, one page at a time as the table scrolls"""
+        self.transactions_pager.reset(
+            lambda **page: self.counter_db.get_transactions_for_counter(counter_id, **page)
+        )
+
+    def insert_transaction_row(self, trans):
+        """Add one transaction to the transactions table"""
+        self.transactions_table.insert("", 'end', values=(
+            trans['id'],
+            trans['receipt_id'],
+            trans.get('customer_name', 'N/A'),
+            f"PKR {trans['total_amount']:,.2f}",
+            trans.get('payment_method', 'cash').title(),
+            trans['sale_time']
+        ))
 
     def delete_counter(self):
         """Delete the selected counter"""
@@ -605,41 +614,139 @@ class CashierAdmin:
         counter_id = item['values'][0]
         cashier_name = item['values'][1]
         
-        # Confirm deletion
-        if not messagebox.askyesno(
-            "Confirm Delete",
-            f"Are you sure you want to delete counter for {cashier_name}?\n"
-            "This will also delete all associated transactions!"
+        # Confirm deletion and choose whether the sales survive it
+        mode = self.choose_delete_mode(cashier_name)
+        if mode is None:
+            return
+        if mode == 'delete' and not messagebox.askyesno(
+            "Delete Permanently",
+            f"This permanently deletes the counter for {cashier_name} and every "
+            "transaction it recorded, including archived months.\n\n"
+            "This cannot be undone. Continue?",
+            icon='warning'
         ):
             return
         
-        try:
-            # First delete associated sales and items
-            cursor = self.counter_db.conn.cursor()
-            
-            # Get all sale IDs for this counter
-            cursor.execute("SELECT id FROM sales WHERE counter_id = ?", (counter_id,))
-            sale_ids = [row[0] for row in cursor.fetchall()]
-            
-            # Delete sale items
-            for sale_id in sale_ids:
-                cursor.execute("DELETE FROM sale_items WHERE sale_id = ?", (sale_id,))
-            
-            # Delete sales
-            cursor.execute("DELETE FROM sales WHERE counter_id = ?", (counter_id,))
-            
-            # Finally delete the counter
-            cursor.execute("DELETE FROM counters WHERE id = ?", (counter_id,))
-            
-            self.counter_db.conn.commit()
-            
+        result = {}
+        
+        def worker():
+            try:
+                result.update(self.counter_db.delete_counter(counter_id, mode=mode))
+            except Exception as e:
+                result.update({'success': False, 'error': str(e)})
+            finally:
+                self.counter_db.release_connection()
+        
+        # Deleting a busy counter's sales rewrites a lot of index pages; keep the UI responsive
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.frame.after(100, lambda: self.finish_delete_counter(thread, mode, result))
+
+    def choose_delete_mode(self, cashier_name):
+        """Ask whether to archive or permanently delete a counter.
+
+        Returns 'archive', 'delete', or None when the dialog is cancelled
+        or closed.
+        """
+        dialog, container = self.create_dialog("Delete Counter", 420, 230)
+        choice = {'mode': None}
+        
+        def choose(mode):
+            choice['mode'] = mode
+            dialog.destroy()
+        
+        ttk.Label(container, 
+                 text=f"Remove counter for {cashier_name}", 
+                 style="Cashier.Dialog.Title.TLabel").pack(pady=(0, 10))
+        
+        ttk.Label(container, 
+                 text="Archive: take the counter off login and keep its transactions for reports.\n\n"
+                      "Delete permanently: remove the counter and all of its transactions.", 
+                 style="Cashier.Dialog.Info.TLabel",
+                 wraplength=380,
+                 justify='left').pack(anchor='w')
+        
+        btn_frame = ttk.Frame(container, style="Cashier.Dialog.ButtonFrame.TFrame")
+        btn_frame.pack(side='bottom', pady=(15, 0))
+        
+        ttk.Button(btn_frame, 
+                  text="Cancel", 
+                  style="Cashier.Dialog.Neutral.TButton",
+                  command=dialog.destroy).pack(side='left', padx=5)
+        
+        ttk.Button(btn_frame, 
+                  text="Delete permanently", 
+                  style="Cashier.Dialog.Danger.TButton",
+                  command=lambda: choose('delete')).pack(side='left', padx=5)
+        
+        archive_button = ttk.Button(btn_frame, 
+                  text="Archive", 
+                  style="Cashier.Dialog.Button.TButton",
+                  command=lambda: choose('archive'))
+        archive_button.pack(side='left', padx=5)
+        # The safe choice is the default
+        archive_button.focus_set()
+        dialog.bind('<Return>', lambda e: choose('archive'))
+        dialog.bind('<Escape>', lambda e: dialog.destroy())
+        
+        dialog.wait_window()
+        return choice['mode']
+
+    def finish_delete_counter(self, thread, mode, result):
+        """Wait for a counter delete to finish, then report and reload the table"""
+        if thread.is_alive():
+            self.frame.after(100, lambda: self.finish_delete_counter(thread, mode, result))
+            return
+        
+        if result.get('success'):
             # Refresh the table
             self.load_counters()
-            messagebox.showinfo("Success", "Counter deleted successfully")
-            
-        except Exception as e:
-            self.counter_db.conn.rollback()
-            messagebox.showerror("Error", f"Failed to delete counter: {str(e)}")
+            if mode == 'archive':
+                messagebox.showinfo("Success", "Counter archived successfully")
+            else:
+                messagebox.showinfo("Success", f"Counter deleted successfully ({result['sales']:,} transactions removed)")
+        else:
+            messagebox.showerror("Error", f"Failed to delete counter: {result.get('error', 'counter not found')}")
+
+    def archive_old_sales(self):
+        """Move closed months' sales into archive files, after showing what would move"""
+        preview = self.counter_db.archive_closed_months(dry_run=True)
+        if not preview['months']:
+            messagebox.showinfo("Archive Old Sales", "No closed months to archive")
+            return
+        
+        months = "\n".join(f"{month}: {count:,} transactions" for month, count in preview['counts'].items())
+        if not messagebox.askyesno(
+            "Archive Old Sales",
+            f"Move {preview['sales']:,} transactions into monthly archive files?\n\n{months}\n\n"
+            "Reports still include archived sales."
+        ):
+            return
+        
+        result = {}
+        
+        def worker():
+            try:
+                result.update(self.counter_db.archive_closed_months())
+            except Exception as e:
+                result.update({'success': False, 'error': str(e)})
+            finally:
+                self.counter_db.release_connection()
+        
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.frame.after(100, lambda: self.finish_archive_old_sales(thread, result))
+
+    def finish_archive_old_sales(self, thread, result):
+        """Wait for archiving to finish, then report it"""
+        if thread.is_alive():
+            self.frame.after(100, lambda: self.finish_archive_old_sales(thread, result))
+            return
+        
+        if result.get('success'):
+            messagebox.showinfo("Success", f"Archived {result['sales']:,} transactions from {len(result['months'])} month(s)")
+        else:
+            messagebox.showerror("Error", f"Failed to archive sales: {result.get('error')}")
 
 
     def add_form_fields(self, parent, fields):
@@ -1,3 +1,4 @@
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
@@ -7,11 +8,15 @@ from reportlab.pdfgen import canvas
 import win32print
 import win32api
 import os
+from paging import TreePager
 
 
 class CashierEmployee:
     """Cashier POS interface for employees"""
     
+    # Best matches shown while typing; refining the query brings others up
+    SEARCH_RESULTS = 200
+    
     def __init__(self, app, db, counter_db):
         """Initialize cashier interface"""
         # Core attributes
@@ -27,6 +32,8 @@ class CashierEmployee:
         
         # UI Components
         self.search_entry = None
+        self.scan_entry = None
+        self.scan_status = None
         self.products_table = None
         self.cart_table = None
         self.sales_history_table = None  # Initialize as None
@@ -45,6 +52,16 @@ class CashierEmployee:
         """Show the cashier interface"""
         self.create_main_frame(parent)
         self.show_start_screen()
+        # Warm the customer autocomplete index without holding up the screen
+        if not self.counter_db.customers_loaded:
+            threading.Thread(target=self.warm_customer_index, daemon=True).start()
+
+    def warm_customer_index(self):
+        """Background thread: load the customer index, then close the thread's connection"""
+        try:
+            self.counter_db.load_customer_index()
+        finally:
+            self.counter_db.release_connection()
 
     def hide(self):
         """Hide the cashier interface"""
@@ -176,7 +193,25 @@ class CashierEmployee:
     # ======================
     
     def create_search_section(self, parent):
-        """Create product search section"""
+        """Create barcode scan and product search section"""
+        scan_frame = ttk.Frame(parent, style="Cashier.Main.TFrame")
+        scan_frame.pack(fill='x', pady=(0, 5))
+        
+        ttk.Label(scan_frame,
+                text="Scan Barcode:",
+                style="Cashier.Label.TLabel").pack(side='left', padx=(0, 5))
+        
+        # Scanners type the code and press Enter; '3*CODE' adds three at once
+        self.scan_entry = ttk.Entry(scan_frame, style="Cashier.Entry.TEntry", width=24)
+        self.scan_entry.pack(side='left')
+        self.scan_entry.bind('<Return>', self.scan_to_cart)
+        self.scan_entry.focus_set()
+        
+        self.scan_status = ttk.Label(scan_frame,
+                                text="",
+                                style="Cashier.Label.TLabel")
+        self.scan_status.pack(side='left', padx=10)
+        
         search_frame = ttk.Frame(parent, style="Cashier.Main.TFrame")
         search_frame.pack(fill='x', pady=(0, 10))
         
@@ -288,7 +323,7 @@ class CashierEmployee:
         for item in self.products_table.get_children():
             self.products_table.delete(item)
         
-        results = self.db.get_products({"search_query": query})
+        results = self.db.get_products({"search_query": query}, limit=self.SEARCH_RESULTS)
         
         for product in results:
             self.products_table.insert("", 'end', values=(
@@ -571,6 +606,79 @@ class CashierEmployee:
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def scan_to_cart(self, event=None):
+        """Add the product whose code was just scanned, without any dialog.
+
+        Input is a product code, or 'N*CODE' to add N of it. Repeat scans
+        of a product already in the cart raise that line's quantity.
+        """
+        text = self.scan_entry.get().strip()
+        self.scan_entry.delete(0, tk.END)
+        if not text:
+            return "break"
+        if not self.current_customer:
+            self.show_scan_status("Select a customer before scanning", error=True)
+            return "break"
+        
+        quantity, product = 1, self.db.get_product_by_code(text)
+        if product is None:
+            prefix, separator, code = text.partition('*')
+            if separator and prefix.strip().isdigit():
+                quantity, product = int(prefix), self.db.get_product_by_code(code.strip())
+        
+        if product is None:
+            self.show_scan_status(f"Unknown code: {text}", error=True)
+        elif quantity <= 0:
+            self.show_scan_status("Quantity must be positive", error=True)
+        else:
+            self.add_scanned_product(product, quantity)
+        return "break"
+
+    def add_scanned_product(self, product, quantity):
+        """Add quantity of a product to the cart, merging with its existing line"""
+        index = next((i for i, item in enumerate(self.current_cart) if item['id'] == product['id']), None)
+        in_cart = self.current_cart[index]['quantity'] if index is not None else 0
+        if in_cart + quantity > product['quantity']:
+            self.show_scan_status(f"Only {product['quantity']} of {product['name']} in stock", error=True)
+            return
+        
+        if index is None:
+            self.current_cart.append({
+                'id': product['id'],
+                'name': product['name'],
+                'price': product['trade_price'],
+                'quantity': quantity,
+                'total': product['trade_price'] * quantity
+            })
+            index = len(self.current_cart) - 1
+        else:
+            item = self.current_cart[index]
+            item['quantity'] += quantity
+            item['total'] = item['price'] * item['quantity']
+        
+        self.update_cart_line(index)
+        self.show_scan_status(f"{quantity} x {product['name']} ({self.current_cart[index]['quantity']} in cart)")
+
+    def update_cart_line(self, index):
+        """Redraw one cart line (appending it if new) and the total, leaving other rows alone"""
+        item = self.current_cart[index]
+        values = (item['name'], f"PKR {item['price']:,.2f}", item['quantity'], f"PKR {item['total']:,.2f}")
+        rows = self.cart_table.get_children()
+        if index < len(rows):
+            row = rows[index]
+            self.cart_table.item(row, values=values)
+        else:
+            row = self.cart_table.insert("", 'end', values=values)
+        self.cart_table.selection_set(row)
+        self.cart_table.see(row)
+        self.total_label.config(text=f"PKR {sum(item['total'] for item in self.current_cart):,.2f}")
+
+    def show_scan_status(self, message, error=False):
+        """Report the last scan next to the scan entry; errors also beep"""
+        self.scan_status.config(text=message, foreground='#c62828' if error else '#2e7d32')
+        if error:
+            self.frame.bell()
+
     def update_cart_display(self):
         """Update the cart display"""
         for item in self.cart_table.get_children():
@@ -655,31 +763,82 @@ class CashierEmployee:
                 command=self.select_customer).pack()
         
     def select_customer(self):
-        """Simplified customer selection dialog with just name field"""
+        """Customer selection dialog with name / phone autocomplete"""
         dialog = tk.Toplevel(self.app.root)
         dialog.title("Select Customer")
-        dialog.geometry("400x200")
+        dialog.geometry("400x380")
         dialog.resizable(False, False)
         
         # Center dialog on screen
         x = self.app.root.winfo_x() + (self.app.root.winfo_width() // 2) - 200
-        y = self.app.root.winfo_y() + (self.app.root.winfo_height() // 2) - 100
+        y = self.app.root.winfo_y() + (self.app.root.winfo_height() // 2) - 190
         dialog.geometry(f"+{x}+{y}")
         
         container = ttk.Frame(dialog, style="Cashier.Dialog.TFrame")
         container.pack(fill='both', expand=True, padx=20, pady=20)
         
-        # Simple instruction label
         ttk.Label(container,
-                text="Enter customer name:",
-                style="Cashier.Dialog.Label.TLabel").pack(pady=(10, 5))
+                text="Customer name or phone:",
+                style="Cashier.Dialog.Label.TLabel").pack(anchor='w', pady=(0, 5))
         
-        # Single text entry field
         name_entry = ttk.Entry(container,
                             style="Cashier.Dialog.Entry.TEntry")
-        name_entry.pack(fill='x', pady=10)
+        name_entry.pack(fill='x', pady=(0, 5))
         name_entry.focus()
         
+        # Suggestions, refreshed on every keystroke
+        suggestions = ttk.Treeview(container,
+                                columns=("Name", "Phone"),
+                                show='headings',
+                                selectmode='browse',
+                                height=6,
+                                style="Custom.Treeview")
+        suggestions.heading("Name", text="Name")
+        suggestions.heading("Phone", text="Phone")
+        suggestions.column("Name", width=200)
+        suggestions.column("Phone", width=140)
+        suggestions.pack(fill='x', pady=5)
+        customers = {}
+        
+        ttk.Label(container,
+                text="Phone (new customers):",
+                style="Cashier.Dialog.Label.TLabel").pack(anchor='w', pady=(5, 5))
+        
+        phone_entry = ttk.Entry(container,
+                             style="Cashier.Dialog.Entry.TEntry")
+        phone_entry.pack(fill='x')
+        
+        def refresh_suggestions(event=None):
+            if event is not None and event.keysym in ("Return", "Up", "Down"):
+                return
+            suggestions.delete(*suggestions.get_children())
+            customers.clear()
+            for customer in self.counter_db.suggest_customers(name_entry.get()):
+                item = suggestions.insert('', 'end', values=(customer['name'], customer['phone']))
+                customers[item] = customer
+        
+        def move_selection(step):
+            items = suggestions.get_children()
+            if not items:
+                return "break"
+            selected = suggestions.selection()
+            index = items.index(selected[0]) + step if selected else 0
+            item = items[max(0, min(index, len(items) - 1))]
+            suggestions.selection_set(item)
+            suggestions.see(item)
+            return "break"
+        
+        def confirm(event=None):
+            selected = suggestions.selection()
+            self.set_customer(name_entry.get(), dialog,
+                              customer=customers.get(selected[0]) if selected else None,
+                              phone=phone_entry.get())
+        
+        name_entry.bind("<KeyRelease>", refresh_suggestions)
+        name_entry.bind("<Down>", lambda e: move_selection(1))
+        name_entry.bind("<Up>", lambda e: move_selection(-1))
+        suggestions.bind("<Double-1>", confirm)
+        
         # Button frame
         btn_frame = ttk.Frame(container, style="Cashier.Dialog.TFrame")
         btn_frame.pack(fill='x', pady=(10, 0))
@@ -688,7 +847,7 @@ class CashierEmployee:
         ttk.Button(btn_frame,
                 text="Confirm",
                 style="Cashier.Dialog.Button.TButton",
-                command=lambda: self.set_customer(name_entry.get(), dialog)
+                command=confirm
                 ).pack(side='right', padx=5)
         
         # Cancel button
@@ -699,42 +858,83 @@ class CashierEmployee:
                 ).pack(side='right', padx=5)
         
         # Bind Enter key to confirm
-        dialog.bind("<Return>", lambda e: self.set_customer(name_entry.get(), dialog))
-
-    def set_customer(self, name, dialog):
-        """Set the selected customer and close dialog"""
-        if name.strip():  # Only proceed if name is not empty
-            self.current_customer = {
-                'name': name.strip(),
-                'phone': '',
-                'email': ''
-            }
-            self.update_customer_display()
-            dialog.destroy()
-        else:
-            messagebox.showwarning("Invalid Input", "Please enter a customer name")
+        dialog.bind("<Return>", confirm)
+
+    def set_customer(self, name, dialog, customer=None, phone=''):
+        """Set the selected customer and close dialog.
+
+        A picked suggestion is used as is; otherwise an existing customer
+        with the typed name (and phone, if given) is reused, or a new one
+        is saved.
+        """
+        if customer is None:
+            if not name.strip():
+                messagebox.showwarning("Invalid Input", "Please enter a customer name")
+                return
+            matches = self.counter_db.find_customers(name=name, phone=phone)
+            if matches:
+                customer = matches[0]
+            else:
+                customer_id = self.counter_db.add_customer(name, phone)
+                customer = self.counter_db.get_customers([customer_id])[0]
+        
+        self.current_customer = {
+            'id': customer['id'],
+            'name': customer['name'],
+            'phone': customer['phone'],
+            'email': customer['email']
+        }
+        self.update_customer_display()
+        dialog.destroy()
+        if self.scan_entry:
+            self.scan_entry.focus_set()
 
     def new_customer(self):
         """Create a new customer record"""
         name = simpledialog.askstring("New Customer", "Enter customer name:")
-        if name:
+        if name and name.strip():
+            phone = simpledialog.askstring("New Customer", "Enter phone number (optional):") or ''
+            customer_id = self.counter_db.add_customer(name, phone)
+            customer = self.counter_db.get_customers([customer_id])[0]
             self.current_customer = {
-                'name': name,
-                'phone': '',
-                'email': ''
+                'id': customer['id'],
+                'name': customer['name'],
+                'phone': customer['phone'],
+                'email': customer['email']
             }
             self.update_customer_display()
 
     def existing_customer(self):
         """Select an existing customer"""
-        name = simpledialog.askstring("Existing Customer", "Enter customer name:")
-        if name:
-            self.current_customer = {
-                'name': name,
-                'phone': '0300-1234567',
-                'email': f"{name.lower().replace(' ', '_')}@example.com"
-            }
-            self.update_customer_display()
+        name = simpledialog.askstring("Existing Customer", "Enter customer name or phone:")
+        if not name or not name.strip():
+            return
+        
+        # Only an exact (normalised) name or phone picks a customer; "Al" must not pick "Alice"
+        is_phone = any(ch.isdigit() for ch in name) and not any(ch.isalpha() for ch in name)
+        if is_phone:
+            matches = self.counter_db.find_customers(phone=name)
+        else:
+            matches = self.counter_db.find_customers(name=name)
+        
+        if matches:
+            customer = matches[0]
+        elif is_phone:
+            messagebox.showwarning("Not Found", f"No customer has the phone number '{name}'")
+            return
+        elif messagebox.askyesno("Not Found", f"No customer is named '{name}'.\n\nAdd '{name}' as a new customer?"):
+            customer_id = self.counter_db.add_customer(name)
+            customer = self.counter_db.get_customers([customer_id])[0]
+        else:
+            return
+        
+        self.current_customer = {
+            'id': customer['id'],
+            'name': customer['name'],
+            'phone': customer['phone'],
+            'email': customer['email']
+        }
+        self.update_customer_display()
 
     def update_customer_display(self):
         """Update the customer information display"""
@@ -987,19 +1187,23 @@ class CashierEmployee:
             history_table.heading(col, text=col)
             history_table.column(col, **config)
 
-        # Store all sales data for filtering
-        self.all_sales_data = self.counter_db.get_sales_by_cashier(self.app.current_user)
-
-        # Add data to table
-        self.filter_history_table(history_table)
-
         # Add double-click binding
         # In your view_full_history method, modify the binding:
         history_table.bind("<Double-1>", lambda e: self.show_selected_receipt(e, history_table, dialog))
 
         # Scrollbar
         vsb = ttk.Scrollbar(table_frame, orient="vertical", command=history_table.yview)
-        history_table.configure(yscrollcommand=vsb.set)
+
+        # Sales are fetched a page at a time as the table is scrolled
+        self.history_pager = TreePager(
+            history_table, vsb,
+            fetch_page=None,
+            key=self.counter_db.sale_page_key,
+            insert_row=lambda sale: self.insert_history_row(history_table, sale)
+        )
+
+        # Add data to table
+        self.filter_history_table(history_table)
 
         # Grid layout
         history_table.grid(row=0, column=0, sticky='nsew')
@@ -1020,42 +1224,33 @@ class CashierEmployee:
     def filter_history_table(self, table):
         """Filter the history table based on current search text"""
         # Get current search text
-        search_text = self.history_search_var.get().lower()
-        
-        # Clear existing data
-        for item in table.get_children():
-            table.delete(item)
+        search_text = self.history_search_var.get().strip()
+        cashier_name = self.app.current_user
 
-        if not search_text:
-            # Show all data if search is empty
-            sales_data = self.all_sales_data
-        else:
-            # Filter data
-            sales_data = [
-                sale for sale in self.all_sales_data
-                if (search_text in sale['receipt_id'].lower() or 
-                    (sale['customer_name'] and search_text in sale['customer_name'].lower()))
-            ]
-
-        # Add filtered data to table
-        for sale in sales_data:
-            sale_time = datetime.strptime(sale['sale_time'], "%Y-%m-%d %H:%M:%S")
-            date = sale_time.strftime("%Y-%m-%d")
-            time = sale_time.strftime("%H:%M:%S")
-
-            table.insert("", 'end', values=(
-                sale['id'],
-                sale['receipt_id'],
-                sale['customer_name'],
-                f"PKR {sale['total_amount']:,.2f}",
-                date,
-                time
-            ))
+        # Reload the first page; matching is done by the database query
+        self.history_pager.reset(
+            lambda **page: self.counter_db.get_sales_by_cashier(cashier_name, search=search_text, **page)
+        )
 
         # Show message if no results found
-        if not sales_data:
+        if not self.history_pager.loaded:
             table.insert("", 'end', values=("No matching sales found", "", "", "", "", "", ""))
 
+    def insert_history_row(self, table, sale):
+        """Add one sale to the history table"""
+        sale_time = datetime.strptime(sale['sale_time'], "%Y-%m-%d %H:%M:%S")
+        date = sale_time.strftime("%Y-%m-%d")
+        time = sale_time.strftime("%H:%M:%S")
+
+        table.insert("", 'end', values=(
+            sale['id'],
+            sale['receipt_id'],
+            sale['customer_name'],
+            f"PKR {sale['total_amount']:,.2f}",
+            date,
+            time
+        ))
+
     def show_selected_receipt(self, event, table=None, parent_window=None):
         """Show receipt for selected sale entry"""
         # Determine which table was clicked
@@ -1112,21 +1307,19 @@ class CashierEmployee:
 
         try:
             # Get current counter info - THIS IS CRUCIAL
-            counters = self.counter_db.get_counters()
-            if not counters:
-                raise Exception("No counters available in the system")
-                
-            # Use the first active counter if available
-            active_counters = [c for c in counters if c.get('status', '').lower() == 'active']
-            if not active_counters:
-                raise Exception("No active counters available")
+            # Use the logged-in cashier's counter (indexed lookup), falling back to the first active one
+            counter = self.counter_db.find_active_counter(self.app.current_user)
+            if counter is None:
+                active_counters = self.counter_db.get_counters(active_only=True)
+                if not active_counters:
+                    raise Exception("No active counters available")
+                counter = active_counters[0]
                 
-            counter = active_counters[0]  # Use first active counter
             counter_id = counter['id']
             cashier_id = counter['cashier_id']  # Get from counter data
 
             # Generate receipt data
-            receipt_id = f"RCPT-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            receipt_id = self.counter_db.next_receipt_id(counter_id)
             total_amount = sum(item['total'] for item in self.current_cart)
             sale_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
@@ -1150,24 +1343,23 @@ class CashierEmployee:
                 ]
             }
             
-            # Record sale
-            result = self.counter_db.record_sale(sale_data)
+            # Record the sale and update inventory in one transaction
+            result = self.db.checkout(sale_data, self.counter_db)
+            if result.get('shortfalls'):
+                names = {item['id']: item['name'] for item in self.current_cart}
+                lines = [
+                    f"{names.get(product_id, product_id)}: {-delta} in cart, {available or 0} in stock"
+                    for product_id, delta, available in result['shortfalls']
+                ]
+                messagebox.showwarning("Insufficient Stock",
+                                       "The sale was not recorded:\n\n" + "\n".join(lines))
+                self.refresh_products([product_id for product_id, _, _ in result['shortfalls']])
+                return
             if not result['success']:
                 raise Exception(result['error'])
-                
-            # Update inventory and refresh product display
-            updated_products = []
-            for item in self.current_cart:
-                update_success = self.db.update_product_quantity(
-                    item['id'],
-                    -item['quantity']
-                )
-                if not update_success:
-                    raise Exception(f"Failed to update inventory for product {item['id']}")
-                updated_products.append(item['id'])
             
             # Refresh the products that were updated
-            self.refresh_products(updated_products)
+            self.refresh_products([item['id'] for item in self.current_cart])
             
             # Generate and show receipt
             receipt_data = {
@@ -109,8 +109,8 @@ class DashboardSection:
         
         # Total Sales Today
         today = datetime.now().strftime("%Y-%m-%d")
-        today_sales = self.app.counter_db.get_sales_by_date(today)
-        today_total = sum(sale['total_amount'] for sale in today_sales) if today_sales else 0
+        today_summary = self.app.counter_db.get_daily_sales_summary(today, today)
+        today_total = sum(row['revenue'] for row in today_summary)
         stats.append(("Today's Sales", f"PKR {today_total:,.2f}", "#1cc88a"))
         
         # Active Counters
@@ -142,22 +142,20 @@ class DashboardSection:
         stats.append(("Avg. Sale", f"PKR {avg_sale:,.2f}", "#36b9cc"))
         
         # Popular Product
-        if sales:
-            product_counts = {}
-            for sale in sales:
-                details = self.app.counter_db.get_sale_details(sale['id'])
-                if details:
-                    for item in details['items']:
-                        product_counts[item['product_name']] = product_counts.get(item['product_name'], 0) + item['quantity']
-            if product_counts:
-                top_product = max(product_counts.items(), key=lambda x: x[1])
-                stats.append(("Top Product", f"{top_product[0]} ({top_product[1]})", "#f6c23e"))
-            else:
-                stats.append(("Top Product", "N/A", "#f6c23e"))
+        top_products = self.app.counter_db.get_product_quantities(
+            today, today, cashier_name=self.app.current_user, limit=1) if sales else []
+        if top_products:
+            top_product = top_products[0]
+            stats.append(("Top Product", f"{top_product['product_name']} ({top_product['quantity']})", "#f6c23e"))
         else:
             stats.append(("Top Product", "N/A", "#f6c23e"))
         
         return stats
+
+    def get_current_counter(self):
+        """Get the counter record of the logged-in cashier"""
+        return self.app.counter_db.find_active_counter(self.app.current_user)
+
     def create_graph_selector(self):
         """Create graph selector and container with date filtering"""
         graph_container = ttk.Frame(self.frame, style='Modern.Graph.Container.TFrame')
@@ -353,12 +351,14 @@ class DashboardSection:
         dates = []
         sales = []
         
+        # One rollup query for the whole range, missing days count as 0
+        summary = self.app.counter_db.get_daily_sales_summary(self.date_range['start'], self.date_range['end'])
+        daily_totals = {row['sale_date']: row['revenue'] for row in summary}
+        
         for i in range(delta.days + 1):
-            date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
-            daily_sales = self.app.counter_db.get_sales_by_date(date)
-            total = sum(sale['total_amount'] for sale in daily_sales) if daily_sales else 0
-            dates.append(datetime.strptime(date, "%Y-%m-%d"))
-            sales.append(total)
+            date = start_date + timedelta(days=i)
+            dates.append(date)
+            sales.append(daily_totals.get(date.strftime("%Y-%m-%d"), 0))
         
         # Create line plot with markers
         line, = ax.plot(dates, sales, 
@@ -392,15 +392,12 @@ class DashboardSection:
         counter_names = [c['cashier_name'] for c in counters]
         counter_sales = []
         
+        # Revenue per counter for the selected date range
+        summary = self.app.counter_db.get_counter_sales_summary(self.date_range['start'], self.date_range['end'])
+        counter_totals = {row['counter_id']: row['revenue'] for row in summary}
+        
         for counter in counters:
-            # Get sales for the selected date range
-            sales = self.app.counter_db.get_sales_history({
-                'start_date': self.date_range['start'],
-                'end_date': self.date_range['end'],
-                'counter_id': counter['id']
-            })
-            total = sum(s['total_amount'] for s in sales) if sales else 0
-            counter_sales.append(total)
+            counter_sales.append(counter_totals.get(counter['id'], 0))
         
         # Create colorful bars
         colors = plt.cm.viridis(np.linspace(0, 1, len(counter_names)))
@@ -478,19 +475,16 @@ class DashboardSection:
         prev_start = start_date - delta - timedelta(days=1)
         prev_end = start_date - timedelta(days=1)
         
-        # Get current period sales
+        # Get both periods in one rollup query and split at the current start date
+        summary = self.app.counter_db.get_daily_sales_summary(
+            prev_start.strftime("%Y-%m-%d"), self.date_range['end'])
         current_sales = 0
-        for i in range(delta.days + 1):
-            date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
-            daily_sales = self.app.counter_db.get_sales_by_date(date)
-            current_sales += sum(sale['total_amount'] for sale in daily_sales) if daily_sales else 0
-        
-        # Get previous period sales
         prev_sales = 0
-        for i in range(delta.days + 1):
-            date = (prev_start + timedelta(days=i)).strftime("%Y-%m-%d")
-            daily_sales = self.app.counter_db.get_sales_by_date(date)
-            prev_sales += sum(sale['total_amount'] for sale in daily_sales) if daily_sales else 0
+        for row in summary:
+            if row['sale_date'] >= self.date_range['start']:
+                current_sales += row['revenue']
+            else:
+                prev_sales += row['revenue']
         
         # Create bar chart
         periods = [
@@ -534,23 +528,19 @@ class DashboardSection:
         fig.patch.set_facecolor('#f8f9fa')
         ax.set_facecolor('#f8f9fa')
         
-        # Get sales data for current cashier in date range
-        sales = self.app.counter_db.get_sales_history({
-            'start_date': self.date_range['start'],
-            'end_date': self.date_range['end'],
-            'cashier_name': self.app.current_user  # Changed from current_user_id to current_user
-        })
-        
-        
-        # Group by day
-        daily_sales = {}
-        for sale in sales:
-            date = datetime.strptime(sale['sale_time'], "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d")
-            daily_sales[date] = daily_sales.get(date, 0) + sale['total_amount']
+        # Get daily totals for current cashier in date range
+        summary = []
+        counter = self.get_current_counter()
+        if counter:
+            summary = self.app.counter_db.get_daily_sales_summary(
+                self.date_range['start'],
+                self.date_range['end'],
+                counter_id=counter['id']
+            )
         
         # Prepare data for plotting
-        dates = [datetime.strptime(date, "%Y-%m-%d") for date in sorted(daily_sales.keys())]
-        amounts = [daily_sales[date.strftime("%Y-%m-%d")] for date in dates]
+        dates = [datetime.strptime(row['sale_date'], "%Y-%m-%d") for row in summary]
+        amounts = [row['revenue'] for row in summary]
         
         # Create line plot
         line, = ax.plot(dates, amounts, 
@@ -581,27 +571,18 @@ class DashboardSection:
         fig.patch.set_facecolor('#f8f9fa')
         ax.set_facecolor('#f8f9fa')
         
-        # Get sales data for current cashier in date range
-        sales = self.app.counter_db.get_sales_history({
-            'start_date': self.date_range['start'],
-            'end_date': self.date_range['end'],
-            'cashier_name': self.app.current_user  # Changed from current_user_id to current_user
-        })
-            
-        # Group by hour across all days
-        hourly_sales = {}
-        for sale in sales:
-            hour = datetime.strptime(sale['sale_time'], "%Y-%m-%d %H:%M:%S").hour
-            hourly_sales[hour] = hourly_sales.get(hour, 0) + sale['total_amount']
+        # Get hourly totals for current cashier in date range, grouped in SQL
+        totals = self.app.counter_db.get_sales_totals(
+            self.date_range['start'],
+            self.date_range['end'],
+            group_by='hour',
+            cashier_name=self.app.current_user
+        )
+        hourly_sales = {row['key']: row['revenue'] for row in totals}
         
         # Fill in missing hours with 0
-        for hour in range(24):
-            if hour not in hourly_sales:
-                hourly_sales[hour] = 0
-        
-        # Sort by hour
-        hours = sorted(hourly_sales.keys())
-        amounts = [hourly_sales[hour] for hour in hours]
+        hours = list(range(24))
+        amounts = [hourly_sales.get(hour, 0) for hour in hours]
         
         # Create bar chart
         bars = ax.bar(hours, amounts, color='#4e73df')
@@ -624,25 +605,15 @@ class DashboardSection:
         fig.patch.set_facecolor('#f8f9fa')
         ax.set_facecolor('#f8f9fa')
         
-        # Get sales data for current cashier in date range
-        sales = self.app.counter_db.get_sales_history({
-            'start_date': self.date_range['start'],
-            'end_date': self.date_range['end'],
-            'cashier_name': self.app.current_user  # Changed from current_user_id to current_user
-        })
-        
-        # Count product sales
-        product_counts = {}
-        for sale in sales:
-            sale_details = self.app.counter_db.get_sale_details(sale['id'])
-            if sale_details:
-                for item in sale_details['items']:
-                    product_counts[item['product_name']] = product_counts.get(item['product_name'], 0) + item['quantity']
-        
-        # Sort by quantity and take top 10
-        sorted_products = sorted(product_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        products = [p[0] for p in sorted_products]
-        quantities = [p[1] for p in sorted_products]
+        # Get top 10 products by quantity for current cashier in date range
+        top_products = self.app.counter_db.get_product_quantities(
+            self.date_range['start'],
+            self.date_range['end'],
+            cashier_name=self.app.current_user,
+            limit=10
+        )
+        products = [p['product_name'] for p in top_products]
+        quantities = [p['quantity'] for p in top_products]
         
         # Create horizontal bar chart
         y_pos = range(len(products))
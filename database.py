@@ -1,16 +1,1035 @@
+import csv
+import functools
+import gzip
+import hashlib
+import heapq
+import hmac
+import json
+import os
+import queue
+import re
 import sqlite3
-from typing import List, Dict, Optional
-from datetime import datetime
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from itertools import islice
+from types import FunctionType
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
+from datetime import datetime, timedelta
+
+
+def _day_bounds(start_date: str, end_date: Optional[str] = None) -> Tuple[str, str]:
+    """Turn inclusive YYYY-MM-DD dates into a half-open [start, end) sale_time range"""
+    end_date = end_date or start_date
+    next_day = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    return start_date, next_day.strftime("%Y-%m-%d")
+
+def iter_product_file(path: str) -> Iterator[Dict]:
+    """Stream product rows from a .csv or .jsonl file without loading it all.
+
+    A record that cannot be decoded or parsed is yielded as the ValueError
+    describing it, in its place, so the rows after it are still read.
+    """
+    with open(path, 'rb') as f:
+        if path.lower().endswith(('.jsonl', '.json')):
+            for raw in f:
+                try:
+                    line = raw.decode('utf-8')
+                    if line.strip():
+                        yield json.loads(line)
+                except ValueError as e:
+                    yield ValueError(f"Invalid JSON line: {e}")
+        else:
+            bad_lines = []
+            
+            def lines():
+                for raw in f:
+                    try:
+                        yield raw.decode('utf-8')
+                    except UnicodeDecodeError as e:
+                        bad_lines.append(e)
+                        yield raw.decode('utf-8', 'replace')
+            
+            for row in csv.DictReader(lines()):
+                if bad_lines:
+                    yield ValueError(f"Invalid UTF-8: {bad_lines[0]}")
+                    bad_lines.clear()
+                else:
+                    yield row
+
+
+EXPORT_CHUNK_SIZE = 5000
+
+
+def open_export_file(path: str):
+    """Open an export target for text writing, gzip-compressed when it ends in .gz"""
+    if path.lower().endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+PAGE_SIZE = 500
+
+DEFAULT_LOW_STOCK_THRESHOLD = 10
+
+
+def stock_status_sql(quantity: str, threshold: str) -> str:
+    """SQL CASE expression deriving a product's stock status.
+
+    Takes the SQL for the quantity and low-stock threshold (column names,
+    NEW.* references or parameters) so every place that computes status
+    shares the same rule.
+    """
+    return (f"CASE WHEN {quantity} <= 0 THEN 'Out of Stock' "
+            f"WHEN {quantity} <= {threshold} THEN 'Low Stock' "
+            f"ELSE 'In Stock' END")
+
+
+def iter_pages(fetch_page, key, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+    """Yield every row from a keyset-paginated fetch function.
+
+    fetch_page(limit=..., after=...) must return one page of rows, and
+    key(row) the `after` value that continues from that row. No cursor is
+    held open between pages, so callers may write to the database while
+    iterating.
+    """
+    after = None
+    while True:
+        rows = fetch_page(limit=page_size, after=after)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        after = key(rows[-1])
+
+
+def is_jsonl_path(path: str) -> bool:
+    """Whether an export path should be written as JSON Lines rather than CSV"""
+    return path.lower().endswith(('.jsonl', '.jsonl.gz'))
+
+
+# Column lists shared by the hot sales tables and the monthly archives
+SALES_COLUMNS = ("id, receipt_id, counter_id, cashier_id, cashier_name, customer_name, "
+                 "total_amount, payment_method, sale_time")
+SALE_ITEM_COLUMNS = "id, sale_id, product_id, product_name, quantity, unit_price, total_price"
+
+
+def month_bounds(month: str) -> Tuple[str, str]:
+    """Turn a YYYY-MM month into a half-open [start, end) sale_time range"""
+    year, mon = map(int, month.split('-'))
+    return f"{month}-01", f"{year + mon // 12:04d}-{mon % 12 + 1:02d}-01"
+
+
+def _month_of(date: Optional[str]) -> Optional[str]:
+    """YYYY-MM month of a date or sale_time string (None passes through)"""
+    return date[:7] if date else None
+
+
+def _merge_totals(rows: Iterable[Dict], key: str, sums: Tuple[str, ...]) -> List[Dict]:
+    """Combine grouped rows from several partitions that share a key by adding their sums"""
+    merged = {}
+    for row in rows:
+        total = merged.get(row[key])
+        if total is None:
+            merged[row[key]] = row
+        else:
+            for column in sums:
+                total[column] += row[column]
+    return list(merged.values())
+
+
+def partition_schema(month: str) -> str:
+    """Schema (and file stem) of the archive holding a YYYY-MM month of sales"""
+    return "sales_" + month.replace('-', '_')
+
+
+class CompactRow:
+    """Base for the slotted rows returned when compact_rows is enabled.
+
+    Values live in __slots__ instead of a per-row dict. Subscripting,
+    get(), `in`, keys(), copy() and dict(row) behave like the plain dicts
+    returned otherwise; a column the query did not select is absent.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row_factory that fills slots by column name"""
+        obj = cls.__new__(cls)
+        for column, value in zip(cursor.description, row):
+            setattr(obj, column[0], value)
+        return obj
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__ and hasattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self) -> List[str]:
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def values(self) -> List:
+        return [getattr(self, name) for name in self.keys()]
+
+    def items(self) -> List[Tuple]:
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def copy(self):
+        obj = self.__class__.__new__(self.__class__)
+        for name, value in self.items():
+            setattr(obj, name, value)
+        return obj
+
+    def to_dict(self) -> Dict:
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, CompactRow)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.items())
+        return f"{self.__class__.__name__}({fields})"
+
+
+class Product(CompactRow):
+    """A products table row (plus bm25 rank for full-text search results)"""
+    __slots__ = ('id', 'name', 'category', 'company', 'code', 'trade_price',
+                 'mfg_price', 'quantity', 'status', 'worth', 'low_stock_threshold', 'rank')
+
+    def __init__(self, id, name, category, company, code, trade_price,
+                 mfg_price, quantity, status, worth, low_stock_threshold, rank=None):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.company = company
+        self.code = code
+        self.trade_price = trade_price
+        self.mfg_price = mfg_price
+        self.quantity = quantity
+        self.status = status
+        self.worth = worth
+        self.low_stock_threshold = low_stock_threshold
+        if rank is not None:
+            self.rank = rank
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """Product queries select products.* (and optionally rank), so map by position"""
+        return cls(*row)
+
+
+class Sale(CompactRow):
+    """A sales table row; list queries fill only the columns they select"""
+    __slots__ = ('id', 'receipt_id', 'counter_id', 'cashier_id', 'cashier_name',
+                 'customer_name', 'total_amount', 'payment_method', 'sale_time')
+
+
+class SaleItem(CompactRow):
+    """A sale_items table row"""
+    __slots__ = ('id', 'sale_id', 'product_id', 'product_name', 'quantity',
+                 'unit_price', 'total_price')
+
+
+class ConnectionManager:
+    """Thread-local pool of tuned SQLite connections to one database file.
+
+    Each thread gets its own connection, so a report reading on a worker
+    thread never shares a cursor or transaction with checkout on the UI
+    thread. WAL mode lets those readers run while a write is in progress.
+    Short-lived worker threads call release() when they finish, so their
+    connections (and the cache and mmap behind them) do not pile up.
+    """
+
+    def __init__(self, db_name: str, foreign_keys: bool = False, busy_timeout: float = 5.0,
+                 cache_size_kb: int = 20000, mmap_size: int = 256 * 1024 * 1024, trace=None):
+        self.db_name = db_name
+        self.foreign_keys = foreign_keys
+        self.trace = trace
+        self.busy_timeout = busy_timeout
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new connection with the performance pragmas applied"""
+        # check_same_thread is off only so close_all can run from any thread;
+        # each connection is still used by the thread that opened it.
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_kb}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if self.foreign_keys:
+            conn.execute("PRAGMA foreign_keys = ON")
+        if self.trace:
+            conn.set_trace_callback(self.trace)
+        return conn
+
+    def get(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.connect()
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def release(self) -> Optional[sqlite3.Connection]:
+        """Close the calling thread's connection, rolling back anything left open.
+
+        Returns the closed connection (None if the thread had none) so
+        owners can forget state they keyed on it.
+        """
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            return None
+        self.local.conn = None
+        with self.lock:
+            if conn in self.connections:
+                self.connections.remove(conn)
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+        return conn
+
+    def set_trace(self, trace):
+        """Install trace as the sqlite3 trace callback on every connection, now and later (None removes it)"""
+        with self.lock:
+            self.trace = trace
+            for conn in self.connections:
+                conn.set_trace_callback(trace)
+
+    def close_all(self):
+        """Close every connection handed out by this manager"""
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+            self.local = threading.local()
+
+
+class ProductCache:
+    """In-process copy of the products table, indexed by id, code and status"""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_code = {}
+        self.by_status = {}
+        self.loaded = False
+        self.data_versions = {}
+        self.log_seq = 0
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        """Drop all cached products"""
+        self.by_id = {}
+        self.by_code = {}
+        self.by_status = {}
+        self.loaded = False
+        self.data_versions = {}
+        self.log_seq = 0
+
+    def load(self, products: List[Dict]):
+        """Replace the cache contents with a full product list"""
+        self.by_id = {}
+        self.by_code = {}
+        self.by_status = {}
+        for product in products:
+            self.put(product)
+        self.loaded = True
+
+    def put(self, product: Dict):
+        """Insert or replace a product, keeping the indexes in step"""
+        old = self.by_id.get(product['id'])
+        if old:
+            self.by_code.pop(old['code'], None)
+            self.by_status.get(old['status'], set()).discard(old['id'])
+        self.by_id[product['id']] = product
+        self.by_code[product['code']] = product
+        self.by_status.setdefault(product['status'], set()).add(product['id'])
+
+    def remove(self, product_id: int):
+        """Remove a product from the cache if present"""
+        old = self.by_id.pop(product_id, None)
+        if old:
+            self.by_code.pop(old['code'], None)
+            self.by_status.get(old['status'], set()).discard(product_id)
+
+    def get(self, product_id: int) -> Optional[Dict]:
+        return self.by_id.get(product_id)
+
+    def get_by_code(self, code: str) -> Optional[Dict]:
+        return self.by_code.get(code)
+
+    def all(self) -> List[Dict]:
+        return list(self.by_id.values())
+
+    def with_status(self, status: str) -> List[Dict]:
+        return [self.by_id[product_id] for product_id in sorted(self.by_status.get(status, ()))]
+
+    def stats(self) -> Dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.by_id)}
+
+
+def normalize_customer_name(name: str) -> str:
+    """Case-folded name with runs of whitespace collapsed, used for lookups"""
+    return " ".join((name or "").casefold().split())
+
+
+def normalize_phone(phone: str) -> str:
+    """Digits of a phone number, so '0300-123 4567' and '03001234567' match"""
+    return "".join(ch for ch in (phone or "") if ch.isdigit())
+
+
+class PrefixIndex:
+    """Prefix search over keys kept as a trie flattened into sorted arrays.
+
+    Every key under a trie node sits in one contiguous run of the sorted
+    key list, so walking to the node is a bisect and listing its
+    completions reads forward from there. Parallel lists hold a value per
+    key; one entry costs a string and an int instead of a dict per
+    character, which keeps a million customer names in memory.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.values = []
+
+    def load(self, pairs: Iterable[Tuple[str, object]]):
+        """Replace the contents with (key, value) pairs already sorted by key"""
+        keys, values = [], []
+        for key, value in pairs:
+            keys.append(key)
+            values.append(value)
+        self.keys, self.values = keys, values
+
+    def add(self, key: str, value):
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.values.insert(position, value)
+
+    def search(self, prefix: str, limit: int = 10) -> List:
+        """Values of up to limit keys starting with prefix, in key order"""
+        matches = []
+        start = bisect_left(self.keys, prefix)
+        for position in range(start, min(start + limit, len(self.keys))):
+            if not self.keys[position].startswith(prefix):
+                break
+            matches.append(self.values[position])
+        return matches
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def search_tokens(text: str) -> List[str]:
+    """Case-folded alphanumeric words of a product field or search query"""
+    return re.findall(r"[^\W_]+", (text or "").casefold())
+
+
+def word_trigrams(word: str) -> set:
+    """Padded character trigrams, so short words and word starts still share some"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between a and b, or limit + 1 once it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class ProductSearchIndex:
+    """Typo-tolerant in-memory search over product names, companies, categories and codes.
+
+    Fuzzy matching runs over the vocabulary of distinct words rather than
+    the products: a query word is compared with the words sharing enough
+    of its character trigrams (each edit changes at most three), and
+    those within a few edits, or that it is a prefix of, are scored.
+    Products are then looked up through per-word postings, starting from
+    the query word with the fewest products and checking the rest against
+    each candidate's own words. Codes only match exactly or by prefix.
+    A query word with more than PREFIX_WORDS vocabulary words or
+    PREFIX_CODES codes starting with it is not expanded; it is checked
+    against the words and code of the products the other words matched.
+    """
+    PREFIX_WORDS = 2000
+    PREFIX_CODES = 200
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.words = []            # word id -> word
+        self.word_ids = {}         # word -> word id
+        self.postings = []         # word id -> set of product ids
+        self.trigrams = {}         # trigram -> set of word ids
+        self.vocabulary = PrefixIndex()
+        self.codes = PrefixIndex()
+        self.documents = {}        # product id -> (name, company, code, category, word ids)
+        self.loaded = False
+        self.log_seq = 0
+
+    def load(self, products: Iterable[Tuple[int, str, str, str, str]]):
+        """Index (id, name, company, code, category) rows from scratch"""
+        self.clear()
+        codes = []
+        for product_id, name, company, code, category in products:
+            word_ids = tuple(dict.fromkeys(self.word_id(word, sort=False)
+                                           for word in search_tokens(f"{name} {company} {category}")))
+            for word_id in word_ids:
+                self.postings[word_id].add(product_id)
+            self.documents[product_id] = (name, company, code, category, word_ids)
+            codes.append((code.casefold(), product_id))
+        self.vocabulary.load(sorted((word, word_id) for word_id, word in enumerate(self.words)))
+        self.codes.load(sorted(codes))
+        self.loaded = True
+
+    def word_id(self, word: str, sort: bool = True) -> int:
+        """Id of a vocabulary word, adding it (and its trigrams) if new"""
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.words.append(word)
+            self.word_ids[word] = word_id
+            self.postings.append(set())
+            for trigram in word_trigrams(word):
+                self.trigrams.setdefault(trigram, set()).add(word_id)
+            if sort:
+                self.vocabulary.add(word, word_id)
+        return word_id
+
+    def put(self, product_id: int, name: str, company: str, code: str, category: str) -> bool:
+        """Index a new or edited product; returns False if its text is unchanged"""
+        old = self.documents.get(product_id)
+        if old and old[:4] == (name, company, code, category):
+            return False
+        self.remove(product_id)
+        word_ids = tuple(dict.fromkeys(self.word_id(word)
+                                       for word in search_tokens(f"{name} {company} {category}")))
+        for word_id in word_ids:
+            self.postings[word_id].add(product_id)
+        self.documents[product_id] = (name, company, code, category, word_ids)
+        self.codes.add(code.casefold(), product_id)
+        return True
+
+    def remove(self, product_id: int):
+        old = self.documents.pop(product_id, None)
+        if old:
+            for word_id in old[4]:
+                self.postings[word_id].discard(product_id)
+            code = old[2].casefold()
+            position = bisect_left(self.codes.keys, code)
+            while position < len(self.codes.keys) and self.codes.keys[position] == code:
+                if self.codes.values[position] == product_id:
+                    del self.codes.keys[position]
+                    del self.codes.values[position]
+                    break
+                position += 1
+
+    @staticmethod
+    def prefix_score(token: str, word: str) -> float:
+        """Similarity of a word to a query word that is its prefix"""
+        if word == token:
+            return 1.0
+        # Longer typed prefixes say more; a single letter ranks all its words alike
+        return 0.7 + 0.3 * len(token) / len(word) if len(token) > 1 else 0.7
+
+    def match_word(self, token: str, prefix_limit: Optional[int] = None) -> Dict[int, float]:
+        """Vocabulary words matching one query word, with a similarity in (0, 1].
+
+        At most prefix_limit words are taken by prefix (all of them when None).
+        """
+        matches = {}
+        for word_id in self.vocabulary.search(token, prefix_limit or len(self.words)):
+            matches[word_id] = self.prefix_score(token, self.words[word_id])
+        if len(token) < 4:
+            return matches
+        
+        max_edits = 1 if len(token) <= 5 else 2
+        token_trigrams = word_trigrams(token)
+        shared = {}
+        for trigram in token_trigrams:
+            for word_id in self.trigrams.get(trigram, ()):
+                shared[word_id] = shared.get(word_id, 0) + 1
+        needed = len(token_trigrams) - 3 * max_edits
+        for word_id, count in shared.items():
+            if count < needed or word_id in matches:
+                continue
+            word = self.words[word_id]
+            # A typo in a word still being typed: compare with the word's start too
+            distance = min(edit_distance(token, word, max_edits),
+                           edit_distance(token, word[:len(token)], max_edits))
+            if distance <= max_edits:
+                matches[word_id] = 0.8 * (1 - distance / len(token))
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None,
+               after: Optional[Tuple[float, int]] = None) -> List[Tuple[float, int]]:
+        """Matches as (rank, product id) pairs, best first.
+
+        rank is the negated score, summed over the query words, so pairs
+        sort like the (bm25 rank, id) keys of full-text results. Every
+        query word has to match one of the product's words or its code.
+        after resumes behind a pair already returned and limit caps the
+        pairs (all of them when None), so callers can page through.
+        """
+        tokens = list(dict.fromkeys(search_tokens(query)))
+        if not tokens:
+            return []
+        # Words too common to expand are checked per candidate below. If
+        # every word is that common, the longest one is expanded in full.
+        broad = [token for token in tokens if self.is_broad(token)]
+        expand_fully = None
+        if len(broad) == len(tokens):
+            expand_fully = max(broad, key=len)
+            broad.remove(expand_fully)
+        
+        terms = []
+        for token in tokens:
+            if token in broad:
+                continue
+            prefix_limit = None if token == expand_fully else self.PREFIX_WORDS
+            words = {word_id: score for word_id, score in self.match_word(token, prefix_limit).items()
+                     if self.postings[word_id]}
+            codes = {}
+            for product_id in self.codes.search(token, len(self.codes)):
+                codes[product_id] = 1.0 if self.documents[product_id][2].casefold() == token else 0.9
+            if not words and not codes:
+                return []
+            products = set(codes).union(*(self.postings[word_id] for word_id in words))
+            terms.append((products, words, codes))
+        
+        # Products matching every expanded query word, intersected smallest set first
+        terms.sort(key=lambda term: len(term[0]))
+        matched = set.intersection(*(products for products, _, _ in terms))
+        
+        # Split each query word's products by their best match score
+        term_groups = []
+        for term_products, words, codes in terms:
+            by_score = {}
+            for word_id, score in words.items():
+                by_score.setdefault(score, []).append(self.postings[word_id])
+            for product_id, score in codes.items():
+                by_score.setdefault(score, []).append((product_id,))
+            if len(by_score) == 1:
+                term_groups.append([(score, term_products) for score in by_score])
+            else:
+                seen = set()
+                word_groups = []
+                for score in sorted(by_score, reverse=True):
+                    products = set().union(*by_score[score]) - seen
+                    seen |= products
+                    word_groups.append((score, products))
+                term_groups.append(word_groups)
+        for token in broad:
+            words = self.match_word(token, self.PREFIX_WORDS)
+            by_score = {}
+            for product_id in matched:
+                score = self.document_score(product_id, token, words)
+                if score:
+                    by_score.setdefault(score, set()).add(product_id)
+            matched = set().union(*by_score.values())
+            term_groups.append(sorted(by_score.items(), reverse=True))
+        
+        # Score whole groups of products with set operations, combining
+        # the groups across words into (total score, products) pairs
+        groups = [(0.0, matched)]
+        for word_groups in term_groups:
+            groups = [(total + score, both) for total, products in groups
+                      for score, word_products in word_groups
+                      for both in (products & word_products,) if both]
+        
+        totals = {}
+        for total, products in groups:
+            totals.setdefault(round(total, 6), set()).update(products)
+        ranked = []
+        for total in sorted(totals, reverse=True):
+            rank = -total
+            products = totals[total]
+            if after is not None:
+                if rank < after[0]:
+                    continue
+                if rank == after[0]:
+                    products = [product_id for product_id in products if product_id > after[1]]
+            if limit is None:
+                best = sorted(products)
+            else:
+                wanted = limit - len(ranked)
+                best = sorted(products) if len(products) <= 4 * wanted else heapq.nsmallest(wanted, products)
+                best = best[:wanted]
+            ranked.extend((rank, product_id) for product_id in best)
+            if limit is not None and len(ranked) >= limit:
+                break
+        return ranked
+
+    def is_broad(self, token: str) -> bool:
+        """Whether more vocabulary words or codes start with token than are expanded"""
+        return (len(self.vocabulary.search(token, self.PREFIX_WORDS + 1)) > self.PREFIX_WORDS
+                or len(self.codes.search(token, self.PREFIX_CODES + 1)) > self.PREFIX_CODES)
+
+    def document_score(self, product_id: int, token: str, words: Dict[int, float]) -> float:
+        """Best match of one query word against a product's own words and code (0 if none).
+
+        words holds the word's fuzzy and first prefix matches from match_word.
+        """
+        name, company, code, category, word_ids = self.documents[product_id]
+        best = 0.0
+        for word_id in word_ids:
+            score = words.get(word_id)
+            if score is None and self.words[word_id].startswith(token):
+                score = self.prefix_score(token, self.words[word_id])
+            if score and score > best:
+                best = score
+        code = code.casefold()
+        if code == token:
+            return 1.0
+        if code.startswith(token):
+            best = max(best, 0.9)
+        return best
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+
+class QueryResultCache:
+    """Small LRU of recent query results, each kept for at most ttl seconds.
+
+    Keys must include the table's data version so a write never serves
+    stale rows; the ttl only bounds how long unused results are held.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[List]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, rows: List):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), rows)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+
+class QueryStats:
+    """Call counts, latency histograms and a slow-query log for the database classes.
+
+    instrument(db) wraps every public method of an InventoryDB or CounterDB
+    instance. Only the outermost call is timed; methods called from inside
+    another timed method count towards their caller. Calls taking slow_ms
+    or longer are logged with the shapes of their arguments (types and
+    lengths, never the values). Share one instance between both databases
+    for a single report.
+
+    With capture_sql on, trace is also installed as the sqlite3 trace
+    callback on their connections, so each call knows which statements it
+    ran and slow calls log their SQL, string literals masked, with its
+    EXPLAIN QUERY PLAN. SQLite traces every executemany row, which slows
+    bulk imports badly, so capture is off unless asked for (see
+    set_capture_sql).
+    """
+
+    # Histogram bucket upper bounds in milliseconds; slower calls land in the last bucket
+    LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+    # Statements kept per call; executemany traces every row, so bulk calls are cut short
+    STATEMENTS_PER_CALL = 50
+    SQL_LOG_CHARS = 2000
+    # Quoted strings in traced SQL (SQLite expands bound parameters, so names and phones show up here)
+    SQL_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+    def __init__(self, slow_ms: float = 100, max_slow: int = 200, capture_sql: bool = False):
+        self.slow_ms = slow_ms
+        self.capture_sql = capture_sql
+        self.managers = []         # ConnectionManagers of the instrumented databases
+        self.methods = {}
+        self.slow_queries = deque(maxlen=max_slow)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def trace(self, sql: str):
+        """sqlite3 trace callback: note the statement against the calls in progress"""
+        local = self.local
+        if getattr(local, 'statements', None) is None or local.explaining:
+            return
+        local.statement_count += 1
+        if len(local.statements) < self.STATEMENTS_PER_CALL:
+            local.statements.append(sql)
+
+    def instrument(self, db):
+        """Replace db's public methods with timed wrappers (per instance).
+
+        Methods named in the class's UNTIMED_METHODS (per-row helpers, and
+        anything handling passwords) are left alone.
+        """
+        cls = type(db)
+        untimed = getattr(cls, 'UNTIMED_METHODS', ())
+        for name, attr in vars(cls).items():
+            if name.startswith('_') or name in untimed:
+                continue
+            if not isinstance(attr, (FunctionType, staticmethod, classmethod)):
+                continue
+            setattr(db, name, self.wrap(f"{cls.__name__}.{name}", getattr(db, name), db))
+        with self.lock:
+            self.managers.append(db.connections)
+        db.connections.set_trace(self.trace if self.capture_sql else None)
+        return db
+
+    def set_capture_sql(self, enabled: bool):
+        """Start or stop recording the SQL each call runs, on every instrumented connection"""
+        with self.lock:
+            self.capture_sql = enabled
+            managers = list(self.managers)
+        for manager in managers:
+            manager.set_trace(self.trace if enabled else None)
+
+    def wrap(self, name: str, method, db):
+        """Timed wrapper around one bound method"""
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            local = self.local
+            if getattr(local, 'statements', None) is not None:
+                # Nested inside another timed call, which already counts this time
+                return method(*args, **kwargs)
+            local.statements = []
+            local.statement_count = 0
+            local.explaining = False
+            result = None
+            failed = False
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                return result
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.record(name, elapsed_ms, result, local.statement_count, failed)
+                if elapsed_ms >= self.slow_ms:
+                    self.log_slow(name, elapsed_ms, args, kwargs, local.statement_count,
+                                  local.statements, db)
+                local.statements = None
+        return timed
+
+    def record(self, name: str, elapsed_ms: float, result, statement_count: int, failed: bool):
+        """Add one call to the method's counters and histogram"""
+        if isinstance(result, list):
+            rows = len(result)
+        elif isinstance(result, (dict, CompactRow)):
+            rows = 1
+        else:
+            rows = 0
+        bucket = bisect_left(self.LATENCY_BUCKETS_MS, elapsed_ms)
+        with self.lock:
+            entry = self.methods.get(name)
+            if entry is None:
+                entry = self.methods[name] = {
+                    'calls': 0, 'errors': 0, 'rows': 0, 'statements': 0,
+                    'total_ms': 0.0, 'max_ms': 0.0,
+                    'histogram': [0] * (len(self.LATENCY_BUCKETS_MS) + 1),
+                }
+            entry['calls'] += 1
+            entry['errors'] += failed
+            entry['rows'] += rows
+            entry['statements'] += statement_count
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['histogram'][bucket] += 1
+
+    def log_slow(self, name: str, elapsed_ms: float, args, kwargs, statement_count: int,
+                 statements: List[str], db):
+        """Keep a slow call with its SQL and query plans"""
+        logged = []
+        self.local.explaining = True
+        try:
+            for sql in dict.fromkeys(statements):
+                masked = self.SQL_STRING_LITERAL.sub("'?'", sql)
+                logged.append({'sql': masked[:self.SQL_LOG_CHARS], 'plan': self.explain(db, sql)})
+        finally:
+            self.local.explaining = False
+        with self.lock:
+            self.slow_queries.append({
+                'method': name,
+                'ms': round(elapsed_ms, 3),
+                'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'args': [self.shape(arg) for arg in args],
+                'kwargs': {key: self.shape(value) for key, value in kwargs.items()},
+                'statement_count': statement_count,
+                'statements': logged,
+            })
+
+    @staticmethod
+    def shape(value) -> str:
+        """Type and size of an argument, e.g. 'str[8]' or 'dict[3]'; values are never logged"""
+        if isinstance(value, (str, bytes, list, tuple, dict, set, frozenset)):
+            return f"{type(value).__name__}[{len(value)}]"
+        return type(value).__name__
+
+    @staticmethod
+    def explain(db, sql: str) -> List[str]:
+        """EXPLAIN QUERY PLAN lines for an executed statement (empty for BEGIN, PRAGMA, ...)"""
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')):
+            return []
+        try:
+            return [row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        except sqlite3.Error as e:
+            return [f"unavailable: {e}"]
+
+    def snapshot(self) -> Dict:
+        """All counters as plain data, methods sorted by name"""
+        labels = [f"<={bound}ms" for bound in self.LATENCY_BUCKETS_MS]
+        labels.append(f">{self.LATENCY_BUCKETS_MS[-1]}ms")
+        with self.lock:
+            methods = {}
+            for name in sorted(self.methods):
+                entry = self.methods[name]
+                methods[name] = {
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'rows': entry['rows'],
+                    'statements': entry['statements'],
+                    'total_ms': round(entry['total_ms'], 3),
+                    'avg_ms': round(entry['total_ms'] / entry['calls'], 3),
+                    'max_ms': round(entry['max_ms'], 3),
+                    'histogram': dict(zip(labels, entry['histogram'])),
+                }
+            return {'slow_ms': self.slow_ms, 'capture_sql': self.capture_sql, 'methods': methods,
+                    'slow_queries': list(self.slow_queries)}
+
+    def report(self, top: int = 25) -> str:
+        """Text table of the methods with the most total time"""
+        methods = self.snapshot()['methods']
+        lines = [f"{'method':<44}{'calls':>8}{'avg ms':>10}{'max ms':>10}{'total ms':>12}{'rows':>10}{'stmts':>8}"]
+        for name, entry in sorted(methods.items(), key=lambda item: -item[1]['total_ms'])[:top]:
+            lines.append(f"{name:<44}{entry['calls']:>8}{entry['avg_ms']:>10.2f}{entry['max_ms']:>10.2f}"
+                         f"{entry['total_ms']:>12.1f}{entry['rows']:>10}{entry['statements']:>8}")
+        lines.append(f"\n{len(self.slow_queries)} calls over {self.slow_ms} ms in the slow-query log")
+        if not self.capture_sql:
+            lines.append("SQL capture is off: statement counts and slow-query SQL are not recorded")
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> str:
+        """Write snapshot() as JSON (stable key order, so dumps diff cleanly)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, sort_keys=True)
+        return path
+
+    def reset(self):
+        with self.lock:
+            self.methods.clear()
+            self.slow_queries.clear()
+
 
 class InventoryDB:
-    def __init__(self, db_name: str = 'inventory.db'):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
+    # WHERE fragments for get_products filters, in canonical order
+    PRODUCT_FILTER_SQL = {
+        'category': "category = ?",
+        'company': "company = ?",
+        'status': "status = ?",
+        'price': "trade_price BETWEEN ? AND ?",
+        'quantity': "quantity BETWEEN ? AND ?",
+        'like': "(name LIKE ? OR category LIKE ? OR company LIKE ? OR code LIKE ?)",
+        'ids': "products.id IN (SELECT value FROM json_each(?))",
+    }
+    PRODUCT_STATUSES = ("In Stock", "Low Stock", "Out of Stock")
+    # Per-row helpers QueryStats leaves unwrapped
+    UNTIMED_METHODS = ("row_to_product", "validate_product_row", "product_page_key")
+
+    def __init__(self, db_name: str = 'inventory.db', use_cache: bool = False,
+                 compact_rows: bool = False, result_cache_ttl: float = 0,
+                 fuzzy_search: bool = False, stats: Optional[QueryStats] = None):
+        """Open the inventory database.
+
+        With compact_rows, product queries return slotted Product objects
+        instead of dicts (same keys, a fraction of the memory). A positive
+        result_cache_ttl keeps recent get_products results for that many
+        seconds, or until the products table changes. fuzzy_search answers
+        search_query filters from a typo-tolerant in-memory index
+        (ProductSearchIndex) instead of full-text search, once
+        build_search_index has run. stats records
+        timings for every public method (see QueryStats).
+        """
+        self.connections = ConnectionManager(db_name)
+        self.cache = ProductCache() if use_cache else None
+        self.compact_rows = compact_rows
+        self.query_plans = {}
+        self.result_cache = QueryResultCache(result_cache_ttl) if result_cache_ttl > 0 else None
+        self.search_index = ProductSearchIndex() if fuzzy_search else None
+        # Guards search_index, which background builds replace and imports change from workers
+        self.search_lock = threading.RLock()
+        self.search_build = None
+        self.stats = stats
+        if stats:
+            stats.instrument(self)
         self.create_tables()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The calling thread's database connection"""
+        return self.connections.get()
         
     def create_tables(self):
         """Create the products table if it doesn't exist"""
-        query = """
+        query = f"""
         CREATE TABLE IF NOT EXISTS products (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -21,20 +1040,169 @@ class InventoryDB:
             mfg_price REAL NOT NULL,
             quantity INTEGER NOT NULL,
             status TEXT NOT NULL,
-            worth REAL GENERATED ALWAYS AS (trade_price * quantity) STORED
+            worth REAL GENERATED ALWAYS AS (trade_price * quantity) STORED,
+            low_stock_threshold INTEGER NOT NULL DEFAULT {DEFAULT_LOW_STOCK_THRESHOLD}
         )
         """
         self.conn.execute(query)
+        
+        # Databases created before per-product thresholds get the column appended
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(products)")]
+        if 'low_stock_threshold' not in columns:
+            self.conn.execute(f"""
+                ALTER TABLE products ADD COLUMN low_stock_threshold
+                INTEGER NOT NULL DEFAULT {DEFAULT_LOW_STOCK_THRESHOLD}
+            """)
+        
+        self.create_status_triggers()
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_products_status ON products(status)")
+        self.refresh_product_status()
+        self.fts_enabled = self.create_search_index()
+        self.create_change_log()
         self.conn.commit()
 
-    def add_product(self, product: Dict) -> int:
-        """Add a new product to the database"""
-        query = """
-        INSERT INTO products (name, category, company, code, trade_price, mfg_price, quantity, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    def create_status_triggers(self):
+        """Create the triggers that keep products.status in step with quantity.
+
+        They only write when the stored status is wrong, so inserts that
+        already carry the right status (see add_product) cost nothing extra.
+        Status is owned by the database: direct writes to it are corrected too.
         """
+        new_status = stock_status_sql("NEW.quantity", "NEW.low_stock_threshold")
+        triggers = [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS products_status_insert AFTER INSERT ON products
+            WHEN NEW.status IS NOT {new_status} BEGIN
+                UPDATE products SET status = {new_status} WHERE id = NEW.id;
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS products_status_update
+            AFTER UPDATE OF quantity, low_stock_threshold, status ON products
+            WHEN NEW.status IS NOT {new_status} BEGIN
+                UPDATE products SET status = {new_status} WHERE id = NEW.id;
+            END
+            """,
+        ]
+        for query in triggers:
+            self.conn.execute(query)
+
+    def create_search_index(self) -> bool:
+        """Create the FTS5 product search index and the triggers that keep it in sync.
+
+        Returns False when SQLite was built without FTS5, in which case
+        get_products falls back to LIKE matching.
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+        ).fetchone()
+        
+        try:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                    name, category, company, code,
+                    content='products', content_rowid='id', prefix='2 3'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, using LIKE search: {e}")
+            return False
+        
+        self.create_search_triggers()
+        
+        # Index products that existed before the search index was added
+        if not exists:
+            self.conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+        return True
+
+    def create_search_triggers(self):
+        """Create the triggers that mirror products changes into products_fts"""
+        triggers = [
+            """
+            CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+                INSERT INTO products_fts (rowid, name, category, company, code)
+                VALUES (new.id, new.name, new.category, new.company, new.code);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+                INSERT INTO products_fts (products_fts, rowid, name, category, company, code)
+                VALUES ('delete', old.id, old.name, old.category, old.company, old.code);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS products_fts_update
+            AFTER UPDATE OF name, category, company, code ON products BEGIN
+                INSERT INTO products_fts (products_fts, rowid, name, category, company, code)
+                VALUES ('delete', old.id, old.name, old.category, old.company, old.code);
+                INSERT INTO products_fts (rowid, name, category, company, code)
+                VALUES (new.id, new.name, new.category, new.company, new.code);
+            END
+            """,
+        ]
+        for query in triggers:
+            self.conn.execute(query)
+
+    # Newest products_log entries kept; the prune runs every 1000 entries
+    PRODUCT_LOG_KEEP = 50000
+
+    def create_change_log(self):
+        """Record which products changed, in order, in products_log.
+
+        Every insert, update and delete appends the product's id, so a
+        cache that remembers the last seq it applied can re-read only the
+        products changed since, by this or any other terminal. Old entries
+        are pruned by trigger; a cache that falls further behind than
+        PRODUCT_LOG_KEEP entries reloads in full instead.
+        """
+        # products_log replaces the products_changes counter of earlier versions
+        for trigger in ('products_changes_insert', 'products_changes_delete', 'products_changes_update'):
+            self.conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        self.conn.execute("DROP TABLE IF EXISTS products_changes")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS products_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER NOT NULL
+            )
+        """)
+        log = "INSERT INTO products_log (product_id) VALUES"
+        triggers = [
+            f"CREATE TRIGGER IF NOT EXISTS products_log_insert AFTER INSERT ON products BEGIN {log} (NEW.id); END",
+            f"CREATE TRIGGER IF NOT EXISTS products_log_update AFTER UPDATE ON products BEGIN {log} (NEW.id); END",
+            f"CREATE TRIGGER IF NOT EXISTS products_log_delete AFTER DELETE ON products BEGIN {log} (OLD.id); END",
+            f"""CREATE TRIGGER IF NOT EXISTS products_log_prune AFTER INSERT ON products_log
+                WHEN NEW.seq % 1000 = 0 BEGIN
+                    DELETE FROM products_log WHERE seq <= NEW.seq - {self.PRODUCT_LOG_KEEP};
+                END""",
+        ]
+        for query in triggers:
+            self.conn.execute(query)
+
+    def drop_search_triggers(self):
+        """Drop the products_fts sync triggers (the index must be rebuilt afterwards)"""
+        for trigger in ('products_fts_insert', 'products_fts_delete', 'products_fts_update'):
+            self.conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    @staticmethod
+    def build_match_query(search: str) -> Optional[str]:
+        """Turn free text into an FTS5 prefix query, e.g. 'pana 500' -> '"pana"* "500"*'"""
+        terms = [term for term in search.split() if any(ch.isalnum() for ch in term)]
+        if not terms:
+            return None
+        return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+    # Insert statement shared by add_product and add_products_bulk. Status is
+    # derived from the quantity (?7) and threshold (?8) parameters in SQL.
+    INSERT_PRODUCT_SQL = f"""
+        INSERT INTO products (name, category, company, code, trade_price, mfg_price,
+                              quantity, low_stock_threshold, status)
+        VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, {stock_status_sql("?7", "?8")})
+        """
+
+    def add_product(self, product: Dict) -> int:
+        """Add a new product to the database (status is derived from quantity)"""
         cursor = self.conn.cursor()
-        cursor.execute(query, (
+        cursor.execute(self.INSERT_PRODUCT_SQL, (
             product['name'],
             product['category'],
             product['company'],
@@ -42,88 +1210,575 @@ class InventoryDB:
             product['trade_price'],
             product['mfg_price'],
             product['quantity'],
-            product['status']
+            product.get('low_stock_threshold', DEFAULT_LOW_STOCK_THRESHOLD)
         ))
         self.conn.commit()
+        self.refresh_cached_product(cursor.lastrowid)
         return cursor.lastrowid
 
-    def get_products(self, filters: Optional[Dict] = None) -> List[Dict]:
-        """Get products with optional filters"""
-        base_query = "SELECT * FROM products"
-        params = []
-        
-        if filters:
-            where_clauses = []
+    def validate_product_row(self, row: Dict) -> Tuple:
+        """Check an imported product row and return its insert parameters"""
+        if not isinstance(row, dict):
+            raise ValueError("Row must be an object of product fields")
+        values = {}
+        for field in ('name', 'category', 'company', 'code'):
+            value = str(row.get(field) or '').strip()
+            if not value:
+                raise ValueError(f"{field} is required")
+            values[field] = value
             
-            # Category filter
-            if filters.get('category') and filters['category'] != "All Categories":
-                where_clauses.append("category = ?")
-                params.append(filters['category'])
-                
-            # Company filter
-            if filters.get('company') and filters['company'] != "All Companies":
-                where_clauses.append("company = ?")
-                params.append(filters['company'])
-                
-            # Status filter
-            if filters.get('status') and filters['status'] != "All Status":
-                status_map = {
-                    "In Stock": "In Stock",
-                    "Low Stock": "Low Stock", 
-                    "Out of Stock": "Out of Stock"
-                }
-                if filters['status'] in status_map:
-                    where_clauses.append("status = ?")
-                    params.append(status_map[filters['status']])
-                    
-            # Price range filter
-            if filters.get('range_type') == "Price Range":
-                min_price = filters.get('min_price', 0)
-                max_price = filters.get('max_price', float('inf'))
-                where_clauses.append("trade_price BETWEEN ? AND ?")
-                params.extend([min_price, max_price])
-                
-            # Quantity range filter
-            elif filters.get('range_type') == "Quantity Range":
-                min_qty = filters.get('min_qty', 0)
-                max_qty = filters.get('max_qty', float('inf'))
-                where_clauses.append("quantity BETWEEN ? AND ?")
-                params.extend([min_qty, max_qty])
-                
-            # Search query
-            if filters.get('search_query'):
-                search = f"%{filters['search_query']}%"
-                where_clauses.append("""
-                    (name LIKE ? OR 
-                    category LIKE ? OR 
-                    company LIKE ? OR 
-                    code LIKE ?)
-                """)
-                params.extend([search, search, search, search])
-                
-            if where_clauses:
-                base_query += " WHERE " + " AND ".join(where_clauses)
+        try:
+            trade_price = float(row.get('trade_price'))
+            mfg_price = float(row.get('mfg_price'))
+            quantity = int(row.get('quantity'))
+            threshold = int(row.get('low_stock_threshold') or DEFAULT_LOW_STOCK_THRESHOLD)
+        except (TypeError, ValueError):
+            raise ValueError("trade_price, mfg_price, quantity and low_stock_threshold must be numbers")
+            
+        if trade_price <= 0 or mfg_price <= 0:
+            raise ValueError("Prices must be positive values")
+        if quantity < 0:
+            raise ValueError("Quantity cannot be negative")
+        if threshold < 0:
+            raise ValueError("Low stock threshold cannot be negative")
+            
+        return (values['name'], values['category'], values['company'], values['code'],
+                trade_price, mfg_price, quantity, threshold)
+
+    def add_products_bulk(self, rows: Iterable[Dict], batch_size: int = 10000) -> Dict:
+        """Insert or update many products in one transaction.
+
+        Rows are streamed through executemany in batches, so memory use does
+        not grow with the input. Existing products are updated when their code
+        matches. Invalid rows are skipped and reported in 'errors' as
+        (row number, message) pairs instead of aborting the import; a row
+        given as a ValueError (see iter_product_file) is reported the same way.
+        
+        Imports larger than one batch suspend the full-text triggers and
+        rebuild products_fts once at the end, inside the same transaction.
+        """
+        query = self.INSERT_PRODUCT_SQL + """
+        ON CONFLICT (code) DO UPDATE SET
+            name = excluded.name,
+            category = excluded.category,
+            company = excluded.company,
+            trade_price = excluded.trade_price,
+            mfg_price = excluded.mfg_price,
+            quantity = excluded.quantity,
+            low_stock_threshold = excluded.low_stock_threshold,
+            status = excluded.status
+        """
+        errors = []
+        imported = 0
+        
+        def valid_rows():
+            for row_number, row in enumerate(rows, start=1):
+                try:
+                    if isinstance(row, ValueError):
+                        raise row
+                    yield self.validate_product_row(row)
+                except ValueError as e:
+                    errors.append((row_number, str(e)))
         
         cursor = self.conn.cursor()
-        cursor.execute(base_query, params)
+        pending = valid_rows()
+        triggers_suspended = False
+        try:
+            while True:
+                batch = list(islice(pending, batch_size))
+                if not batch:
+                    break
+                if imported and self.fts_enabled and not triggers_suspended:
+                    self.drop_search_triggers()
+                    triggers_suspended = True
+                cursor.executemany(query, batch)
+                imported += len(batch)
+                
+            if triggers_suspended:
+                self.create_search_triggers()
+                cursor.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            return {'success': False, 'error': f"Database error: {str(e)}", 'imported': 0, 'errors': errors}
+        finally:
+            # Any failure, not just a database error, must not leave the
+            # transaction (and its write lock) open on this connection
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            self.invalidate_cache()
+            
+        return {'success': True, 'imported': imported, 'errors': errors}
+
+    def get_products(self, filters: Optional[Dict] = None, limit: Optional[int] = None,
+                     after: Optional[Tuple] = None) -> List[Dict]:
+        """Get products with optional filters.
+
+        Pass limit/after for keyset pagination: `after` is the
+        product_page_key() of the last product already fetched.
+        """
+        # Search text goes to the fuzzy index when it is enabled and built
+        if (self.search_index is not None and (filters or {}).get('search_query')
+                and self.sync_search_index()):
+            return self.fuzzy_search_products(filters, limit, after)
+        
+        # Unfiltered and status-only lookups can be answered from the cache
+        if self.cache is not None and set(filters or {}) <= {'status'}:
+            status = (filters or {}).get('status')
+            if self.sync_cache():
+                self.cache.hits += 1
+            if status and status != "All Status":
+                products = iter(self.cache.with_status(status))
+            else:
+                products = iter(self.cache.all())
+            if after is not None:
+                products = (p for p in products if p['id'] > after[0])
+            return [p.copy() for p in islice(products, limit)]
+        
+        shape, params = self.product_query_shape(filters, limit, after)
+        
+        # Identical filters are answered from the result cache until the table changes
+        if self.result_cache is not None:
+            key = (shape, tuple(params), self.data_state())
+            products = self.result_cache.get(key)
+            if products is not None:
+                return [p.copy() for p in products]
+        
+        cursor = self.product_cursor()
+        cursor.execute(self.compile_product_query(shape), params)
         
+        if self.compact_rows or 'match' not in shape:
+            products = self.fetch_products(cursor)
+        else:
+            products = []
+            for row in cursor.fetchall():
+                product = self.row_to_product(row)
+                product['rank'] = row[11]
+                products.append(product)
+                
+        if self.result_cache is not None:
+            self.result_cache.put(key, products)
+            return [p.copy() for p in products]
+        return products
+
+    def product_query_shape(self, filters: Optional[Dict], limit: Optional[int] = None,
+                            after: Optional[Tuple] = None) -> Tuple[Tuple, List]:
+        """Normalise get_products arguments into a canonical (shape, params) pair.
+
+        The shape names the clauses in use, in a fixed order, so every filter
+        dict with the same clauses maps to the same compiled SQL. params
+        holds the values for that SQL's placeholders.
+        """
+        filters = filters or {}
+        shape = []
+        params = []
+        
+        # Full-text search results are joined in and ranked by bm25
+        match_query = None
+        if filters.get('search_query') and self.fts_enabled:
+            match_query = self.build_match_query(filters['search_query'])
+        if match_query:
+            shape.append('match')
+            params.append(match_query)
+            
+        if filters.get('category') and filters['category'] != "All Categories":
+            shape.append('category')
+            params.append(filters['category'])
+            
+        if filters.get('company') and filters['company'] != "All Companies":
+            shape.append('company')
+            params.append(filters['company'])
+            
+        if filters.get('status') in self.PRODUCT_STATUSES:
+            shape.append('status')
+            params.append(filters['status'])
+            
+        if filters.get('range_type') == "Price Range":
+            shape.append('price')
+            params.extend([filters.get('min_price', 0), filters.get('max_price', float('inf'))])
+        elif filters.get('range_type') == "Quantity Range":
+            shape.append('quantity')
+            params.extend([filters.get('min_qty', 0), filters.get('max_qty', float('inf'))])
+            
+        # Restrict to given product ids (fuzzy search candidates)
+        if filters.get('product_ids') is not None:
+            shape.append('ids')
+            params.append(json.dumps(list(filters['product_ids'])))
+            
+        # LIKE fallback when full-text search can't be used
+        if filters.get('search_query') and not match_query:
+            shape.append('like')
+            params.extend([f"%{filters['search_query']}%"] * 4)
+            
+        # Keyset pagination: continue after the last (rank, id) or id seen
+        if limit is not None or after is not None:
+            shape.append('paged')
+        if after is not None:
+            shape.append('after')
+            params.extend(after if match_query else after[:1])
+        if limit is not None:
+            shape.append('limit')
+            params.append(limit)
+            
+        return tuple(shape), params
+
+    def compile_product_query(self, shape: Tuple) -> str:
+        """Build (once per shape) the SQL for a product_query_shape() shape"""
+        query = self.query_plans.get(shape)
+        if query is not None:
+            return query
+            
+        match = 'match' in shape
+        if match:
+            query = """
+            SELECT products.*, fts.rank FROM products
+            JOIN (SELECT rowid, rank FROM products_fts WHERE products_fts MATCH ?) AS fts
+                ON fts.rowid = products.id
+            """
+            order_by = " ORDER BY fts.rank"
+        else:
+            query = "SELECT products.* FROM products"
+            order_by = ""
+            
+        where_clauses = [self.PRODUCT_FILTER_SQL[name] for name in shape if name in self.PRODUCT_FILTER_SQL]
+        if 'after' in shape:
+            where_clauses.append("(fts.rank, products.id) > (?, ?)" if match else "products.id > ?")
+        if 'paged' in shape:
+            order_by = " ORDER BY fts.rank, products.id" if match else " ORDER BY products.id"
+            
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+        query += order_by
+        if 'limit' in shape:
+            query += " LIMIT ?"
+            
+        self.query_plans[shape] = query
+        return query
+
+    # Ranked matches read in the first round when other filters may drop some
+    FUZZY_SEARCH_BATCH = 1000
+
+    def fuzzy_search_products(self, filters: Dict, limit: Optional[int] = None,
+                              after: Optional[Tuple] = None) -> List[Dict]:
+        """get_products for a search_query, ranked by ProductSearchIndex.
+
+        Matches are read from the index behind `after` and narrowed by the
+        other filters in SQL. When those filters drop rows, further (doubling)
+        batches are read until the page is full, so paging reaches every
+        match. Each product carries rank (its negated score), so
+        product_page_key pages through them like full-text results.
+        """
+        other_filters = {key: value for key, value in filters.items() if key != 'search_query'}
+        filtered = bool(self.product_query_shape(other_filters)[0])
+        after = tuple(after) if after is not None else None
+        batch = self.FUZZY_SEARCH_BATCH
         products = []
-        for row in cursor.fetchall():
-            products.append({
-                'id': row[0],
-                'name': row[1],
-                'category': row[2],
-                'company': row[3],
-                'code': row[4],
-                'trade_price': row[5],
-                'mfg_price': row[6],
-                'quantity': row[7],
-                'status': row[8],
-                'worth': row[9]
-            })
+        while True:
+            if limit is None:
+                wanted = None
+            elif filtered:
+                wanted = max(limit - len(products), batch)
+                batch *= 2
+            else:
+                # Nothing else to filter on: only the page itself needs reading
+                wanted = limit - len(products)
+            with self.search_lock:
+                ranked = self.search_index.search(filters['search_query'], wanted, after)
+            if not ranked:
+                break
+            
+            other_filters['product_ids'] = [product_id for _, product_id in ranked]
+            shape, params = self.product_query_shape(other_filters)
+            cursor = self.product_cursor()
+            cursor.execute(self.compile_product_query(shape), params)
+            by_id = {product['id']: product for product in self.fetch_products(cursor)}
             
+            for rank, product_id in ranked:
+                product = by_id.get(product_id)
+                if product is None:
+                    continue
+                product['rank'] = rank
+                products.append(product)
+                if limit is not None and len(products) >= limit:
+                    return products
+            if wanted is None or len(ranked) < wanted:
+                break
+            after = ranked[-1]
         return products
 
+    # Most changed products the fuzzy index re-reads in place; more rebuild it in the background
+    SEARCH_INDEX_CATCH_UP = 2000
+
+    def sync_search_index(self) -> bool:
+        """Bring the fuzzy search index up to date with products_log.
+
+        Products changed since the index's log position, by this or any
+        other terminal, are re-read into it. When the log no longer reaches
+        back that far or too many changed, a rebuild starts in the
+        background and the current index keeps answering meanwhile.
+        Returns False while no index has been built yet, so callers fall
+        back to full-text search.
+        """
+        with self.search_lock:
+            index = self.search_index
+            if not index.loaded:
+                self.start_search_index_build()
+                return False
+            log_seq = self.product_log_seq()
+            product_ids = self.changed_product_ids(index.log_seq, log_seq)
+            if product_ids is None or len(product_ids) > self.SEARCH_INDEX_CATCH_UP:
+                self.start_search_index_build()
+                return True
+            if product_ids:
+                rows = {row[0]: row for row in self.conn.execute(
+                    "SELECT id, name, company, code, category FROM products"
+                    " WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(product_ids),))}
+                for product_id in product_ids:
+                    if product_id in rows:
+                        index.put(*rows[product_id])
+                    else:
+                        index.remove(product_id)
+            index.log_seq = log_seq
+            return True
+
+    def build_search_index(self) -> ProductSearchIndex:
+        """Build a fresh fuzzy search index from the products table and switch to it"""
+        # Read the log position first, so changes made during the load are re-read later
+        log_seq = self.product_log_seq()
+        index = ProductSearchIndex()
+        index.load(self.conn.execute("SELECT id, name, company, code, category FROM products"))
+        index.log_seq = log_seq
+        with self.search_lock:
+            self.search_index = index
+        return index
+
+    def start_search_index_build(self):
+        """Run build_search_index on a worker thread unless one is already running"""
+        with self.search_lock:
+            if self.search_build is not None and self.search_build.is_alive():
+                return
+            
+            def worker():
+                try:
+                    self.build_search_index()
+                except sqlite3.Error as e:
+                    print(f"Error building search index: {e}")
+                finally:
+                    self.release_connection()
+            
+            self.search_build = threading.Thread(target=worker, daemon=True)
+            self.search_build.start()
+
+    def data_state(self) -> Tuple:
+        """Token that changes whenever the products table may have changed.
+
+        PRAGMA data_version covers commits from other connections and
+        total_changes covers this connection's own writes; both are per
+        connection, so the connection is part of the token.
+        """
+        conn = self.conn
+        return (id(conn), conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+
+    def iter_products(self, filters: Optional[Dict] = None, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+        """Generator variant of get_products that fetches one page at a time"""
+        return iter_pages(lambda **page: self.get_products(filters, **page),
+                          self.product_page_key, page_size)
+
+    @staticmethod
+    def product_page_key(product: Dict) -> Tuple:
+        """Keyset position of a product returned by get_products"""
+        if 'rank' in product:
+            return (product['rank'], product['id'])
+        return (product['id'],)
+
+    def get_inventory_summary(self) -> Dict:
+        """Get item count, stock value and low/out-of-stock counts in one query"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT 
+                COUNT(*),
+                COALESCE(SUM(worth), 0),
+                COALESCE(SUM(status = 'Low Stock'), 0),
+                COALESCE(SUM(status = 'Out of Stock'), 0)
+            FROM products
+        """)
+        row = cursor.fetchone()
+        return {
+            'total_items': row[0],
+            'total_value': row[1],
+            'low_stock': row[2],
+            'out_of_stock': row[3]
+        }
+
+    @staticmethod
+    def row_to_product(row) -> Dict:
+        """Convert a products table row into a product dict"""
+        return {
+            'id': row[0],
+            'name': row[1],
+            'category': row[2],
+            'company': row[3],
+            'code': row[4],
+            'trade_price': row[5],
+            'mfg_price': row[6],
+            'quantity': row[7],
+            'status': row[8],
+            'worth': row[9],
+            'low_stock_threshold': row[10]
+        }
+
+    def product_cursor(self) -> sqlite3.Cursor:
+        """Cursor for `SELECT * FROM products` queries, building Product rows in compact mode"""
+        cursor = self.conn.cursor()
+        if self.compact_rows:
+            cursor.row_factory = Product.row_factory
+        return cursor
+
+    def fetch_products(self, cursor: sqlite3.Cursor) -> List[Dict]:
+        """Fetch all remaining rows of a product_cursor() query as products"""
+        rows = cursor.fetchall()
+        if self.compact_rows:
+            return rows
+        return [self.row_to_product(row) for row in rows]
+
+    def fetch_product(self, cursor: sqlite3.Cursor) -> Optional[Dict]:
+        """Fetch the next row of a product_cursor() query as a product"""
+        row = cursor.fetchone()
+        if row is None or self.compact_rows:
+            return row
+        return self.row_to_product(row)
+
+    def sync_cache(self) -> bool:
+        """Make sure the cache reflects the database.
+
+        PRAGMA data_version only changes when another connection commits,
+        so our own writes are applied in place and writes from other
+        terminals are caught up from products_log, re-reading only the
+        products they touched. The value is per connection, so it is
+        tracked separately for each thread's connection.
+        Returns True when the cache was already current.
+        """
+        conn = self.conn
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self.cache.loaded and self.cache.data_versions.get(id(conn)) == data_version:
+            return True
+        
+        self.cache.misses += 1
+        # Read the log position first: anything committed after it is
+        # re-read on the next sync, never skipped
+        log_seq = self.product_log_seq()
+        if not (self.cache.loaded and self.apply_product_log(log_seq)):
+            cursor = self.product_cursor()
+            cursor.execute("SELECT * FROM products ORDER BY id")
+            self.cache.load(self.fetch_products(cursor))
+        self.cache.log_seq = log_seq
+        self.cache.data_versions[id(conn)] = data_version
+        return False
+
+    def product_log_seq(self) -> int:
+        """seq of the newest products_log entry ever written (0 if none)"""
+        row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'products_log'").fetchone()
+        return row[0] if row else 0
+
+    def changed_product_ids(self, since: int, until: int) -> Optional[List[int]]:
+        """Ids of products changed after log entry `since`, up to `until`.
+
+        None when the log has been pruned past `since` and the changes can
+        no longer be listed.
+        """
+        if until < since:
+            return None
+        if until == since:
+            return []
+        first = self.conn.execute("SELECT MIN(seq) FROM products_log").fetchone()[0]
+        if first is None or first > since + 1:
+            return None
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT product_id FROM products_log WHERE seq > ? AND seq <= ?", (since, until))]
+
+    def apply_product_log(self, log_seq: int) -> bool:
+        """Re-read the products changed since the cache's log position.
+
+        Returns False, leaving the cache alone, when the log no longer
+        reaches back that far or so many products changed that one full
+        reload is cheaper.
+        """
+        product_ids = self.changed_product_ids(self.cache.log_seq, log_seq)
+        if product_ids is None or len(product_ids) > len(self.cache.by_id) // 4:
+            return False
+        if not product_ids:
+            return True
+        cursor = self.product_cursor()
+        cursor.execute("SELECT * FROM products WHERE id IN (SELECT value FROM json_each(?))",
+                       (json.dumps(product_ids),))
+        products = {product['id']: product for product in self.fetch_products(cursor)}
+        for product_id in product_ids:
+            if product_id in products:
+                self.cache.put(products[product_id])
+            else:
+                self.cache.remove(product_id)
+        return True
+
+    def refresh_cached_product(self, product_id: int):
+        """Write-through: re-read one product after we changed it"""
+        cache_loaded = self.cache is not None and self.cache.loaded
+        index_loaded = self.search_index is not None and self.search_index.loaded
+        if not cache_loaded and not index_loaded:
+            return
+        cursor = self.product_cursor()
+        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+        product = self.fetch_product(cursor)
+        if cache_loaded:
+            if product:
+                self.cache.put(product)
+            else:
+                self.cache.remove(product_id)
+        if index_loaded:
+            # The change is also in products_log, so an index swapped in
+            # meanwhile picks it up on its next sync
+            with self.search_lock:
+                if product:
+                    self.search_index.put(product['id'], product['name'], product['company'],
+                                          product['code'], product['category'])
+                else:
+                    self.search_index.remove(product_id)
+
+    def invalidate_cache(self):
+        """Force the next cached read to reload from the database"""
+        if self.cache is not None:
+            self.cache.clear()
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    def cache_stats(self) -> Dict:
+        """Get cache hit/miss counters (all zero when caching is off)"""
+        if self.cache is None:
+            return {'hits': 0, 'misses': 0, 'size': 0}
+        return self.cache.stats()
+
+    def get_product(self, product_id: int) -> Optional[Dict]:
+        """Get a single product by id"""
+        if self.cache is not None:
+            if self.sync_cache():
+                self.cache.hits += 1
+            product = self.cache.get(product_id)
+            return product.copy() if product else None
+        
+        cursor = self.product_cursor()
+        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+        return self.fetch_product(cursor)
+
+    def get_product_by_code(self, code: str) -> Optional[Dict]:
+        """Get a single product by its unique item code"""
+        if self.cache is not None:
+            if self.sync_cache():
+                self.cache.hits += 1
+            product = self.cache.get_by_code(code)
+            return product.copy() if product else None
+        
+        cursor = self.product_cursor()
+        cursor.execute("SELECT * FROM products WHERE code = ?", (code,))
+        return self.fetch_product(cursor)
+
     def update_product(self, product_id: int, updates: Dict) -> bool:
         """Update a product's information"""
         set_clauses = []
@@ -142,6 +1797,7 @@ class InventoryDB:
         cursor = self.conn.cursor()
         cursor.execute(query, params)
         self.conn.commit()
+        self.refresh_cached_product(product_id)
         
         return cursor.rowcount > 0
 
@@ -151,28 +1807,80 @@ class InventoryDB:
         cursor = self.conn.cursor()
         cursor.execute(query, (product_id,))
         self.conn.commit()
+        self.refresh_cached_product(product_id)
         return cursor.rowcount > 0
 
     def restock_product(self, product_id: int, amount: int) -> bool:
-        """Increase a product's quantity by specified amount and update status"""
+        """Increase a product's quantity by specified amount (status follows via trigger)"""
         if amount <= 0:
             return False
             
-        query = """
-        UPDATE products 
-        SET quantity = quantity + ?,
-            status = CASE 
-                WHEN quantity + ? <= 0 THEN 'Out of Stock'
-                WHEN quantity + ? <= 10 THEN 'Low Stock'
-                ELSE 'In Stock'
-            END
-        WHERE id = ?
-        """
+        query = "UPDATE products SET quantity = quantity + ? WHERE id = ?"
         cursor = self.conn.cursor()
-        cursor.execute(query, (amount, amount, amount, product_id))
+        cursor.execute(query, (amount, product_id))
         self.conn.commit()
+        self.refresh_cached_product(product_id)
         return cursor.rowcount > 0
+
+    def refresh_product_status(self, product_id: Optional[int] = None) -> int:
+        """Repair stock status for one product or all of them.
+
+        The status triggers keep rows correct as they change, so this is only
+        needed for data written before the triggers existed; create_tables runs
+        it once at startup. Only rows whose status is wrong are written.
+        Returns the number of rows updated.
+        """
+        status_case = stock_status_sql("quantity", "low_stock_threshold")
+        query = f"UPDATE products SET status = {status_case} WHERE status IS NOT {status_case}"
+        params = []
+        if product_id is not None:
+            query += " AND id = ?"
+            params.append(product_id)
+            
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        self.conn.commit()
+        
+        if cursor.rowcount > 0:
+            if product_id is not None:
+                self.refresh_cached_product(product_id)
+            else:
+                self.invalidate_cache()
+        return cursor.rowcount
     
+    def export_products(self, path: str, progress=None) -> int:
+        """Stream the products table to CSV or (gzipped) JSONL.
+
+        Rows are fetched EXPORT_CHUNK_SIZE at a time, so memory stays flat.
+        progress(written, total) is called after every chunk.
+        Returns the number of products written.
+        """
+        cursor = self.conn.cursor()
+        total = cursor.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        cursor.execute("SELECT * FROM products ORDER BY id")
+        columns = [col[0] for col in cursor.description]
+        jsonl = is_jsonl_path(path)
+        written = 0
+        
+        with open_export_file(path) as f:
+            writer = None if jsonl else csv.writer(f)
+            if writer:
+                writer.writerow(columns)
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                if writer:
+                    writer.writerows(rows)
+                else:
+                    for row in rows:
+                        f.write(json.dumps(dict(zip(columns, row))) + "\n")
+                written += len(rows)
+                if progress:
+                    progress(written, total)
+                    
+        return written
+
     def get_all_categories(self) -> List[str]:
         """Get all unique product categories from the database"""
         query = "SELECT DISTINCT category FROM products ORDER BY category"
@@ -189,36 +1897,338 @@ class InventoryDB:
     
     def get_product_stock(self, product_id):
         """Get current stock quantity for a product"""
-        self.cursor.execute("SELECT quantity FROM products WHERE id = ?", (product_id,))
-        result = self.cursor.fetchone()
+        if self.cache is not None:
+            product = self.get_product(product_id)
+            return product['quantity'] if product else None
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT quantity FROM products WHERE id = ?", (product_id,))
+        result = cursor.fetchone()
         return result[0] if result else None
         
     def update_product_quantity(self, product_id, quantity_change):
-        """Update product quantity in inventory"""
+        """Update product quantity in inventory (never below zero)"""
         try:
-            self.cursor.execute("""
-                UPDATE products 
-                SET quantity = quantity + ? 
-                WHERE id = ?
-            """, (quantity_change, product_id))
+            return not self.apply_stock_deltas([(product_id, quantity_change)])
+        except Exception as e:
+            print(f"Error updating product quantity: {e}")
+            self.conn.rollback()
+            return False
+
+    def apply_stock_deltas(self, deltas: Iterable[Tuple[int, int]], commit: bool = True) -> List[Tuple]:
+        """Apply (product_id, delta) stock changes all-or-nothing.
+
+        Deltas for the same product are summed, then applied with one
+        executemany guarded by `quantity + delta >= 0`, so a decrement can
+        never take stock below zero even when another terminal sold the
+        same item a moment ago.
+
+        Returns the lines that could not be applied as
+        (product_id, delta, available) tuples, where available is None for
+        unknown products. If there are any, the transaction is rolled back
+        and nothing changes. An empty list means every delta was applied.
+        With commit=False the caller owns the transaction: it is left open
+        on success (and the caller refreshes the cache), but still rolled
+        back when a line is short.
+        """
+        totals = {}
+        for product_id, delta in deltas:
+            totals[product_id] = totals.get(product_id, 0) + delta
+        if not totals:
+            return []
+            
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "UPDATE main.products SET quantity = quantity + ?1 WHERE id = ?2 AND quantity + ?1 >= 0",
+            [(delta, product_id) for product_id, delta in totals.items()]
+        )
+        if cursor.rowcount == len(totals):
+            if commit:
+                self.conn.commit()
+                for product_id in totals:
+                    self.refresh_cached_product(product_id)
+            return []
+            
+        # Something was short: undo the batch, then work out which lines failed
+        self.conn.rollback()
+        return self.stock_shortfalls(totals)
+
+    def stock_shortfalls(self, totals: Dict[int, int]) -> List[Tuple]:
+        """(product_id, delta, available) for each delta that would take stock below zero"""
+        available = {}
+        product_ids = list(totals)
+        cursor = self.conn.cursor()
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            cursor.execute(
+                f"SELECT id, quantity FROM products WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            available.update(cursor.fetchall())
+            
+        return [(product_id, delta, available.get(product_id))
+                for product_id, delta in totals.items()
+                if product_id not in available or available[product_id] + delta < 0]
+    
+    def attach_counter_db(self, counter_db: 'CounterDB') -> str:
+        """ATTACH the counters database to this thread's connection (once) and return its schema name"""
+        schema = "counter"
+        attached = [row[1] for row in self.conn.execute("PRAGMA database_list")]
+        if schema not in attached:
+            self.conn.execute("ATTACH DATABASE ? AS counter", (counter_db.connections.db_name,))
+            # synchronous and cache_size are per schema, so tune the attached one too
+            self.conn.execute(f"PRAGMA {schema}.synchronous = NORMAL")
+            self.conn.execute(f"PRAGMA {schema}.cache_size = -{counter_db.connections.cache_size_kb}")
+        return schema
+
+    def checkout(self, sale_data: Dict, counter_db: 'CounterDB') -> Dict:
+        """Record a sale and take its items out of stock in a single transaction.
+
+        Counter.db is attached to the inventory connection, so the sale
+        header, items, daily summary and every stock decrement are written
+        with one COMMIT, and any failure rolls all of it back. Running on
+        the inventory connection also keeps the product cache warm: our own
+        commit does not change this connection's data_version.
+
+        In WAL mode SQLite keeps each file atomic but not the pair, so an
+        OS crash during that one COMMIT can still land one file without the
+        other; application errors and crashes before COMMIT cannot.
+        Stock is taken with apply_stock_deltas, so a line that would oversell
+        cancels the whole sale. The result dict is the same as
+        CounterDB.record_sale's, plus 'shortfalls' (see apply_stock_deltas)
+        when that happens.
+        """
+        deltas = [(item['product_id'], -item['quantity']) for item in sale_data['items']]
+            
+        try:
+            schema = self.attach_counter_db(counter_db)
+            cursor = self.conn.cursor()
+            sale_id = counter_db.insert_sale(cursor, sale_data, schema=schema)
+            
+            shortfalls = self.apply_stock_deltas(deltas, commit=False)
+            if shortfalls:
+                return {'success': False, 'error': "Not enough stock for some items",
+                        'shortfalls': shortfalls}
+                
             self.conn.commit()
-            return True
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            return {'success': False, 'error': f"Database error: {str(e)}"}
         except Exception as e:
-            print(f"Error updating product quantity: {e}")
             self.conn.rollback()
-            return False
-    
+            return {'success': False, 'error': f"System error: {str(e)}"}
+            
+        for product_id in {product_id for product_id, _ in deltas}:
+            self.refresh_cached_product(product_id)
+        return {'success': True, 'sale_id': sale_id}
+
+    def release_connection(self):
+        """Close the calling worker thread's connection once it is done with the database"""
+        conn = self.connections.release()
+        if conn is not None and self.cache is not None:
+            self.cache.data_versions.pop(id(conn), None)
+        if conn is not None and self.result_cache is not None:
+            # Result keys include id(conn), which a later connection may reuse
+            self.result_cache.clear()
+
+    def close(self):
+        """Close all database connections"""
+        self.invalidate_cache()
+        self.connections.close_all()
+
+class ReceiptNumbers:
+    """Collision-free receipt IDs: RCPT-<counter>-<YYYYmmdd>-<sequence>.
+
+    Each counter has a monotonic sequence persisted in receipt_sequences.
+    Numbers are reserved block_size at a time with one UPSERT ... RETURNING,
+    then handed out from memory, so most sales need no database round trip.
+    Every reservation is committed before its numbers are used, so
+    terminals sharing Counter.db and restarts always get fresh blocks; the
+    unused rest of a block is skipped, leaving gaps but never repeats.
+    """
+
+    def __init__(self, counter_db: 'CounterDB', block_size: int = 100):
+        self.counter_db = counter_db
+        self.block_size = block_size
+        self.blocks = {}  # counter_id -> [next, end)
+        self.lock = threading.Lock()
+
+    def reserve(self, counter_id: int) -> Tuple[int, int]:
+        """Take the next block of sequence numbers for a counter from the database"""
+        conn = self.counter_db.conn
+        end = conn.execute("""
+            INSERT INTO receipt_sequences (counter_id, next_value) VALUES (?1, 1 + ?2)
+            ON CONFLICT (counter_id) DO UPDATE SET next_value = next_value + ?2
+            RETURNING next_value
+        """, (counter_id, self.block_size)).fetchone()[0]
+        conn.commit()
+        return end - self.block_size, end
+
+    def next_sequence(self, counter_id: int) -> int:
+        with self.lock:
+            block = self.blocks.get(counter_id)
+            if block is None or block[0] >= block[1]:
+                block = self.blocks[counter_id] = list(self.reserve(counter_id))
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def next_id(self, counter_id: int, when: Optional[datetime] = None) -> str:
+        """Allocate the next receipt ID for a counter"""
+        sequence = self.next_sequence(counter_id)
+        return f"RCPT-{counter_id:02d}-{(when or datetime.now()).strftime('%Y%m%d')}-{sequence:06d}"
+
+
+class SaleWriter:
+    """Background thread that group-commits sales for a CounterDB.
+
+    submit() queues a sale and returns a Future. The writer takes what is
+    queued, up to max_batch sales, and writes the lot in one transaction.
+    Sales arriving while a COMMIT is in flight form the next batch; a
+    positive max_delay additionally lingers that long for more. Each sale runs
+    under its own savepoint, so a bad payload fails only itself. Futures
+    resolve with record_sale's result dict after the COMMIT. The writer's
+    connection runs synchronous=FULL, so a resolved sale has been fsynced,
+    with one fsync shared by the whole batch.
+    """
+    STOP = object()
+
+    def __init__(self, counter_db: 'CounterDB', max_batch: int = 100, max_delay: float = 0):
+        self.counter_db = counter_db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.closed = False
+        self.batches = 0
+        self.sales = 0
+        self.thread = threading.Thread(target=self.run, name="sale-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, sale_data: Dict) -> Future:
+        """Queue a sale; the future resolves to record_sale's result dict"""
+        if self.closed:
+            raise RuntimeError("Sale writer is closed")
+        future = Future()
+        self.queue.put((sale_data, future))
+        return future
+
+    def run(self):
+        conn = self.counter_db.conn
+        conn.execute("PRAGMA synchronous = FULL")
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is self.STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self.STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.write_batch(conn, batch)
+        self.counter_db.release_connection()
+
+    def write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[Dict, Future]]):
+        """Write one batch of sales with a single COMMIT and resolve their futures"""
+        cursor = conn.cursor()
+        results = []
+        try:
+            cursor.execute("BEGIN")
+            for sale_data, future in batch:
+                cursor.execute("SAVEPOINT sale")
+                try:
+                    sale_id = self.counter_db.insert_sale(cursor, sale_data)
+                    result = {'success': True, 'sale_id': sale_id}
+                except sqlite3.Error as e:
+                    cursor.execute("ROLLBACK TO sale")
+                    result = {'success': False, 'error': f"Database error: {str(e)}"}
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO sale")
+                    result = {'success': False, 'error': f"System error: {str(e)}"}
+                cursor.execute("RELEASE sale")
+                results.append((future, result))
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            results = [(future, {'success': False, 'error': f"Database error: {str(e)}"})
+                       for _, future in batch]
+            
+        self.batches += 1
+        self.sales += len(batch)
+        for future, result in results:
+            future.set_result(result)
+
     def close(self):
-        """Close the database connection"""
-        self.conn.close()
+        """Write everything already queued, then stop the thread"""
+        if not self.closed:
+            self.closed = True
+            self.queue.put(self.STOP)
+            self.thread.join()
+
+
+PASSWORD_SCHEME = 'pbkdf2_sha256'
+PASSWORD_ITERATIONS = 200000
+
+
+def hash_password(password: str, iterations: int = PASSWORD_ITERATIONS) -> str:
+    """Salted PBKDF2 hash of a counter password, stored as scheme$iterations$salt$hash"""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"{PASSWORD_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def is_password_hash(stored: Optional[str]) -> bool:
+    return bool(stored) and stored.startswith(PASSWORD_SCHEME + '$')
+
+
+def verify_password(password: str, stored: Optional[str]) -> bool:
+    """Check a password against a value written by hash_password"""
+    if not is_password_hash(stored):
+        return False
+    try:
+        _, iterations, salt, digest = stored.split('$')
+        candidate = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'),
+                                        bytes.fromhex(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(candidate.hex(), digest)
+
 
 class CounterDB:
-    def __init__(self, db_name: str = 'Counter.db'):
-        """Initialize the counters database"""
-        self.conn = sqlite3.connect(db_name)
-        self.conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
-        self.cursor = self.conn.cursor()
+    # Never wrapped by QueryStats: they take or rewrite cashier passwords
+    UNTIMED_METHODS = ("add_counter", "update_counter", "authenticate")
+
+    def __init__(self, db_name: str = 'Counter.db', compact_rows: bool = False,
+                 stats: Optional[QueryStats] = None):
+        """Initialize the counters database.
+
+        With compact_rows, sales lists return slotted Sale / SaleItem
+        objects instead of dicts. stats records timings for every public
+        method (see QueryStats).
+        """
+        self.connections = ConnectionManager(db_name, foreign_keys=True)  # Enable foreign key constraints
+        self.compact_rows = compact_rows
+        self.sale_writer = None
+        self.receipt_numbers = ReceiptNumbers(self)
+        self.customer_names = PrefixIndex()
+        self.customer_phones = PrefixIndex()
+        self.customers_loaded = False
+        self.customers_lock = threading.Lock()
+        self.stats = stats
+        if stats:
+            stats.instrument(self)
         self.create_tables()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The calling thread's database connection"""
+        return self.connections.get()
         
     def create_tables(self):
         """Create all necessary tables for counters and sales"""
@@ -269,11 +2279,118 @@ class CounterDB:
             """
             self.conn.execute(sale_items_query)
             
+            # Daily sales rollup, maintained by record_sale
+            summary_exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales_daily_summary'"
+            ).fetchone()
+            summary_query = """
+            CREATE TABLE IF NOT EXISTS sales_daily_summary (
+                sale_date TEXT NOT NULL,
+                counter_id INTEGER NOT NULL,
+                cashier_id INTEGER NOT NULL,
+                sale_count INTEGER NOT NULL DEFAULT 0,
+                revenue REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (sale_date, counter_id, cashier_id)
+            ) WITHOUT ROWID
+            """
+            self.conn.execute(summary_query)
+
+            # Per-counter receipt sequence, handed out in blocks by ReceiptNumbers
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS receipt_sequences (
+                counter_id INTEGER PRIMARY KEY,
+                next_value INTEGER NOT NULL
+            )
+            """)
+
+            # Catalog of closed months moved out by archive_closed_months
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sales_partitions (
+                month TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                first_id INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                sale_count INTEGER NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+
+            # Customers picked in the cashier screen; sales keep a copy of the name
+            customers_exist = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers'"
+            ).fetchone()
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS customers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                name_norm TEXT NOT NULL,
+                phone TEXT NOT NULL DEFAULT '',
+                phone_norm TEXT NOT NULL DEFAULT '',
+                email TEXT NOT NULL DEFAULT '',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+
+            self.create_indexes()
             self.conn.commit()
+
+            # Seed customers from the names typed into earlier sales
+            if not customers_exist:
+                self.backfill_customers()
+
+            # Backfill the rollup for databases created before it existed
+            if not summary_exists:
+                self.rebuild_daily_summary()
         except sqlite3.Error as e:
             print(f"Error creating tables: {e}")
             raise
 
+    def create_indexes(self):
+        """Create lookup indexes for the sales tables.
+
+        Uses IF NOT EXISTS so existing Counter.db files pick the indexes
+        up the next time the application starts.
+        """
+        indexes = [
+            "CREATE INDEX IF NOT EXISTS idx_sales_sale_time ON sales(sale_time)",
+            "CREATE INDEX IF NOT EXISTS idx_sales_cashier_time ON sales(cashier_name, sale_time)",
+            "CREATE INDEX IF NOT EXISTS idx_sales_counter_time ON sales(counter_id, sale_time)",
+            "CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items(sale_id)",
+            "CREATE INDEX IF NOT EXISTS idx_sale_items_product ON sale_items(product_id)",
+            "CREATE INDEX IF NOT EXISTS idx_counters_name_lower ON counters(lower(cashier_name))",
+            "CREATE INDEX IF NOT EXISTS idx_customers_name_norm ON customers(name_norm)",
+            "CREATE INDEX IF NOT EXISTS idx_customers_phone_norm ON customers(phone_norm)",
+        ]
+        for query in indexes:
+            self.conn.execute(query)
+
+    def rebuild_daily_summary(self) -> bool:
+        """Recompute sales_daily_summary from the hot and archived sales"""
+        try:
+            # Read every partition first: ATTACH is not allowed inside the
+            # rebuild transaction
+            rows = []
+            for schemas in self.partition_groups(group_size=1):
+                rows.extend(self.conn.execute(f"""
+                    SELECT DATE(sale_time), counter_id, cashier_id, COUNT(*), SUM(total_amount)
+                    FROM {schemas[0]}.sales
+                    GROUP BY DATE(sale_time), counter_id, cashier_id
+                """))
+            self.conn.execute("DELETE FROM sales_daily_summary")
+            self.conn.executemany("""
+                INSERT INTO sales_daily_summary (sale_date, counter_id, cashier_id, sale_count, revenue)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (sale_date, counter_id, cashier_id) DO UPDATE SET
+                    sale_count = sale_count + excluded.sale_count,
+                    revenue = revenue + excluded.revenue
+            """, rows)
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error rebuilding daily summary: {e}")
+            self.conn.rollback()
+            return False
+
     def add_counter(self, cashier_name: str, cashier_id: int, device_id: str, password: str, status: str = 'active') -> int:
         """Add a new counter to the database"""
         query = """
@@ -281,7 +2398,7 @@ class CounterDB:
         VALUES (?, ?, ?, ?, ?)
         """
         cursor = self.conn.cursor()
-        cursor.execute(query, (cashier_name, cashier_id, device_id, password, status))
+        cursor.execute(query, (cashier_name, cashier_id, device_id, hash_password(password), status))
         self.conn.commit()
         return cursor.lastrowid
 
@@ -300,6 +2417,43 @@ class CounterDB:
         columns = [col[0] for col in cursor.description]
         return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
+    def find_active_counter(self, cashier_name: str) -> Optional[Dict]:
+        """Look up one active counter by cashier name, ignoring case.
+
+        Served by idx_counters_name_lower, so login costs the same however
+        many counters exist. The password column holds the stored hash;
+        check it with verify_password.
+        """
+        cursor = self.conn.execute("""
+            SELECT id, cashier_name, cashier_id, device_id, status, password, created_at
+            FROM counters
+            WHERE lower(cashier_name) = lower(?) AND status = 'active'
+            ORDER BY id
+            LIMIT 1
+        """, (cashier_name,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([col[0] for col in cursor.description], row))
+
+    def authenticate(self, cashier_name: str, password: str) -> Optional[Dict]:
+        """The active counter for a cashier login, or None if the name or password is wrong.
+
+        Counters created before passwords were hashed still hold the
+        plaintext; it is checked as is and replaced by a hash on that
+        counter's first successful login, so startup never hashes them all.
+        """
+        counter = self.find_active_counter(cashier_name)
+        if counter is None:
+            return None
+        stored = counter['password']
+        if is_password_hash(stored):
+            return counter if verify_password(password, stored) else None
+        if not stored or not hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8')):
+            return None
+        self.update_counter(counter['id'], {'password': password})
+        return self.find_active_counter(cashier_name)
+
     def update_counter(self, counter_id: int, updates: Dict) -> bool:
         """Update counter information"""
         allowed_fields = {"cashier_name", "cashier_id", "device_id", "status", "password"}
@@ -309,7 +2463,7 @@ class CounterDB:
         for field, value in updates.items():
             if field in allowed_fields:
                 set_clauses.append(f"{field} = ?")
-                params.append(value)
+                params.append(hash_password(value) if field == "password" else value)
 
         if not set_clauses:
             return False  # No valid fields to update
@@ -322,51 +2476,154 @@ class CounterDB:
         self.conn.commit()
         return cursor.rowcount > 0
 
+    def delete_counter(self, counter_id: int, mode: str = 'delete') -> Dict:
+        """Remove a counter, either deleting its sales or keeping them.
+
+        mode 'delete' removes the counter with every sale, sale item and
+        daily summary row it has, hot and archived, using one set-based
+        DELETE per table. mode 'archive' keeps all of its sales for history
+        and reports and only marks the counter 'archived', which takes it
+        off login and the active counter lists.
+        """
+        if mode not in ('delete', 'archive'):
+            raise ValueError(f"Unknown delete mode: {mode}")
+        if mode == 'archive':
+            archived = self.update_counter(counter_id, {"status": "archived"})
+            return {'success': archived, 'sales': 0}
+
+        counter_sales = "SELECT id FROM {schema}.sales WHERE counter_id = ?"
+        deleted = 0
+        try:
+            # Archives first, each committed on its own: ATTACH is not
+            # allowed inside the transaction that removes the hot rows, and
+            # a rerun after a crash simply finds nothing left to delete.
+            for month, file_name in self.sales_partitions():
+                schema = self.attach_partitions([(month, file_name)])[0]
+                self.conn.execute(
+                    f"DELETE FROM {schema}.sale_items WHERE sale_id IN ({counter_sales.format(schema=schema)})",
+                    (counter_id,))
+                removed = self.conn.execute(
+                    f"DELETE FROM {schema}.sales WHERE counter_id = ?", (counter_id,)).rowcount
+                if removed:
+                    self.conn.execute(
+                        "UPDATE sales_partitions SET sale_count = sale_count - ? WHERE month = ?",
+                        (removed, month))
+                self.conn.commit()
+                deleted += removed
+
+            self.conn.execute(
+                f"DELETE FROM sale_items WHERE sale_id IN ({counter_sales.format(schema='main')})",
+                (counter_id,))
+            deleted += self.conn.execute("DELETE FROM sales WHERE counter_id = ?", (counter_id,)).rowcount
+            self.conn.execute("DELETE FROM sales_daily_summary WHERE counter_id = ?", (counter_id,))
+            self.conn.execute("DELETE FROM receipt_sequences WHERE counter_id = ?", (counter_id,))
+            removed = self.conn.execute("DELETE FROM counters WHERE id = ?", (counter_id,)).rowcount
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Error deleting counter: {e}")
+            return {'success': False, 'error': str(e), 'sales': deleted}
+        return {'success': removed > 0, 'sales': deleted}
+
+    def backfill_customers(self) -> int:
+        """Create a customer for every distinct name in the hot and archived sales"""
+        names = {}
+        for schemas in self.partition_groups(group_size=1):
+            for (name,) in self.conn.execute(
+                f"SELECT DISTINCT customer_name FROM {schemas[0]}.sales WHERE customer_name <> ''"
+            ):
+                names.setdefault(normalize_customer_name(name), " ".join(name.split()))
+        names.pop("", None)
+        self.conn.executemany("INSERT INTO customers (name, name_norm) VALUES (?, ?)",
+                              [(name, norm) for norm, name in sorted(names.items())])
+        self.conn.commit()
+        return len(names)
+
+    def add_customer(self, name: str, phone: str = '', email: str = '') -> int:
+        """Add a customer and return its id"""
+        name = " ".join(name.split())
+        name_norm = normalize_customer_name(name)
+        if not name_norm:
+            raise ValueError("Customer name is required")
+        phone_norm = normalize_phone(phone)
+        # Under the lock so a concurrent load_customer_index sees the row or gets it added, not both
+        with self.customers_lock:
+            cursor = self.conn.execute(
+                "INSERT INTO customers (name, name_norm, phone, phone_norm, email) VALUES (?, ?, ?, ?, ?)",
+                (name, name_norm, phone.strip(), phone_norm, email.strip())
+            )
+            self.conn.commit()
+            if self.customers_loaded:
+                self.customer_names.add(name_norm, cursor.lastrowid)
+                if phone_norm:
+                    self.customer_phones.add(phone_norm, cursor.lastrowid)
+        return cursor.lastrowid
+
+    def get_customers(self, customer_ids: List[int]) -> List[Dict]:
+        """Customers by id, in the order the ids were given"""
+        if not customer_ids:
+            return []
+        cursor = self.conn.execute(
+            f"SELECT id, name, phone, email, created_at FROM customers "
+            f"WHERE id IN ({', '.join('?' * len(customer_ids))})",
+            customer_ids
+        )
+        columns = [col[0] for col in cursor.description]
+        rows = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+        return [rows[customer_id] for customer_id in customer_ids if customer_id in rows]
+
+    def find_customers(self, name: str = '', phone: str = '') -> List[Dict]:
+        """Customers whose normalised name and/or phone match exactly"""
+        cursor = self.conn.execute("""
+            SELECT id, name, phone, email, created_at FROM customers
+            WHERE (?1 = '' OR name_norm = ?1) AND (?2 = '' OR phone_norm = ?2)
+            ORDER BY id
+        """, (normalize_customer_name(name), normalize_phone(phone)))
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def load_customer_index(self):
+        """Read every customer name and phone into the in-memory prefix indexes"""
+        with self.customers_lock:
+            if self.customers_loaded:
+                return
+            # Both scans read a covering index, so rows arrive sorted
+            self.customer_names.load(self.conn.execute(
+                "SELECT name_norm, id FROM customers ORDER BY name_norm, id"))
+            self.customer_phones.load(self.conn.execute(
+                "SELECT phone_norm, id FROM customers WHERE phone_norm <> '' ORDER BY phone_norm, id"))
+            self.customers_loaded = True
+
+    def suggest_customers(self, text: str, limit: int = 8) -> List[Dict]:
+        """Autocomplete customers from what has been typed so far.
+
+        Text made of digits and phone punctuation matches phone numbers,
+        anything else matches names. Once load_customer_index has run the
+        in-memory prefix indexes answer; until then the same prefix is
+        read as a range of the customers indexes.
+        """
+        phone = normalize_phone(text)
+        if phone and not text.strip(" +-()0123456789"):
+            column, index, prefix = "phone_norm", self.customer_phones, phone
+        else:
+            column, index, prefix = "name_norm", self.customer_names, normalize_customer_name(text)
+            if not prefix:
+                return []
+        if self.customers_loaded:
+            customer_ids = index.search(prefix, limit)
+        else:
+            customer_ids = [row[0] for row in self.conn.execute(
+                f"SELECT id FROM customers WHERE {column} >= ? AND {column} < ? ORDER BY {column}, id LIMIT ?",
+                (prefix, prefix + "\U0010ffff", limit)
+            )]
+        return self.get_customers(customer_ids)
+
     def record_sale(self, sale_data: Dict) -> Dict:
         """Record a new sale in the database with proper error handling"""
         cursor = self.conn.cursor()
         
         try:
-            # Insert sale record
-            sale_query = """
-            INSERT INTO sales (
-                receipt_id, counter_id, cashier_id, cashier_name,
-                customer_name, total_amount, payment_method, sale_time
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            cursor.execute(sale_query, (
-                sale_data['receipt_id'],
-                sale_data['counter_id'],
-                sale_data['cashier_id'],
-                sale_data['cashier_name'],
-                sale_data.get('customer_name', ''),
-                sale_data['total_amount'],
-                sale_data.get('payment_method', 'cash'),
-                sale_data.get('sale_time', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            ))
-            sale_id = cursor.lastrowid
-            
-            # Insert sale items
-            items_query = """
-            INSERT INTO sale_items (
-                sale_id, product_id, product_name, 
-                quantity, unit_price, total_price
-            ) VALUES (?, ?, ?, ?, ?, ?)
-            """
-            
-            for item in sale_data['items']:
-                if not all(key in item for key in ['product_id', 'product_name', 'quantity', 'unit_price', 'total_price']):
-                    raise ValueError("Invalid item data structure")
-                    
-                cursor.execute(items_query, (
-                    sale_id,
-                    item['product_id'],
-                    item['product_name'],
-                    item['quantity'],
-                    item['unit_price'],
-                    item['total_price']
-                ))
-            
+            sale_id = self.insert_sale(cursor, sale_data)
             self.conn.commit()
             return {'success': True, 'sale_id': sale_id}
             
@@ -377,33 +2634,310 @@ class CounterDB:
             self.conn.rollback()
             return {'success': False, 'error': f"System error: {str(e)}"}
     
-    def get_sales_history(self, filters: Dict = None) -> List[Dict]:
-        """Get sales history with optional filters"""
-        base_query = """
-        SELECT 
-            s.id, 
-            s.receipt_id, 
-            s.counter_id,
-            s.cashier_id, 
-            s.cashier_name, 
-            s.customer_name, 
-            s.total_amount, 
-            s.payment_method,
-            s.sale_time
-        FROM sales s
+    def next_receipt_id(self, counter_id: int) -> str:
+        """Allocate a unique receipt ID for a sale on this counter"""
+        return self.receipt_numbers.next_id(counter_id)
+
+    def enable_group_commit(self, max_batch: int = 100, max_delay: float = 0) -> SaleWriter:
+        """Start the background SaleWriter used by record_sale_async (opt-in)"""
+        if self.sale_writer is None:
+            self.sale_writer = SaleWriter(self, max_batch, max_delay)
+        return self.sale_writer
+
+    def record_sale_async(self, sale_data: Dict) -> Future:
+        """Record a sale through the group-commit writer when enabled.
+
+        Without enable_group_commit the sale is written immediately and the
+        returned future is already resolved.
+        """
+        if self.sale_writer is not None:
+            return self.sale_writer.submit(sale_data)
+        future = Future()
+        future.set_result(self.record_sale(sale_data))
+        return future
+
+    @staticmethod
+    def insert_sale(cursor: sqlite3.Cursor, sale_data: Dict, schema: str = "main") -> int:
+        """Write a sale header, its items and the daily summary row without committing.
+
+        schema names the database holding the sales tables on the cursor's
+        connection, so InventoryDB.checkout can write them through an ATTACH.
+        Returns the new sale id.
+        """
+        sale_time = sale_data.get('sale_time', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        
+        # Insert sale record
+        sale_query = f"""
+        INSERT INTO {schema}.sales (
+            receipt_id, counter_id, cashier_id, cashier_name,
+            customer_name, total_amount, payment_method, sale_time
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        cursor.execute(sale_query, (
+            sale_data['receipt_id'],
+            sale_data['counter_id'],
+            sale_data['cashier_id'],
+            sale_data['cashier_name'],
+            sale_data.get('customer_name', ''),
+            sale_data['total_amount'],
+            sale_data.get('payment_method', 'cash'),
+            sale_time
+        ))
+        sale_id = cursor.lastrowid
+        
+        # Insert sale items
+        items_query = f"""
+        INSERT INTO {schema}.sale_items (
+            sale_id, product_id, product_name, 
+            quantity, unit_price, total_price
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        """
+        
+        for item in sale_data['items']:
+            if not all(key in item for key in ['product_id', 'product_name', 'quantity', 'unit_price', 'total_price']):
+                raise ValueError("Invalid item data structure")
+                
+        cursor.executemany(items_query, [(
+            sale_id,
+            item['product_id'],
+            item['product_name'],
+            item['quantity'],
+            item['unit_price'],
+            item['total_price']
+        ) for item in sale_data['items']])
+        
+        # Roll the sale into the daily summary in the same transaction
+        cursor.execute(f"""
+            INSERT INTO {schema}.sales_daily_summary (sale_date, counter_id, cashier_id, sale_count, revenue)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (sale_date, counter_id, cashier_id) DO UPDATE SET
+                sale_count = sale_count + 1,
+                revenue = revenue + excluded.revenue
+        """, (
+            sale_time[:10],
+            sale_data['counter_id'],
+            sale_data['cashier_id'],
+            sale_data['total_amount']
+        ))
+        return sale_id
+
+    def archive_closed_months(self, keep_from: Optional[str] = None, vacuum: bool = False,
+                              dry_run: bool = False) -> Dict:
+        """Move sales from closed months into monthly sales_YYYY_MM.db archives.
+
+        Every month before keep_from (YYYY-MM, default the current month) is
+        copied into its own file next to Counter.db, listed in
+        sales_partitions and deleted from the hot tables, so the hot database
+        only holds the open month. sales_daily_summary stays hot and keeps
+        covering archived days. The copy is committed before the delete and
+        skips rows already archived, so rerunning after a crash is safe.
+        vacuum shrinks the hot file afterwards. dry_run only reports what
+        would move: {'success', 'months', 'sales', 'counts': {month: sales}}.
+        """
+        keep_from = keep_from or datetime.now().strftime("%Y-%m")
+        counts = dict(self.conn.execute(
+            "SELECT substr(sale_time, 1, 7), COUNT(*) FROM sales WHERE sale_time < ? GROUP BY 1 ORDER BY 1",
+            (f"{keep_from}-01",)
+        ).fetchall())
+        months = list(counts)
+        if dry_run:
+            return {'success': True, 'months': months, 'sales': sum(counts.values()), 'counts': counts}
+        archived = []
+        moved = 0
+        try:
+            for month in months:
+                start, end = month_bounds(month)
+                file_name = partition_schema(month) + ".db"
+                schema = self.attach_partitions([(month, file_name)])[0]
+                self.create_archive_tables(schema)
+                in_month = "SELECT id FROM main.sales WHERE sale_time >= ? AND sale_time < ?"
+
+                self.conn.execute(f"""
+                    INSERT OR IGNORE INTO {schema}.sales ({SALES_COLUMNS})
+                    SELECT {SALES_COLUMNS} FROM main.sales WHERE sale_time >= ? AND sale_time < ?
+                """, (start, end))
+                self.conn.execute(f"""
+                    INSERT OR IGNORE INTO {schema}.sale_items ({SALE_ITEM_COLUMNS})
+                    SELECT {SALE_ITEM_COLUMNS} FROM main.sale_items WHERE sale_id IN ({in_month})
+                """, (start, end))
+                self.conn.commit()
+
+                first_id, last_id, count = self.conn.execute(
+                    f"SELECT MIN(id), MAX(id), COUNT(*) FROM {schema}.sales"
+                ).fetchone()
+                self.conn.execute(f"DELETE FROM main.sale_items WHERE sale_id IN ({in_month})", (start, end))
+                moved += self.conn.execute(
+                    "DELETE FROM main.sales WHERE sale_time >= ? AND sale_time < ?", (start, end)
+                ).rowcount
+                self.conn.execute("""
+                    INSERT INTO sales_partitions (month, file_name, first_id, last_id, sale_count)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (month) DO UPDATE SET
+                        first_id = excluded.first_id,
+                        last_id = excluded.last_id,
+                        sale_count = excluded.sale_count,
+                        archived_at = CURRENT_TIMESTAMP
+                """, (month, file_name, first_id, last_id, count))
+                self.conn.commit()
+                archived.append(month)
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Error archiving sales: {e}")
+            return {'success': False, 'error': str(e), 'months': archived, 'sales': moved}
+
+        if vacuum and archived:
+            self.conn.execute("VACUUM")
+        return {'success': True, 'months': archived, 'sales': moved}
+
+    def create_archive_tables(self, schema: str):
+        """Create the sales tables and lookup indexes in an attached archive"""
+        self.conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.sales (
+            id INTEGER PRIMARY KEY,
+            receipt_id TEXT NOT NULL UNIQUE,
+            counter_id INTEGER NOT NULL,
+            cashier_id INTEGER NOT NULL,
+            cashier_name TEXT NOT NULL,
+            customer_name TEXT,
+            total_amount REAL NOT NULL,
+            payment_method TEXT DEFAULT 'cash',
+            sale_time TIMESTAMP
+        )
+        """)
+        self.conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.sale_items (
+            id INTEGER PRIMARY KEY,
+            sale_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            product_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            total_price REAL NOT NULL
+        )
+        """)
+        indexes = [
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_sales_sale_time ON sales(sale_time)",
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_sales_cashier_time ON sales(cashier_name, sale_time)",
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_sales_counter_time ON sales(counter_id, sale_time)",
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_sale_items_sale ON sale_items(sale_id)",
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_sale_items_product ON sale_items(product_id)",
+        ]
+        for query in indexes:
+            self.conn.execute(query)
+
+    def sales_partitions(self, first_month: Optional[str] = None,
+                         last_month: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Archived (month, file_name) pairs between two YYYY-MM months inclusive, newest first"""
+        return self.conn.execute("""
+            SELECT month, file_name FROM sales_partitions
+            WHERE (?1 IS NULL OR month >= ?1) AND (?2 IS NULL OR month <= ?2)
+            ORDER BY month DESC
+        """, (first_month, last_month)).fetchall()
+
+    def attach_limit(self) -> int:
+        """How many databases this connection may have attached at once"""
+        return self.conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+    def attach_partitions(self, partitions: List[Tuple[str, str]]) -> List[str]:
+        """ATTACH archive partitions to this thread's connection and return their schemas.
+
+        Partitions stay attached for later queries; when the connection's
+        ATTACH limit would be exceeded the ones not requested are detached.
+        Entries whose file_name is None stand for the hot database ('main').
+        """
+        attached = {row[1] for row in self.conn.execute("PRAGMA database_list")} - {"main", "temp"}
+        schemas = ["main" if file_name is None else partition_schema(month)
+                   for month, file_name in partitions]
+        missing = [(schema, file_name) for schema, (_, file_name) in zip(schemas, partitions)
+                   if file_name is not None and schema not in attached]
+        if len(attached) + len(missing) > self.attach_limit():
+            for schema in attached.difference(schemas):
+                self.conn.execute(f"DETACH DATABASE {schema}")
+        folder = os.path.dirname(os.path.abspath(self.connections.db_name))
+        for schema, file_name in missing:
+            self.conn.execute(f"ATTACH DATABASE ? AS {schema}", (os.path.join(folder, file_name),))
+        return schemas
+
+    def partition_groups(self, first_month: Optional[str] = None, last_month: Optional[str] = None,
+                         group_size: Optional[int] = None, newest_first: bool = True) -> Iterator[List[str]]:
+        """Yield the schemas holding sales between two YYYY-MM months, attached in groups.
+
+        The hot database ('main') comes first (last when newest_first is
+        False), then every overlapping archive. Groups hold at most
+        group_size schemas, by default as many as can be attached at once.
+        Partitions are whole closed months older than the hot rows, so
+        concatenating per-group results that are sorted by sale_time keeps
+        the overall order. Nothing is attached for groups never reached.
+        """
+        sources = [(None, None)] + self.sales_partitions(first_month, last_month)
+        if not newest_first:
+            sources.reverse()
+        group_size = group_size or self.attach_limit()
+        for i in range(0, len(sources), group_size):
+            yield self.attach_partitions(sources[i:i + group_size])
+
+    @staticmethod
+    def sales_source(schemas: List[str], table: str = "sales") -> str:
+        """FROM-clause source reading a sales table across a group of schemas"""
+        if len(schemas) == 1:
+            return f"{schemas[0]}.{table}"
+        columns = SALES_COLUMNS if table == "sales" else SALE_ITEM_COLUMNS
+        return "(" + " UNION ALL ".join(
+            f"SELECT {columns} FROM {schema}.{table}" for schema in schemas
+        ) + ")"
+
+    def query_sales(self, build_query, first_month: Optional[str] = None,
+                    last_month: Optional[str] = None, limit: Optional[int] = None,
+                    after: Optional[Tuple] = None) -> List[Dict]:
+        """Run a newest-first sales list over the hot and archived partitions.
+
+        build_query(source, limit) returns the SQL and parameters reading
+        sales from `source`; it is run once per partition group, UNIONing
+        only the months that overlap first_month..last_month, until `limit`
+        rows are collected. A keyset `after` also rules out newer months.
+        """
+        if after is not None and (last_month is None or _month_of(after[0]) < last_month):
+            last_month = _month_of(after[0])
+        sales = []
+        for schemas in self.partition_groups(first_month, last_month):
+            remaining = None if limit is None else limit - len(sales)
+            query, params = build_query(self.sales_source(schemas), remaining)
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            sales.extend(self.fetch_sales(cursor))
+            if limit is not None and len(sales) >= limit:
+                break
+        return sales
+
+    def query_partitions(self, query: str, params: List, first_month: Optional[str] = None,
+                         last_month: Optional[str] = None) -> List[Dict]:
+        """Run a query once per partition overlapping the months and concatenate the rows.
+
+        `query` names its tables as {schema}.sales / {schema}.sale_items.
+        Used for GROUP BY queries, which are cheaper against each partition's
+        own indexes than over a UNION.
         """
+        rows = []
+        cursor = self.conn.cursor()
+        for schemas in self.partition_groups(first_month, last_month, group_size=1):
+            cursor.execute(query.format(schema=schemas[0]), params)
+            columns = [col[0] for col in cursor.description]
+            rows.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+        return rows
+
+    def sales_where_clause(self, filters: Optional[Dict]) -> Tuple[str, List]:
+        """Build the WHERE clause and parameters for sales history filters"""
+        where_clauses = []
         params = []
         
         if filters:
-            where_clauses = []
-            
-            # Date range filter
+            # Date range filter (half-open so the sale_time index is usable)
             if filters.get('start_date'):
-                where_clauses.append("DATE(s.sale_time) >= ?")
+                where_clauses.append("s.sale_time >= ?")
                 params.append(filters['start_date'])
             if filters.get('end_date'):
-                where_clauses.append("DATE(s.sale_time) <= ?")
-                params.append(filters['end_date'])
+                where_clauses.append("s.sale_time < ?")
+                params.append(_day_bounds(filters['end_date'])[1])
                 
             # Counter filter
             if filters.get('counter_id'):
@@ -414,45 +2948,129 @@ class CounterDB:
             if filters.get('cashier_id'):
                 where_clauses.append("s.cashier_id = ?")
                 params.append(filters['cashier_id'])
+            if filters.get('cashier_name'):
+                where_clauses.append("s.cashier_name = ?")
+                params.append(filters['cashier_name'])
                 
-            if where_clauses:
-                base_query += " WHERE " + " AND ".join(where_clauses)
-        
-        base_query += " ORDER BY s.sale_time DESC"
-        
-        cursor = self.conn.cursor()
-        cursor.execute(base_query, params)
+        if not where_clauses:
+            return "", params
+        return " WHERE " + " AND ".join(where_clauses), params
+
+    def sales_page_sql(self, where_sql: str, params: List, limit: Optional[int] = None,
+                       after: Optional[Tuple] = None, alias: str = "") -> str:
+        """Add keyset paging and newest-first ordering to a sales WHERE clause.
+
+        `after` is the sale_page_key() of the last sale already fetched.
+        The (sale_time, id) comparison walks the sale_time indexes instead
+        of skipping rows with OFFSET.
+        """
+        col = f"{alias}." if alias else ""
+        if after is not None:
+            where_sql += " AND " if where_sql else " WHERE "
+            where_sql += f"({col}sale_time, {col}id) < (?, ?)"
+            params.extend(after)
+        where_sql += f" ORDER BY {col}sale_time DESC, {col}id DESC"
+        if limit is not None:
+            where_sql += " LIMIT ?"
+            params.append(limit)
+        return where_sql
+
+    @staticmethod
+    def sale_page_key(sale: Dict) -> Tuple:
+        """Keyset position of a sale returned by the sales list queries"""
+        return (sale['sale_time'], sale['id'])
+
+    def get_sales_history(self, filters: Dict = None, limit: Optional[int] = None,
+                          after: Optional[Tuple] = None) -> List[Dict]:
+        """Get sales history with optional filters, optionally one page at a time.
+
+        Archived months are read only when they overlap the date filters.
+        """
+        def build_query(source, remaining):
+            base_query = f"""
+            SELECT 
+                s.id, 
+                s.receipt_id, 
+                s.counter_id,
+                s.cashier_id, 
+                s.cashier_name, 
+                s.customer_name, 
+                s.total_amount, 
+                s.payment_method,
+                s.sale_time
+            FROM {source} s
+            """
+            where_sql, params = self.sales_where_clause(filters)
+            return base_query + self.sales_page_sql(where_sql, params, remaining, after, alias="s"), params
+
+        filters = filters or {}
+        return self.query_sales(build_query, _month_of(filters.get('start_date')),
+                                _month_of(filters.get('end_date')), limit, after)
+
+    def iter_sales_history(self, filters: Dict = None, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+        """Generator variant of get_sales_history"""
+        return iter_pages(lambda **page: self.get_sales_history(filters, **page),
+                          self.sale_page_key, page_size)
         
+    def fetch_sales(self, cursor: sqlite3.Cursor) -> List[Dict]:
+        """Fetch the rows of an executed sales query as dicts or Sale objects"""
+        if self.compact_rows:
+            cursor.row_factory = Sale.row_factory
+            return cursor.fetchall()
         columns = [col[0] for col in cursor.description]
         return [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
+
     def get_sale_details(self, sale_id):
-        """Get detailed information about a specific sale"""
+        """Get detailed information about a specific sale.
+
+        Sales not in the hot tables are looked up in the archives whose
+        id range covers sale_id.
+        """
         try:
             # Get sale header
-            header_query = """
-            SELECT 
-                id, receipt_id, cashier_name, customer_name,
-                total_amount, payment_method, sale_time
-            FROM sales
-            WHERE id = ?
-            """
-            self.cursor.execute(header_query, (sale_id,))
-            header = self.cursor.fetchone()
+            candidates = [(None, None)] + self.conn.execute("""
+                SELECT month, file_name FROM sales_partitions
+                WHERE ? BETWEEN first_id AND last_id
+                ORDER BY month DESC
+            """, (sale_id,)).fetchall()
+            cursor = self.conn.cursor()
+            for partition in candidates:
+                schema = self.attach_partitions([partition])[0]
+                header_query = f"""
+                SELECT 
+                    id, receipt_id, cashier_name, customer_name,
+                    total_amount, payment_method, sale_time
+                FROM {schema}.sales
+                WHERE id = ?
+                """
+                cursor.execute(header_query, (sale_id,))
+                header = cursor.fetchone()
+                if header:
+                    break
             
             if not header:
                 return None
                 
             # Get sale items
-            items_query = """
+            items_query = f"""
             SELECT 
                 product_id, product_name, quantity, 
                 unit_price, total_price
-            FROM sale_items
+            FROM {schema}.sale_items
             WHERE sale_id = ?
             """
-            self.cursor.execute(items_query, (sale_id,))
-            items = self.cursor.fetchall()
+            if self.compact_rows:
+                cursor.row_factory = SaleItem.row_factory
+            cursor.execute(items_query, (sale_id,))
+            items = cursor.fetchall()
+            if not self.compact_rows:
+                items = [{
+                    'product_id': item[0],
+                    'product_name': item[1],
+                    'quantity': item[2],
+                    'unit_price': item[3],
+                    'total_price': item[4]
+                } for item in items]
             
             return {
                 'id': header[0],
@@ -462,112 +3080,332 @@ class CounterDB:
                 'total_amount': header[4],
                 'payment_method': header[5],
                 'sale_time': header[6],
-                'items': [{
-                    'product_id': item[0],
-                    'product_name': item[1],
-                    'quantity': item[2],
-                    'unit_price': item[3],
-                    'total_price': item[4]
-                } for item in items]
+                'items': items
             }
             
         except Exception as e:
             print(f"Error getting sale details: {e}")
             return None
     
-    def get_transactions_for_counter(self, counter_id):
-        """Get all transactions for a specific counter"""
-        query = """
-        SELECT id, receipt_id, customer_name, total_amount, sale_time
-        FROM sales
-        WHERE counter_id = ?
-        ORDER BY sale_time DESC
-        """
-        cursor = self.conn.cursor()
-        cursor.execute(query, (counter_id,))
-        
-        columns = [col[0] for col in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    def get_transactions_for_counter(self, counter_id, limit=None, after=None):
+        """Get all transactions for a specific counter, optionally one page at a time"""
+        def build_query(source, remaining):
+            params = [counter_id]
+            query = f"""
+            SELECT id, receipt_id, customer_name, total_amount, sale_time
+            FROM {source}
+            """ + self.sales_page_sql(" WHERE counter_id = ?", params, remaining, after)
+            return query, params
+
+        return self.query_sales(build_query, limit=limit, after=after)
+
+    def iter_transactions_for_counter(self, counter_id, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+        """Generator variant of get_transactions_for_counter"""
+        return iter_pages(lambda **page: self.get_transactions_for_counter(counter_id, **page),
+                          self.sale_page_key, page_size)
     
     def get_sales_by_date(self, date):
         """Get all sales for a specific date (YYYY-MM-DD format)"""
         try:
-            query = """
-                SELECT 
-                    id, 
-                    receipt_id, 
-                    customer_name, 
-                    total_amount, 
-                    sale_time, 
-                    cashier_name
-                FROM sales
-                WHERE DATE(sale_time) = ?
-                ORDER BY sale_time DESC
-            """
-            self.cursor.execute(query, (date,))
-            
-            columns = [col[0] for col in self.cursor.description]
-            return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+            def build_query(source, remaining):
+                query = f"""
+                    SELECT 
+                        id, 
+                        receipt_id, 
+                        customer_name, 
+                        total_amount, 
+                        sale_time, 
+                        cashier_name
+                    FROM {source}
+                    WHERE sale_time >= ? AND sale_time < ?
+                    ORDER BY sale_time DESC
+                """
+                return query, _day_bounds(date)
+
+            return self.query_sales(build_query, _month_of(date), _month_of(date))
         except Exception as e:
             print(f"Error getting sales by date: {e}")
             return []
 
-    def get_all_sales(self):
-        """Get all sales records with consistent return format"""
+    def get_all_sales(self, limit=None, after=None):
+        """Get all sales records with consistent return format, optionally one page at a time"""
         try:
-            query = """
-                SELECT 
-                    id,
-                    receipt_id,
-                    customer_name,
-                    total_amount,
-                    sale_time,
-                    cashier_name
-                FROM sales
-                ORDER BY sale_time DESC
-            """
-            self.cursor.execute(query)
-            
-            columns = [col[0] for col in self.cursor.description]
-            return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+            def build_query(source, remaining):
+                params = []
+                query = f"""
+                    SELECT 
+                        id,
+                        receipt_id,
+                        customer_name,
+                        total_amount,
+                        sale_time,
+                        cashier_name
+                    FROM {source}
+                """ + self.sales_page_sql("", params, remaining, after)
+                return query, params
+
+            return self.query_sales(build_query, limit=limit, after=after)
         except Exception as e:
             print(f"Error getting all sales: {e}")
             return []
+
+    def iter_all_sales(self, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+        """Generator variant of get_all_sales"""
+        return iter_pages(self.get_all_sales, self.sale_page_key, page_size)
     
-    def get_sales_by_cashier(self, cashier_name):
-        """Get all sales records for a specific cashier with all needed fields"""
+    def get_sales_by_cashier(self, cashier_name, limit=None, after=None, search=None):
+        """Get all sales records for a specific cashier with all needed fields.
+
+        search narrows the list to receipt IDs or customer names containing
+        the text; limit/after fetch one page at a time.
+        """
         try:
-            self.cursor.execute("""
-                SELECT 
-                    id, receipt_id, customer_name, total_amount, sale_time
-                FROM sales
-                WHERE cashier_name = ?
-                ORDER BY sale_time DESC
-            """, (cashier_name,))
-            
-            columns = [col[0] for col in self.cursor.description]
-            return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+            def build_query(source, remaining):
+                params = [cashier_name]
+                where_sql = " WHERE cashier_name = ?"
+                if search:
+                    where_sql += " AND (receipt_id LIKE ? OR customer_name LIKE ?)"
+                    params.extend([f"%{search}%", f"%{search}%"])
+                query = f"""
+                    SELECT 
+                        id, receipt_id, customer_name, total_amount, sale_time
+                    FROM {source}
+                """ + self.sales_page_sql(where_sql, params, remaining, after)
+                return query, params
+
+            return self.query_sales(build_query, limit=limit, after=after)
         except Exception as e:
             print(f"Error getting sales by cashier: {e}")
             return []
+
+    def iter_sales_by_cashier(self, cashier_name, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+        """Generator variant of get_sales_by_cashier"""
+        return iter_pages(lambda **page: self.get_sales_by_cashier(cashier_name, **page),
+                          self.sale_page_key, page_size)
         
     def get_sales_by_date_and_cashier(self, date, cashier_name):
         """Get sales for specific date and cashier"""
         try:
-            self.cursor.execute("""
-                SELECT 
-                    id, receipt_id, customer_name, total_amount, sale_time
-                FROM sales
-                WHERE DATE(sale_time) = ? AND cashier_name = ?
-                ORDER BY sale_time DESC
-            """, (date, cashier_name))
-            
-            columns = [col[0] for col in self.cursor.description]
-            return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+            def build_query(source, remaining):
+                query = f"""
+                    SELECT 
+                        id, receipt_id, customer_name, total_amount, sale_time
+                    FROM {source}
+                    WHERE cashier_name = ? AND sale_time >= ? AND sale_time < ?
+                    ORDER BY sale_time DESC
+                """
+                return query, (cashier_name, *_day_bounds(date))
+
+            return self.query_sales(build_query, _month_of(date), _month_of(date))
         except Exception as e:
             print(f"Error getting sales by date and cashier: {e}")
             return []
 
+    def get_daily_sales_summary(self, start_date: str, end_date: str,
+                                counter_id: Optional[int] = None,
+                                cashier_id: Optional[int] = None) -> List[Dict]:
+        """Get per-day sale count and revenue from the rollup table (YYYY-MM-DD, inclusive)"""
+        query = """
+            SELECT sale_date, SUM(sale_count) AS sale_count, SUM(revenue) AS revenue
+            FROM sales_daily_summary
+            WHERE sale_date BETWEEN ? AND ?
+        """
+        params = [start_date, end_date]
+        
+        if counter_id is not None:
+            query += " AND counter_id = ?"
+            params.append(counter_id)
+        if cashier_id is not None:
+            query += " AND cashier_id = ?"
+            params.append(cashier_id)
+            
+        query += " GROUP BY sale_date ORDER BY sale_date"
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_counter_sales_summary(self, start_date: str, end_date: str) -> List[Dict]:
+        """Get sale count and revenue per counter from the rollup table (YYYY-MM-DD, inclusive)"""
+        query = """
+            SELECT counter_id, SUM(sale_count) AS sale_count, SUM(revenue) AS revenue
+            FROM sales_daily_summary
+            WHERE sale_date BETWEEN ? AND ?
+            GROUP BY counter_id
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(query, (start_date, end_date))
+        
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    # Grouping expressions for get_sales_totals: group_by -> (key expression, group clause)
+    SALES_TOTALS_GROUPS = {
+        'day': ("DATE(s.sale_time)", "DATE(s.sale_time)"),
+        'hour': ("CAST(strftime('%H', s.sale_time) AS INTEGER)", "strftime('%H', s.sale_time)"),
+        'counter': ("s.counter_id", "s.counter_id"),
+        'cashier': ("s.cashier_name", "s.cashier_name"),
+        'payment_method': ("s.payment_method", "s.payment_method"),
+        'product': ("i.product_id", "i.product_id"),
+    }
+
+    def get_sales_totals(self, start_date: str, end_date: str, group_by: str = 'day',
+                         counter_id: Optional[int] = None,
+                         cashier_name: Optional[str] = None) -> List[Dict]:
+        """Get sale count and revenue grouped in SQL for a date range (YYYY-MM-DD, inclusive).
+
+        group_by is one of day, hour, counter, cashier, payment_method or product.
+        Every row has 'key', 'sale_count' and 'revenue'; product rows also carry
+        'product_name' and 'quantity' and are ordered by quantity sold (ties by id).
+        """
+        if group_by not in self.SALES_TOTALS_GROUPS:
+            raise ValueError(f"Unsupported group_by: {group_by}")
+        key_expr, group_expr = self.SALES_TOTALS_GROUPS[group_by]
+        
+        if group_by == 'product':
+            query = f"""
+                SELECT {key_expr} AS key,
+                       i.product_name,
+                       COUNT(DISTINCT s.id) AS sale_count,
+                       SUM(i.total_price) AS revenue,
+                       SUM(i.quantity) AS quantity
+                FROM {{schema}}.sales s
+                JOIN {{schema}}.sale_items i ON i.sale_id = s.id
+            """
+        else:
+            query = f"""
+                SELECT {key_expr} AS key,
+                       COUNT(*) AS sale_count,
+                       SUM(s.total_amount) AS revenue
+                FROM {{schema}}.sales s
+            """
+        
+        query += " WHERE s.sale_time >= ? AND s.sale_time < ?"
+        params = list(_day_bounds(start_date, end_date))
+        archived = self.sales_partitions(_month_of(start_date), _month_of(end_date))
+        
+        if counter_id is not None:
+            query += " AND s.counter_id = ?"
+            params.append(counter_id)
+        if cashier_name is not None:
+            query += " AND s.cashier_name = ?"
+            params.append(cashier_name)
+            
+        query += f" GROUP BY {group_expr}"
+        query += " ORDER BY quantity DESC, key" if group_by == 'product' else " ORDER BY key"
+        
+        rows = self.query_partitions(query, params, _month_of(start_date), _month_of(end_date))
+        if archived:
+            # Each archived month was grouped on its own; fold matching keys together
+            if group_by == 'product':
+                rows = _merge_totals(rows, 'key', ('sale_count', 'revenue', 'quantity'))
+                rows.sort(key=lambda row: (-row['quantity'], row['key']))
+            else:
+                rows = _merge_totals(rows, 'key', ('sale_count', 'revenue'))
+                rows.sort(key=lambda row: (row['key'] is not None, row['key']))
+        return rows
+
+    def get_product_quantities(self, start_date: str, end_date: str,
+                               cashier_name: Optional[str] = None,
+                               limit: Optional[int] = None) -> List[Dict]:
+        """Get total quantity sold per product for a date range in a single query per partition"""
+        query = """
+            SELECT i.product_id, i.product_name, SUM(i.quantity) AS quantity
+            FROM {schema}.sales s
+            JOIN {schema}.sale_items i ON i.sale_id = s.id
+            WHERE s.sale_time >= ? AND s.sale_time < ?
+        """
+        params = list(_day_bounds(start_date, end_date))
+        archived = self.sales_partitions(_month_of(start_date), _month_of(end_date))
+        
+        if cashier_name is not None:
+            query += " AND s.cashier_name = ?"
+            params.append(cashier_name)
+            
+        query += " GROUP BY i.product_id ORDER BY quantity DESC, i.product_id"
+        if limit is not None and not archived:
+            query += " LIMIT ?"
+            params.append(limit)
+            
+        rows = self.query_partitions(query, params, _month_of(start_date), _month_of(end_date))
+        if archived:
+            rows = _merge_totals(rows, 'product_id', ('quantity',))
+            rows.sort(key=lambda row: (-row['quantity'], row['product_id']))
+            rows = rows[:limit]
+        return rows
+
+    def export_sales(self, path: str, filters: Optional[Dict] = None, progress=None) -> int:
+        """Stream sales with their items to CSV or (gzipped) JSONL.
+
+        Accepts the same filters as get_sales_history. CSV gets one row per
+        sale item; JSONL gets one object per sale with an 'items' list.
+        Rows are fetched EXPORT_CHUNK_SIZE at a time, so memory stays flat
+        however many years are exported. progress(written, total) is called
+        after every chunk. Returns the number of sales written. Sales come
+        out oldest first, in the order of the sale_time indexes, so a
+        filtered export never sorts in a temp b-tree.
+        """
+        filters = filters or {}
+        months = (_month_of(filters.get('start_date')), _month_of(filters.get('end_date')))
+        where_sql, params = self.sales_where_clause(filters)
+        total = sum(row['total'] for row in self.query_partitions(
+            "SELECT COUNT(*) AS total FROM {schema}.sales s" + where_sql, params, *months))
+        query = """
+            SELECT
+                s.id AS sale_id, s.receipt_id, s.counter_id, s.cashier_id, s.cashier_name,
+                s.customer_name, s.total_amount, s.payment_method, s.sale_time,
+                i.product_id, i.product_name, i.quantity, i.unit_price, i.total_price
+            FROM {schema}.sales s
+            LEFT JOIN {schema}.sale_items i ON i.sale_id = s.id
+        """ + where_sql + " ORDER BY s.sale_time, s.id, i.id"
+        
+        cursor = self.conn.cursor()
+        columns = None
+        jsonl = is_jsonl_path(path)
+        written = 0
+        current = None
+        
+        with open_export_file(path) as f:
+            writer = None if jsonl else csv.writer(f)
+            # Oldest archive first, so sales come out in time order
+            for schemas in self.partition_groups(*months, group_size=1, newest_first=False):
+                cursor.execute(query.format(schema=schemas[0]), params)
+                if columns is None:
+                    columns = [col[0] for col in cursor.description]
+                    sale_columns, item_columns = columns[:9], columns[9:]
+                    if writer:
+                        writer.writerow(columns)
+                while True:
+                    rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                    if not rows:
+                        break
+                    for row in rows:
+                        if current is None or current['sale_id'] != row[0]:
+                            if jsonl and current is not None:
+                                f.write(json.dumps(current) + "\n")
+                            current = dict(zip(sale_columns, row[:9]))
+                            current['items'] = []
+                            written += 1
+                        if writer:
+                            writer.writerow(row)
+                        elif row[9] is not None:
+                            current['items'].append(dict(zip(item_columns, row[9:])))
+                    if progress:
+                        progress(written, total)
+                    
+            if jsonl and current is not None:
+                f.write(json.dumps(current) + "\n")
+                
+        return written
+
+    def release_connection(self):
+        """Close the calling worker thread's connection once it is done with the database"""
+        self.connections.release()
+
     def close(self):
-        """Close the database connection"""
-        self.conn.close()
\ No newline at end of file
+        """Close all database connections"""
+        if self.sale_writer is not None:
+            self.sale_writer.close()
+            self.sale_writer = None
+        self.connections.close_all()
\ No newline at end of file
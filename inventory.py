@@ -1,5 +1,9 @@
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
+from datetime import datetime
+from tkinter import ttk, messagebox, filedialog
+from database import DEFAULT_LOW_STOCK_THRESHOLD, iter_product_file
+from paging import TreePager
 
 class InventorySection:
     """Inventory management section of the application"""
@@ -10,6 +14,7 @@ class InventorySection:
         self.db = db 
         self.frame = None
         self.tree = None
+        self.pager = None
         self.search_entry = None
         self.filter_category = None
         self.filter_company = None
@@ -77,15 +82,11 @@ class InventorySection:
 
     def update_summary(self):
         """Update the inventory summary label with real data"""
-        products = self.db.get_products()
-        total_items = len(products)
-        total_value = sum(p['worth'] for p in products)
-        low_stock = sum(1 for p in products if p['status'] == "Low Stock")
-        out_of_stock = sum(1 for p in products if p['status'] == "Out of Stock")
+        summary = self.db.get_inventory_summary()
         
         self.summary_label.config(
-            text=f"Total: {total_items} items | Value: {total_value:,.2f} PKR | "
-                 f"Low Stock: {low_stock} | Out of Stock: {out_of_stock}"
+            text=f"Total: {summary['total_items']} items | Value: {summary['total_value']:,.2f} PKR | "
+                 f"Low Stock: {summary['low_stock']} | Out of Stock: {summary['out_of_stock']}"
         )
 
     def create_search_filter_card(self):
@@ -237,7 +238,9 @@ class InventorySection:
             ("➕ Add New Item", self.show_add_item_dialog),
             ("✏️ Edit Item", self.show_edit_item_dialog),
             ("🗑️ Delete Item", self.show_delete_item_dialog),
-            ("📦 Restock", self.show_restock_dialog)
+            ("📦 Restock", self.show_restock_dialog),
+            ("📥 Import", self.import_data),
+            ("📤 Export", self.export_data)
         ]
         
         for text, command in buttons:
@@ -269,7 +272,12 @@ class InventorySection:
             orient="vertical",
             command=self.tree.yview
         )
-        self.tree.configure(yscrollcommand=vsb.set)
+        self.pager = TreePager(
+            self.tree, vsb,
+            fetch_page=None,
+            key=self.db.product_page_key,
+            insert_row=self.insert_product_row
+        )
         
         self.tree.grid(row=0, column=0, sticky='nsew')
         vsb.grid(row=0, column=1, sticky='ns')
@@ -317,51 +325,38 @@ class InventorySection:
 
     def populate_sample_data(self):
         """Populate the table with data from database"""
-        # Clear existing data
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # First ensure all statuses are up to date
-        self.db.cursor.execute("""
-            UPDATE products 
-            SET status = CASE 
-                WHEN quantity <= 0 THEN 'Out of Stock'
-                WHEN quantity <= 10 THEN 'Low Stock'
-                ELSE 'In Stock'
-            END
-        """)
-        self.db.conn.commit()
-        
-        # Get products from database with current filters
+        # Load the first page of products with the current filters;
+        # further pages are fetched as the table is scrolled
         filters = self.get_current_filters()
-        products = self.db.get_products(filters)
-        
-        for product in products:
-            # Determine status emoji
-            if product['status'] == "Out of Stock":
-                status_emoji = "🔴"
-                status_tag = "out_of_stock"
-            elif product['status'] == "Low Stock":
-                status_emoji = "🟡"
-                status_tag = "low_stock"
-            else:
-                status_emoji = "🟢"
-                status_tag = "in_stock"
-            
-            self.tree.insert("", 'end', values=(
-                product['id'],
-                product['name'],
-                product['category'],
-                product['company'],
-                product['code'],
-                f"{product['trade_price']:,.2f}",
-                f"{product['mfg_price']:,.2f}",
-                product['quantity'],
-                f"{status_emoji} {product['status']}",
-                f"{product['worth']:,.2f}"
-            ), tags=(status_tag,))
+        self.pager.reset(lambda **page: self.db.get_products(filters, **page))
         
         self.update_summary()
+
+    def insert_product_row(self, product):
+        """Add one product to the inventory table"""
+        # Determine status emoji
+        if product['status'] == "Out of Stock":
+            status_emoji = "🔴"
+            status_tag = "out_of_stock"
+        elif product['status'] == "Low Stock":
+            status_emoji = "🟡"
+            status_tag = "low_stock"
+        else:
+            status_emoji = "🟢"
+            status_tag = "in_stock"
+        
+        self.tree.insert("", 'end', values=(
+            product['id'],
+            product['name'],
+            product['category'],
+            product['company'],
+            product['code'],
+            f"{product['trade_price']:,.2f}",
+            f"{product['mfg_price']:,.2f}",
+            product['quantity'],
+            f"{status_emoji} {product['status']}",
+            f"{product['worth']:,.2f}"
+        ), tags=(status_tag,))
     
     def get_current_filters(self):
         """Get current filter values from UI"""
@@ -432,7 +427,7 @@ class InventorySection:
     
     def show_add_item_dialog(self):
         """Show dialog for adding new item"""
-        dialog, container = self.create_dialog("Add New Item", 500, 450)
+        dialog, container = self.create_dialog("Add New Item", 500, 490)
         
         ttk.Label(container, 
                 text="Add New Inventory Item", 
@@ -453,6 +448,7 @@ class InventorySection:
             ("Trade Price (PKR)", "entry"),
             ("Mfg Price (PKR)", "entry"),
             ("Initial Quantity", "entry"),
+            ("Low Stock Threshold", "entry", str(DEFAULT_LOW_STOCK_THRESHOLD)),
         ]
         
         self.add_form_fields(container, fields)
@@ -491,6 +487,9 @@ class InventorySection:
         companies = list(self.db.get_all_companies())
         companies.sort()  # Sort alphabetically
         
+        product = self.db.get_product(item_data[0])
+        threshold = product['low_stock_threshold'] if product else DEFAULT_LOW_STOCK_THRESHOLD
+        
         fields = [
             ("Item Name", "entry", item_data[1]),
             ("Category", "combobox", categories, item_data[2]),  # Use database categories
@@ -498,6 +497,7 @@ class InventorySection:
             ("Item Code", "entry", item_data[4]),
             ("Trade Price (PKR)", "entry", item_data[5].replace(',', '')),
             ("Mfg Price (PKR)", "entry", item_data[6].replace(',', '')),
+            ("Low Stock Threshold", "entry", str(threshold)),
         ]
         
         self.add_form_fields(container, fields)
@@ -592,22 +592,9 @@ class InventorySection:
     # ======================
     def search_items(self, event=None):
         """Handle search functionality"""
-        query = self.search_entry.get().lower()
-        
-        if not query:
-            self.apply_filters()
-            return
-        
-        visible_items = 0
-        for item in self.tree.get_children():
-            values = [str(v).lower() for v in self.tree.item(item, 'values')]
-            if any(query in value for value in values):
-                self.tree.item(item, tags=(self.tree.item(item, 'tags')[0],))
-                self.tree.detach(item)
-                self.tree.reattach(item, '', 'end')
-                visible_items += 1
-            else:
-                self.tree.detach(item)
+        # The table only holds the pages loaded so far, so the search
+        # text goes to the database with the other filters
+        self.apply_filters()
 
     def add_form_fields(self, parent, fields):
         """Add form fields to a dialog"""
@@ -639,34 +626,14 @@ class InventorySection:
                 self.form_entries[field[0]] = combo
 
 
-    def update_product_status(self, product_id):
-        """Force update product status based on current quantity"""
-        query = """
-        UPDATE products 
-        SET status = CASE 
-            WHEN quantity <= 0 THEN 'Out of Stock'
-            WHEN quantity <= 10 THEN 'Low Stock'
-            ELSE 'In Stock'
-        END
-        WHERE id = ?
-        """
-        self.db.cursor.execute(query, (product_id,))
-        self.db.conn.commit()
-
     def add_item_action(self, dialog):
         """Handle add item action with database"""
         try:
             # Get data from form fields
             quantity = int(self.form_entries["Initial Quantity"].get())
+            threshold = int(self.form_entries["Low Stock Threshold"].get())
             
-            # Determine status based on quantity
-            if quantity <= 0:
-                status = "Out of Stock"
-            elif quantity <= 10:
-                status = "Low Stock"
-            else:
-                status = "In Stock"
-                
+            # Stock status is derived from quantity and threshold by the database
             product_data = {
                 'name': self.form_entries["Item Name"].get().strip(),
                 'category': self.form_entries["Category"].get().strip(),
@@ -675,7 +642,6 @@ class InventorySection:
                 'trade_price': float(self.form_entries["Trade Price (PKR)"].get()),
                 'mfg_price': float(self.form_entries["Mfg Price (PKR)"].get()),
                 'quantity': quantity,
-                'status': status,
                 'worth': float(self.form_entries["Trade Price (PKR)"].get()) * quantity
             }
             
@@ -685,6 +651,10 @@ class InventorySection:
             
             if product_data['quantity'] < 0:
                 raise ValueError("Quantity cannot be negative")
+            
+            if threshold < 0:
+                raise ValueError("Low stock threshold cannot be negative")
+            product_data['low_stock_threshold'] = threshold
                 
             if product_data['trade_price'] <= 0 or product_data['mfg_price'] <= 0:
                 raise ValueError("Prices must be positive values")
@@ -719,21 +689,14 @@ class InventorySection:
             if updates['trade_price'] <= 0 or updates['mfg_price'] <= 0:
                 raise ValueError("Prices must be positive values")
             
-            # Update in database
+            threshold = int(self.form_entries["Low Stock Threshold"].get())
+            if threshold < 0:
+                raise ValueError("Low stock threshold cannot be negative")
+            updates['low_stock_threshold'] = threshold
+            
+            # Update in database (status follows the new threshold via trigger)
             success = self.db.update_product(item_id, updates)
             if success:
-                # Force status update based on current quantity
-                self.db.cursor.execute("""
-                    UPDATE products 
-                    SET status = CASE 
-                        WHEN quantity <= 0 THEN 'Out of Stock'
-                        WHEN quantity <= 10 THEN 'Low Stock'
-                        ELSE 'In Stock'
-                    END
-                    WHERE id = ?
-                """, (item_id,))
-                self.db.conn.commit()
-                
                 self.populate_sample_data()
                 self.refresh_filters() 
                 dialog.destroy()
@@ -766,7 +729,6 @@ class InventorySection:
             
             success = self.db.restock_product(item_id, amount)
             if success:
-                self.update_product_status(item_id)
                 self.populate_sample_data()
                 self.refresh_filters() 
                 dialog.destroy()
@@ -778,9 +740,153 @@ class InventorySection:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to restock: {str(e)}")
         
+    def import_data(self):
+        """Import products from a CSV or JSONL file in the background"""
+        file_path = filedialog.askopenfilename(
+            title="Import Products",
+            filetypes=[("Product files", "*.csv *.jsonl"), ("CSV Files", "*.csv"), ("JSON Lines", "*.jsonl")]
+        )
+        if not file_path:
+            return
+        
+        result = {}
+        
+        def worker():
+            try:
+                result.update(self.db.add_products_bulk(iter_product_file(file_path)))
+            except Exception as e:
+                result.update({'success': False, 'error': str(e)})
+            finally:
+                self.db.release_connection()
+        
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.summary_label.config(text="Importing products...")
+        self.frame.after(200, lambda: self.finish_import(thread, result))
+
+    def finish_import(self, thread, result):
+        """Wait for an import to finish, then report and reload the table"""
+        if thread.is_alive():
+            self.frame.after(200, lambda: self.finish_import(thread, result))
+            return
+        
+        if not result.get('success'):
+            messagebox.showerror("Import", f"Import failed: {result.get('error')}")
+            self.update_summary()
+            return
+        
+        message = f"Imported {result['imported']:,} products."
+        if result['errors']:
+            shown = "\n".join(f"Row {row}: {error}" for row, error in result['errors'][:10])
+            message += f"\n\nSkipped {len(result['errors']):,} invalid rows:\n{shown}"
+            if len(result['errors']) > 10:
+                message += "\n..."
+        messagebox.showinfo("Import", message)
+        
+        self.populate_sample_data()
+        self.refresh_filters()
+
     def export_data(self):
-        """Handle export data action"""
-        messagebox.showinfo("Export", "Export data functionality")
+        """Show dialog for exporting products or sales to CSV / gzipped JSONL"""
+        dialog, container = self.create_dialog("Export Data", 450, 360)
+        
+        ttk.Label(container, 
+                text="Export Data", 
+                style="Inventory.Dialog.Title.TLabel").pack(pady=(0, 15))
+        
+        counters = self.app.counter_db.get_counters(active_only=False)
+        counter_choices = ["All Counters"] + [f"{c['id']} - {c['cashier_name']}" for c in counters]
+        
+        fields = [
+            ("Export", "combobox", ["Products", "Sales"], "Products"),
+            ("From (YYYY-MM-DD)", "entry"),
+            ("To (YYYY-MM-DD)", "entry"),
+            ("Counter", "combobox", counter_choices, "All Counters"),
+        ]
+        self.add_form_fields(container, fields)
+        
+        progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(container, variable=progress_var, maximum=100, mode='determinate').pack(fill='x', pady=(10, 0))
+        
+        btn_frame = ttk.Frame(container, style="Inventory.Dialog.ButtonFrame.TFrame")
+        btn_frame.pack(side='bottom', pady=(15, 0))
+        
+        ttk.Button(btn_frame, 
+                text="Cancel", 
+                style="Inventory.Dialog.Neutral.TButton",
+                command=dialog.destroy).pack(side='left', padx=5)
+        
+        ttk.Button(btn_frame, 
+                text="Export", 
+                style="Inventory.Dialog.Button.TButton",
+                command=lambda: self.export_action(dialog, progress_var)).pack(side='right', padx=5)
+
+    def export_action(self, dialog, progress_var):
+        """Validate export options and stream the export on a worker thread"""
+        try:
+            what = self.form_entries["Export"].get()
+            filters = {}
+            for field, key in (("From (YYYY-MM-DD)", 'start_date'), ("To (YYYY-MM-DD)", 'end_date')):
+                value = self.form_entries[field].get().strip()
+                if value:
+                    datetime.strptime(value, "%Y-%m-%d")
+                    filters[key] = value
+            counter = self.form_entries["Counter"].get()
+            if counter != "All Counters":
+                filters['counter_id'] = int(counter.split(" - ")[0])
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format", parent=dialog)
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            parent=dialog,
+            defaultextension=".csv",
+            filetypes=[("CSV Files", "*.csv"), ("Gzipped JSON Lines", "*.jsonl.gz")],
+            initialfile=f"{what.lower()}_{datetime.now().strftime('%Y%m%d')}.csv"
+        )
+        if not file_path:
+            return
+        
+        state = {'written': 0, 'total': 0}
+        
+        def progress(written, total):
+            state['written'] = written
+            state['total'] = total
+        
+        def worker():
+            try:
+                if what == "Sales":
+                    self.app.counter_db.export_sales(file_path, filters, progress)
+                else:
+                    self.db.export_products(file_path, progress)
+                state['success'] = True
+            except Exception as e:
+                state['error'] = str(e)
+            finally:
+                if what == "Sales":
+                    self.app.counter_db.release_connection()
+                else:
+                    self.db.release_connection()
+        
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.frame.after(100, lambda: self.poll_export(thread, state, dialog, progress_var, file_path))
+
+    def poll_export(self, thread, state, dialog, progress_var, file_path):
+        """Update the export progress bar until the worker finishes"""
+        if state['total']:
+            progress_var.set(100 * state['written'] / state['total'])
+        
+        if thread.is_alive():
+            self.frame.after(100, lambda: self.poll_export(thread, state, dialog, progress_var, file_path))
+            return
+        
+        if state.get('success'):
+            progress_var.set(100)
+            messagebox.showinfo("Export", f"Exported {state['written']:,} records to:\n{file_path}", parent=dialog)
+            dialog.destroy()
+        else:
+            messagebox.showerror("Export", f"Export failed: {state.get('error')}", parent=dialog)
 
     def show_claims(self):
         """Handle claims action"""
@@ -0,0 +1,54 @@
+class TreePager:
+    """Fill a Treeview one keyset page at a time as the user scrolls.
+
+    fetch_page(limit=..., after=...) returns a page of rows, key(row) gives
+    the `after` value for the next page and insert_row(row) adds one row to
+    the tree. The next page is requested when the view is scrolled near the
+    bottom, so large tables show their first rows immediately.
+    """
+
+    def __init__(self, tree, scrollbar, fetch_page, key, insert_row, page_size=200):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.key = key
+        self.insert_row = insert_row
+        self.page_size = page_size
+        self.after = None
+        self.exhausted = False
+        self.loading = False
+        self.loaded = 0
+        tree.configure(yscrollcommand=self.on_scroll)
+
+    def reset(self, fetch_page=None):
+        """Clear the tree and load the first page (optionally from a new source)"""
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self.tree.delete(*self.tree.get_children())
+        self.after = None
+        self.exhausted = False
+        self.loaded = 0
+        self.load_more()
+
+    def load_more(self):
+        """Append the next page of rows, if there is one"""
+        if self.exhausted or self.loading:
+            return
+        self.loading = True
+        try:
+            rows = self.fetch_page(limit=self.page_size, after=self.after)
+            for row in rows:
+                self.insert_row(row)
+            self.loaded += len(rows)
+            if len(rows) < self.page_size:
+                self.exhausted = True
+            else:
+                self.after = self.key(rows[-1])
+        finally:
+            self.loading = False
+
+    def on_scroll(self, first, last):
+        """yscrollcommand hook: update the scrollbar and fetch more near the end"""
+        self.scrollbar.set(first, last)
+        if not self.exhausted and float(last) > 0.9:
+            self.tree.after_idle(self.load_more)
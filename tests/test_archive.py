@@ -0,0 +1,97 @@
+"""Monthly sales archives: moving closed months out, and reading across the partitions."""
+import os
+from datetime import datetime
+
+import pytest
+
+from database import CounterDB
+
+THIS_MONTH = datetime.now().strftime("%Y-%m")
+CLOSED_MONTHS = ["2024-01", "2024-02", "2024-03"]
+
+
+def sale(counter, receipt_id, sale_time, product_id):
+    return {'receipt_id': receipt_id, 'counter_id': counter['id'], 'cashier_id': counter['cashier_id'],
+            'cashier_name': counter['cashier_name'], 'total_amount': 4.0 * product_id, 'sale_time': sale_time,
+            'items': [{'product_id': product_id, 'product_name': f"Product {product_id}", 'quantity': 2,
+                       'unit_price': 2.0 * product_id, 'total_price': 4.0 * product_id},
+                      {'product_id': 99, 'product_name': "Bag", 'quantity': 1,
+                       'unit_price': 0.0, 'total_price': 0.0}]}
+
+
+@pytest.fixture
+def counter_db(tmp_path):
+    db = CounterDB(str(tmp_path / "Counter.db"))
+    for cashier_id, name in ((1, "alice"), (2, "bob")):
+        db.add_counter(name, cashier_id, f"dev-{cashier_id}", "pw")
+    receipt = 0
+    for month in CLOSED_MONTHS + [THIS_MONTH]:
+        for counter in db.get_counters():
+            for day in (1, 15):
+                receipt += 1
+                assert db.record_sale(sale(counter, f"R{receipt}", f"{month}-{day:02d} 10:{receipt:02d}:00",
+                                           receipt % 5 + 1))['success']
+    yield db
+    db.close()
+
+
+READS = {
+    'all_sales': lambda db: db.get_all_sales(),
+    'all_sales.paged': lambda db: list(db.iter_all_sales(page_size=3)),
+    'history.range': lambda db: db.get_sales_history({'start_date': "2024-02-01", 'end_date': f"{THIS_MONTH}-28"}),
+    'history.cashier': lambda db: db.get_sales_history({'cashier_name': "bob"}),
+    'by_cashier.paged': lambda db: list(db.iter_sales_by_cashier("alice", page_size=2)),
+    'by_date': lambda db: db.get_sales_by_date("2024-03-15"),
+    'counter.paged': lambda db: list(db.iter_transactions_for_counter(1, page_size=4)),
+    'details': lambda db: [db.get_sale_details(sale_id) for sale_id in (1, 9, 17)],
+    'totals.day': lambda db: db.get_sales_totals("2024-01-01", f"{THIS_MONTH}-28"),
+    'totals.product': lambda db: db.get_sales_totals("2024-01-01", f"{THIS_MONTH}-28", group_by='product'),
+    'product_quantities': lambda db: db.get_product_quantities("2024-01-01", f"{THIS_MONTH}-28"),
+    'product_quantities.top': lambda db: db.get_product_quantities("2024-01-01", f"{THIS_MONTH}-28", limit=3),
+    'daily_summary': lambda db: db.get_daily_sales_summary("2024-01-01", f"{THIS_MONTH}-28"),
+}
+
+
+def test_reads_are_unchanged_by_archiving(counter_db):
+    before = {name: read(counter_db) for name, read in READS.items()}
+
+    result = counter_db.archive_closed_months()
+
+    assert result['success'] and result['months'] == CLOSED_MONTHS
+    for name, read in READS.items():
+        assert read(counter_db) == before[name], name
+    assert before['all_sales'] and len(before['all_sales']) == 16
+
+
+def test_archive_moves_closed_months_into_their_own_files(counter_db, tmp_path):
+    counter_db.archive_closed_months()
+
+    hot_months = counter_db.conn.execute("SELECT DISTINCT substr(sale_time, 1, 7) FROM sales").fetchall()
+    assert hot_months == [(THIS_MONTH,)]
+    partitions = counter_db.sales_partitions()
+    assert [month for month, _ in partitions] == CLOSED_MONTHS[::-1]
+    for month, file_name in partitions:
+        assert os.path.exists(os.path.join(str(tmp_path), os.path.basename(file_name)))
+    counts = dict(counter_db.conn.execute("SELECT month, sale_count FROM sales_partitions"))
+    assert counts == {month: 4 for month in CLOSED_MONTHS}
+
+
+def test_dry_run_and_reruns_change_nothing(counter_db):
+    preview = counter_db.archive_closed_months(dry_run=True)
+    assert preview['counts'] == {month: 4 for month in CLOSED_MONTHS}
+    assert counter_db.sales_partitions() == []
+
+    counter_db.archive_closed_months()
+    again = counter_db.archive_closed_months()
+    assert again['success'] and again['months'] == []
+    assert len(counter_db.get_all_sales()) == 16
+
+
+def test_export_reads_archives_oldest_first(counter_db, tmp_path):
+    counter_db.archive_closed_months()
+    path = str(tmp_path / "sales.jsonl")
+
+    assert counter_db.export_sales(path) == 16
+    with open(path, encoding='utf-8') as f:
+        times = [line.split('"sale_time": "')[1][:19] for line in f]
+    assert times == sorted(times)
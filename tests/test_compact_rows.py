@@ -0,0 +1,78 @@
+"""compact_rows: slotted Product / Sale / SaleItem rows behave like the dict rows."""
+import pytest
+
+from benchmarks.generate import generate_store
+from database import InventoryDB, CounterDB, Product, Sale
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    paths = generate_store(str(tmp_path_factory.mktemp("store")), products=200, counters=2, sales=300)
+    dbs = {compact: (InventoryDB(paths['inventory'], compact_rows=compact),
+                     CounterDB(paths['counter'], compact_rows=compact))
+           for compact in (False, True)}
+    yield dbs
+    for inventory, counters in dbs.values():
+        inventory.close()
+        counters.close()
+
+
+READS = {
+    'products': lambda inv, cdb: inv.get_products(),
+    'products.page': lambda inv, cdb: inv.get_products({'category': "Dairy"}, limit=5),
+    'products.search': lambda inv, cdb: inv.get_products({'search_query': "tea"}),
+    'product': lambda inv, cdb: [inv.get_product(3)],
+    'product.code': lambda inv, cdb: [inv.get_product_by_code("SKU0000007")],
+    'sales': lambda inv, cdb: cdb.get_all_sales(),
+    'sales_history': lambda inv, cdb: cdb.get_sales_history({'counter_id': 1}, limit=20),
+    'sale_items': lambda inv, cdb: cdb.get_sale_details(5)['items'],
+}
+
+
+@pytest.mark.parametrize("name", READS)
+def test_compact_rows_equal_the_dict_rows(store, name):
+    plain = READS[name](*store[False])
+    compact = READS[name](*store[True])
+
+    assert plain and len(compact) == len(plain)
+    for row, expected in zip(compact, plain):
+        assert not isinstance(row, dict)
+        assert row == expected
+        assert set(row.keys()) == set(expected.keys())
+        assert dict(row) == expected
+        assert row.to_dict() == expected
+
+
+def test_dict_style_access(store):
+    product = store[True][0].get_product(3)
+
+    assert isinstance(product, Product)
+    assert product['name'] == product.name
+    assert product.get('code') == product['code']
+    # rank is only set on search results
+    assert 'rank' not in product
+    assert product.get('rank', -1) == -1
+    with pytest.raises(KeyError):
+        product['rank']
+    with pytest.raises(KeyError):
+        product['no_such_column']
+    assert dict(product.items()) == product.to_dict()
+    assert len(product) == len(product.keys())
+
+
+def test_copies_are_independent(store):
+    product = store[True][0].get_product(3)
+    copy = product.copy()
+    copy['quantity'] = -1
+    copy['rank'] = 0.5
+
+    assert product['quantity'] != -1
+    assert 'rank' not in product and copy['rank'] == 0.5
+
+
+def test_sales_fill_only_the_selected_columns(store):
+    sale = store[True][1].get_all_sales(limit=1)[0]
+
+    assert isinstance(sale, Sale)
+    assert set(sale.keys()) <= set(Sale.__slots__)
+    assert set(sale.keys()) == set(store[False][1].get_all_sales(limit=1)[0].keys())
@@ -0,0 +1,33 @@
+"""ConnectionManager: per-thread connections and releasing them from workers."""
+import threading
+
+from database import InventoryDB
+
+
+def run_in_thread(fn):
+    thread = threading.Thread(target=fn)
+    thread.start()
+    thread.join()
+
+
+def test_release_closes_worker_connection_and_its_transaction(tmp_path):
+    db = InventoryDB(str(tmp_path / "inventory.db"))
+
+    def worker():
+        try:
+            db.conn.execute("BEGIN IMMEDIATE")
+            db.conn.execute("UPDATE products SET quantity = 1")
+            raise ValueError("worker failed mid-transaction")
+        except ValueError:
+            pass
+        finally:
+            db.release_connection()
+
+    for _ in range(3):
+        run_in_thread(worker)
+
+    # Only this thread's connection is left, and the workers' write lock is gone
+    assert db.connections.connections == [db.conn]
+    db.conn.execute("BEGIN IMMEDIATE")
+    db.conn.rollback()
+    db.close()
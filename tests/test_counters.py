@@ -0,0 +1,78 @@
+"""CounterDB: archiving vs deleting counters, and the daily summary rollup."""
+from datetime import datetime
+
+import pytest
+
+from database import CounterDB
+
+THIS_MONTH = datetime.now().strftime("%Y-%m")
+
+
+def sale(counter, receipt_id, sale_time, amount=10.0):
+    return {'receipt_id': receipt_id, 'counter_id': counter['id'], 'cashier_id': counter['cashier_id'],
+            'cashier_name': counter['cashier_name'], 'total_amount': amount, 'sale_time': sale_time,
+            'items': [{'product_id': 1, 'product_name': "Chips", 'quantity': 2,
+                       'unit_price': amount / 2, 'total_price': amount}]}
+
+
+@pytest.fixture
+def counter_db(tmp_path):
+    """Two counters, each with a sale in an archived month and one this month"""
+    db = CounterDB(str(tmp_path / "Counter.db"))
+    for cashier_id, name in ((1, "alice"), (2, "bob")):
+        db.add_counter(name, cashier_id, f"dev-{cashier_id}", "secret")
+    for counter in db.get_counters():
+        name = counter['cashier_name']
+        assert db.record_sale(sale(counter, f"{name}-old", "2024-01-15 10:00:00", 20.0))['success']
+        assert db.record_sale(sale(counter, f"{name}-new", f"{THIS_MONTH}-01 09:00:00"))['success']
+    assert db.archive_closed_months()['months'] == ["2024-01"]
+    yield db
+    db.close()
+
+
+def counter_named(db, name):
+    return next(c for c in db.get_counters(active_only=False) if c['cashier_name'] == name)
+
+
+def receipts(db, name):
+    return sorted(s['receipt_id'] for s in db.get_sales_history({'cashier_name': name}))
+
+
+def test_archive_keeps_sales_and_takes_counter_off_login(counter_db):
+    alice = counter_named(counter_db, "alice")
+
+    result = counter_db.delete_counter(alice['id'], mode='archive')
+
+    assert result == {'success': True, 'sales': 0}
+    assert counter_named(counter_db, "alice")['status'] == "archived"
+    assert counter_db.find_active_counter("alice") is None
+    assert receipts(counter_db, "alice") == ["alice-new", "alice-old"]
+    assert counter_db.get_daily_sales_summary("2024-01-01", "2024-01-31", counter_id=alice['id'])
+
+
+def test_delete_removes_hot_and_archived_sales_of_that_counter_only(counter_db):
+    alice = counter_named(counter_db, "alice")
+
+    result = counter_db.delete_counter(alice['id'], mode='delete')
+
+    assert result == {'success': True, 'sales': 2}
+    assert all(c['cashier_name'] != "alice" for c in counter_db.get_counters(active_only=False))
+    assert receipts(counter_db, "alice") == []
+    assert receipts(counter_db, "bob") == ["bob-new", "bob-old"]
+    assert counter_db.get_daily_sales_summary("2024-01-01", f"{THIS_MONTH}-28", counter_id=alice['id']) == []
+
+
+def test_unknown_delete_mode_is_rejected(counter_db):
+    with pytest.raises(ValueError):
+        counter_db.delete_counter(counter_named(counter_db, "bob")['id'], mode='purge')
+
+
+def test_daily_summary_matches_a_rebuild_from_the_sales(counter_db):
+    bob = counter_named(counter_db, "bob")
+    counter_db.record_sale(sale(bob, "bob-second", f"{THIS_MONTH}-01 17:30:00", 5.0))
+    recorded = counter_db.get_daily_sales_summary("2024-01-01", f"{THIS_MONTH}-28")
+
+    assert counter_db.rebuild_daily_summary()
+    assert counter_db.get_daily_sales_summary("2024-01-01", f"{THIS_MONTH}-28") == recorded
+    assert recorded == [{'sale_date': "2024-01-15", 'sale_count': 2, 'revenue': 40.0},
+                        {'sale_date': f"{THIS_MONTH}-01", 'sale_count': 3, 'revenue': 25.0}]
@@ -0,0 +1,65 @@
+"""Customers: backfill from past sales, and autocomplete by name or phone."""
+import pytest
+
+from database import CounterDB
+
+
+def sale(counter, receipt_id, customer_name, sale_time):
+    return {'receipt_id': receipt_id, 'counter_id': counter['id'], 'cashier_id': counter['cashier_id'],
+            'cashier_name': counter['cashier_name'], 'customer_name': customer_name, 'total_amount': 5.0,
+            'sale_time': sale_time, 'items': [{'product_id': 1, 'product_name': "Tea", 'quantity': 1,
+                                               'unit_price': 5.0, 'total_price': 5.0}]}
+
+
+def test_backfill_creates_one_customer_per_normalised_name(tmp_path):
+    path = str(tmp_path / "Counter.db")
+    db = CounterDB(path)
+    db.add_counter("alice", 1, "dev-1", "pw")
+    counter = db.get_counters()[0]
+    names = ["Bob  Smith", " Bob Smith ", "Bob\tSmith", "Alice", "", "Zara Khan"]
+    for i, name in enumerate(names):
+        assert db.record_sale(sale(counter, f"R{i}", name, f"2024-01-{i + 10} 12:00:00"))['success']
+    # Archived sales are read too
+    db.archive_closed_months()
+    # A store from before the customers table existed
+    db.conn.execute("DROP TABLE customers")
+    db.conn.commit()
+    db.close()
+
+    db = CounterDB(path)
+    rows = db.conn.execute("SELECT name FROM customers ORDER BY name").fetchall()
+    assert [name for (name,) in rows] == ["Alice", "Bob Smith", "Zara Khan"]
+    assert [c['name'] for c in db.find_customers(name="bob   SMITH")] == ["Bob Smith"]
+    db.close()
+
+
+@pytest.fixture
+def customers(tmp_path):
+    db = CounterDB(str(tmp_path / "Counter.db"))
+    db.add_customer("Bob Smith", phone="0300-123 4567")
+    db.add_customer("Bobby  Tables", phone="0311 7654321")
+    db.add_customer("Alice Jones")
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize("loaded", [False, True])
+def test_suggestions_match_name_and_phone_prefixes(customers, loaded):
+    if loaded:
+        customers.load_customer_index()
+    names = lambda text: [c['name'] for c in customers.suggest_customers(text)]
+
+    assert names("bob") == ["Bob Smith", "Bobby Tables"]
+    assert names("  BOBBY ") == ["Bobby Tables"]
+    assert names("0300 12") == ["Bob Smith"]
+    assert names("03") == ["Bob Smith", "Bobby Tables"]
+    assert names("carol") == []
+    assert names("   ") == []
+
+
+def test_customers_added_after_loading_are_suggested(customers):
+    customers.load_customer_index()
+    customers.add_customer("Bobbie Lee", phone="0345 0000000")
+
+    assert [c['name'] for c in customers.suggest_customers("bobbi")] == ["Bobbie Lee"]
+    assert [c['name'] for c in customers.suggest_customers("0345")] == ["Bobbie Lee"]
@@ -0,0 +1,85 @@
+"""ProductSearchIndex: matches against a LIKE-style oracle, and keeping the index current."""
+import sqlite3
+
+import pytest
+
+from benchmarks.generate import product_rows
+from database import InventoryDB, ProductSearchIndex, search_tokens
+
+QUERIES = ["crunchy chips 12", "chips 1", "organic 2", "nova 1", "fresh milk", "zen co 5",
+           "sku00001", "sku 7", "tea 12", "s 1", "co 3", "c"]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Small caps, so common words such as "1" or "c" take the unexpanded path
+    monkeypatch.setattr(ProductSearchIndex, 'PREFIX_WORDS', 20)
+    monkeypatch.setattr(ProductSearchIndex, 'PREFIX_CODES', 20)
+    db = InventoryDB(str(tmp_path / "inventory.db"), fuzzy_search=True)
+    db.add_products_bulk(product_rows(3000))
+    db.build_search_index()
+    yield db
+    db.close()
+
+
+def oracle(db, query):
+    """Products where every query word starts one of their words or their code"""
+    tokens = search_tokens(query)
+    matches = set()
+    for product_id, name, company, category, code in db.conn.execute(
+            "SELECT id, name, company, category, code FROM products"):
+        words = search_tokens(f"{name} {company} {category}")
+        if all(code.casefold().startswith(token) or any(word.startswith(token) for word in words)
+               for token in tokens):
+            matches.add(product_id)
+    return matches
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_finds_every_prefix_match(db, query):
+    found = {product['id'] for product in db.get_products({'search_query': query})}
+    expected = oracle(db, query)
+
+    assert expected
+    assert expected <= found
+    # Words under four letters are not matched fuzzily, so nothing else may appear
+    if all(len(token) < 4 for token in search_tokens(query)):
+        assert found == expected
+
+
+def test_paging_through_a_broad_query_returns_each_match_once(db):
+    pages, after = [], None
+    while True:
+        page = db.get_products({'search_query': "chips 1"}, limit=25, after=after)
+        if not page:
+            break
+        pages.extend(product['id'] for product in page)
+        after = db.product_page_key(page[-1])
+
+    assert len(pages) == len(set(pages))
+    assert set(pages) == oracle(db, "chips 1")
+
+
+def test_changes_from_another_terminal_are_applied_in_place(db):
+    index = db.search_index
+    other = sqlite3.connect(db.connections.db_name)
+    other.execute("UPDATE products SET name = 'Zesty Lemonade 1' WHERE code = 'SKU0000001'")
+    other.execute("DELETE FROM products WHERE code = 'SKU0000002'")
+    other.commit()
+    other.close()
+
+    assert [p['code'] for p in db.get_products({'search_query': "zesty lemonade"})] == ["SKU0000001"]
+    assert db.get_products({'search_query': "sku0000002"}) == []
+    assert db.search_index is index
+
+
+def test_searches_use_full_text_until_the_index_is_built(tmp_path):
+    db = InventoryDB(str(tmp_path / "inventory.db"), fuzzy_search=True)
+    db.add_products_bulk(product_rows(50))
+
+    first = db.get_products({'search_query': "sku000001"})
+    db.search_build.join()
+
+    assert db.search_index.loaded
+    assert {p['code'] for p in first} == {p['code'] for p in db.get_products({'search_query': "sku000001"})}
+    db.close()
@@ -0,0 +1,62 @@
+"""add_products_bulk: per-row errors and rolling back failed imports."""
+import json
+
+import pytest
+
+from database import InventoryDB, iter_product_file
+
+
+def product(code, **fields):
+    row = {'name': f"Product {code}", 'category': "Snacks", 'company': "Acme", 'code': code,
+           'trade_price': 2.5, 'mfg_price': 2.0, 'quantity': 10}
+    row.update(fields)
+    return row
+
+
+def test_malformed_lines_are_reported_and_the_rest_imported(tmp_path):
+    path = tmp_path / "products.jsonl"
+    lines = [json.dumps(product("P1")).encode(), json.dumps(product("P2")).encode(),
+             b'{"name": "Broken", "code": ', b'\xff\xfe not utf-8',
+             json.dumps(product("P3", quantity=-1)).encode(), b'[1, 2]',
+             json.dumps(product("P4")).encode(), json.dumps(product("P5")).encode()]
+    path.write_bytes(b"\n".join(lines) + b"\n")
+    db = InventoryDB(str(tmp_path / "inventory.db"))
+
+    result = db.add_products_bulk(iter_product_file(str(path)), batch_size=2)
+
+    assert result['success']
+    assert result['imported'] == 4
+    assert [number for number, _ in result['errors']] == [3, 4, 5, 6]
+    assert "Invalid JSON line" in result['errors'][0][1]
+    assert sorted(p['code'] for p in db.get_products()) == ["P1", "P2", "P4", "P5"]
+    db.close()
+
+
+def test_undecodable_csv_row_is_reported(tmp_path):
+    path = tmp_path / "products.csv"
+    header = "name,category,company,code,trade_price,mfg_price,quantity\n"
+    path.write_bytes(header.encode() + b"Chips,Snacks,Acme,C1,2.5,2,10\n"
+                     + b"Cr\xe8me,Dairy,Acme,C2,3,2,5\n" + b"Cola,Drinks,Acme,C3,1.5,1,20\n")
+    db = InventoryDB(str(tmp_path / "inventory.db"))
+
+    result = db.add_products_bulk(iter_product_file(str(path)))
+
+    assert result['imported'] == 2
+    assert [number for number, _ in result['errors']] == [2]
+    db.close()
+
+
+def test_unexpected_error_rolls_back_the_import(tmp_path):
+    db = InventoryDB(str(tmp_path / "inventory.db"))
+
+    def rows():
+        for code in ("P1", "P2", "P3"):
+            yield product(code)
+        raise RuntimeError("reader failed")
+
+    with pytest.raises(RuntimeError):
+        db.add_products_bulk(rows(), batch_size=2)
+
+    assert not db.conn.in_transaction
+    assert db.get_products() == []
+    db.close()
@@ -0,0 +1,51 @@
+"""Counter passwords: PBKDF2 hashes, and logging in to counters from before hashing."""
+from database import CounterDB, hash_password, is_password_hash, verify_password
+
+
+def test_verify_password_accepts_only_the_hashed_password():
+    stored = hash_password("s3cret", iterations=1000)
+
+    assert is_password_hash(stored)
+    assert verify_password("s3cret", stored)
+    assert not verify_password("S3cret", stored)
+    assert not verify_password("s3cret", "s3cret")
+    assert not verify_password("s3cret", None)
+    assert not verify_password("s3cret", stored.rsplit('$', 1)[0] + "$zz")
+    # Salted: the same password never hashes to the same value twice
+    assert hash_password("s3cret", iterations=1000) != stored
+
+
+def test_plaintext_counter_is_rehashed_on_its_first_login(tmp_path):
+    path = str(tmp_path / "Counter.db")
+    db = CounterDB(path)
+    # A counter written before passwords were hashed
+    db.conn.execute("INSERT INTO counters (cashier_name, cashier_id, device_id, password, status)"
+                    " VALUES ('alice', 1, 'dev-1', 'legacy-pass', 'active')")
+    db.conn.commit()
+    db.close()
+
+    db = CounterDB(path)
+    stored = lambda: db.conn.execute("SELECT password FROM counters WHERE cashier_name = 'alice'").fetchone()[0]
+    # Opening the store leaves it alone; nothing is hashed at startup
+    assert stored() == "legacy-pass"
+
+    assert db.authenticate("alice", "wrong") is None
+    assert stored() == "legacy-pass"
+
+    counter = db.authenticate("ALICE", "legacy-pass")
+    assert counter['cashier_name'] == "alice"
+    assert is_password_hash(stored())
+    assert verify_password("legacy-pass", stored())
+    assert db.authenticate("alice", "legacy-pass")['id'] == counter['id']
+    db.close()
+
+
+def test_authenticate_rejects_unknown_and_inactive_counters(tmp_path):
+    db = CounterDB(str(tmp_path / "Counter.db"))
+    counter_id = db.add_counter("bob", 2, "dev-2", "pw")
+
+    assert db.authenticate("bob", "pw")['id'] == counter_id
+    assert db.authenticate("nobody", "pw") is None
+    db.update_counter(counter_id, {'status': 'inactive'})
+    assert db.authenticate("bob", "pw") is None
+    db.close()
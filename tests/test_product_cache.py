@@ -0,0 +1,61 @@
+"""ProductCache: catching up with writes from other connections via products_log."""
+import sqlite3
+
+import pytest
+
+from database import InventoryDB
+
+
+def product(code, quantity=10):
+    return {'name': f"Product {code}", 'category': "Snacks", 'company': "Acme", 'code': code,
+            'trade_price': 2.5, 'mfg_price': 2.0, 'quantity': quantity}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    db = InventoryDB(path, use_cache=True)
+    db.add_products_bulk([product(f"P{i}") for i in range(20)])
+    db.get_products()
+    other = sqlite3.connect(path)
+    yield db, other
+    other.close()
+    db.close()
+
+
+def test_remote_writes_are_applied_without_a_full_reload(store):
+    db, other = store
+    untouched = db.cache.get_by_code("P5")
+    other.execute("UPDATE products SET quantity = 0 WHERE code = 'P1'")
+    other.execute("DELETE FROM products WHERE code = 'P2'")
+    other.execute("INSERT INTO products (name, category, company, code, trade_price, mfg_price, quantity, status)"
+                  " VALUES ('New', 'Snacks', 'Acme', 'NEW', 1, 1, 3, 'In Stock')")
+    other.commit()
+
+    assert db.get_product_by_code("P1")['status'] == "Out of Stock"
+    assert db.get_product_by_code("P2") is None
+    assert db.get_product_by_code("NEW")['status'] == "Low Stock"
+    # Unchanged products are the same cached objects, so nothing else was re-read
+    assert db.cache.get_by_code("P5") is untouched
+    assert len(db.get_products()) == 20
+
+
+def test_cache_reloads_when_the_log_was_pruned_past_it(store):
+    db, other = store
+    other.execute("UPDATE products SET quantity = 0 WHERE code = 'P1'")
+    other.execute("DELETE FROM products_log")
+    other.commit()
+
+    assert db.get_product_by_code("P1")['status'] == "Out of Stock"
+    assert db.cache.log_seq == db.product_log_seq()
+
+
+def test_log_is_pruned_by_trigger(tmp_path, monkeypatch):
+    monkeypatch.setattr(InventoryDB, 'PRODUCT_LOG_KEEP', 100)
+    db = InventoryDB(str(tmp_path / "inventory.db"))
+    db.add_products_bulk([product(f"P{i}") for i in range(2500)])
+
+    # Pruned at seq 1000 and 2000, each time keeping the newest 100 entries
+    first, last = db.conn.execute("SELECT MIN(seq), MAX(seq) FROM products_log").fetchone()
+    assert (first, last) == (1901, 2500)
+    db.close()
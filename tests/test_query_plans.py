@@ -0,0 +1,97 @@
+"""EXPLAIN QUERY PLAN guards for the hot lookups: none may scan products, sales or sale_items."""
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.generate import generate_store
+from database import InventoryDB, CounterDB
+
+# A full pass over one of the big tables; SEARCH lines and the small catalog tables are fine
+FULL_SCAN = re.compile(r"^SCAN (main\.)?(products|sales|sale_items|s|i)\b")
+
+
+def day(days_ago: int) -> str:
+    return (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+
+
+# Filtered reads behind the sales history, POS history panel, dashboard and checkout.
+# Unfiltered pages (get_all_sales(limit=...)) walk the sale_time index under a LIMIT by design.
+HOT_QUERIES = {
+    'sales_history.date_range': lambda inv, cdb, c: cdb.get_sales_history(
+        {'start_date': day(7), 'end_date': day(0)}),
+    'sales_history.cashier': lambda inv, cdb, c: cdb.get_sales_history(
+        {'cashier_name': c['cashier_name']}, limit=200),
+    'sales_by_date': lambda inv, cdb, c: cdb.get_sales_by_date(day(3)),
+    'sales_by_date_and_cashier': lambda inv, cdb, c: cdb.get_sales_by_date_and_cashier(
+        day(3), c['cashier_name']),
+    'sales_by_cashier': lambda inv, cdb, c: cdb.get_sales_by_cashier(c['cashier_name'], limit=200),
+    'transactions_for_counter': lambda inv, cdb, c: cdb.get_transactions_for_counter(c['id'], limit=200),
+    'sale_details': lambda inv, cdb, c: cdb.get_sale_details(5),
+    'daily_summary': lambda inv, cdb, c: cdb.get_daily_sales_summary(day(30), day(0)),
+    'counter_summary': lambda inv, cdb, c: cdb.get_counter_sales_summary(day(30), day(0)),
+    'sales_totals.hour': lambda inv, cdb, c: cdb.get_sales_totals(
+        day(30), day(0), group_by='hour', cashier_name=c['cashier_name']),
+    'product_quantities': lambda inv, cdb, c: cdb.get_product_quantities(
+        day(30), day(0), cashier_name=c['cashier_name'], limit=10),
+    'find_active_counter': lambda inv, cdb, c: cdb.find_active_counter(c['cashier_name']),
+    'product.id': lambda inv, cdb, c: inv.get_product(5),
+    'product.code': lambda inv, cdb, c: inv.get_product_by_code('SKU00005'),
+    'products.status': lambda inv, cdb, c: inv.get_products({'status': 'Low Stock'}),
+}
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    paths = generate_store(str(tmp_path_factory.mktemp("store")), products=300, counters=3, sales=2000)
+    inventory = InventoryDB(paths['inventory'])
+    counters = CounterDB(paths['counter'])
+    yield inventory, counters, counters.get_counters()[0]
+    inventory.close()
+    counters.close()
+
+
+def query_plans(db, call) -> dict:
+    """Run call() and return {sql: plan lines} for every SELECT it executed on db"""
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.conn.set_trace_callback(None)
+    return {sql: [row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            for sql in dict.fromkeys(statements)
+            if sql.lstrip().upper().startswith(('SELECT', 'WITH'))}
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_an_index(store, name):
+    inventory, counters, counter = store
+    db = inventory if name.startswith('product.') or name.startswith('products.') else counters
+    plans = query_plans(db, lambda: HOT_QUERIES[name](inventory, counters, counter))
+    assert plans, f"{name} ran no SELECT"
+    for sql, plan in plans.items():
+        scans = [line for line in plan if FULL_SCAN.match(line)]
+        assert not scans, f"{name} scans a table: {scans}\n{sql}"
+
+
+EXPORT_FILTERS = {
+    'none': {},
+    'date_range': {'start_date': day(30), 'end_date': day(0)},
+    'counter': {'counter_id': 1},
+    'cashier_and_dates': {'cashier_name': "cashier", 'start_date': day(30), 'end_date': day(0)},
+}
+
+
+@pytest.mark.parametrize("name", EXPORT_FILTERS)
+def test_export_streams_in_index_order(store, tmp_path, name):
+    inventory, counters, counter = store
+    filters = dict(EXPORT_FILTERS[name])
+    if 'cashier_name' in filters:
+        filters['cashier_name'] = counter['cashier_name']
+    plans = query_plans(counters, lambda: counters.export_sales(str(tmp_path / "sales.csv"), filters))
+    exports = {sql: plan for sql, plan in plans.items() if "ORDER BY" in sql}
+    assert exports, "export ran no ordered SELECT"
+    for sql, plan in exports.items():
+        # A sort would hold the whole export in memory (temp_store is MEMORY)
+        assert not [line for line in plan if "TEMP B-TREE" in line], f"{name} sorts: {plan}\n{sql}"
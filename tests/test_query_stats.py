@@ -0,0 +1,38 @@
+"""QueryStats: per-method timings, with SQL capture only when turned on."""
+from database import InventoryDB, QueryStats
+
+
+def product(code):
+    return {'name': f"Product {code}", 'category': "Snacks", 'company': "Acme", 'code': code,
+            'trade_price': 2.5, 'mfg_price': 2.0, 'quantity': 10}
+
+
+def test_calls_are_timed_without_tracing_sql_by_default(tmp_path):
+    stats = QueryStats(slow_ms=0)
+    db = InventoryDB(str(tmp_path / "inventory.db"), stats=stats)
+
+    db.add_products_bulk([product(f"P{i}") for i in range(100)])
+
+    entry = stats.snapshot()['methods']['InventoryDB.add_products_bulk']
+    assert (entry['calls'], entry['statements']) == (1, 0)
+    assert stats.slow_queries[-1]['statements'] == []
+    db.close()
+
+
+def test_capture_can_be_switched_on_and_off_for_open_connections(tmp_path):
+    stats = QueryStats(slow_ms=0)
+    db = InventoryDB(str(tmp_path / "inventory.db"), stats=stats)
+    db.add_product(product("P1"))
+
+    stats.set_capture_sql(True)
+    db.get_products({'search_query': "Secret Name"})
+    logged = stats.slow_queries[-1]
+    assert logged['statement_count'] > 0
+    assert all("Secret" not in statement['sql'] for statement in logged['statements'])
+    assert any(statement['plan'] for statement in logged['statements'])
+
+    stats.set_capture_sql(False)
+    stats.reset()
+    db.get_products({'search_query': "Secret Name"})
+    assert stats.snapshot()['methods']['InventoryDB.get_products']['statements'] == 0
+    db.close()
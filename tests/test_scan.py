@@ -0,0 +1,32 @@
+"""Barcode scans: code lookups stay fast after other terminals commit."""
+import sqlite3
+import time
+
+from database import InventoryDB
+
+PRODUCTS = 20000
+
+
+def test_scan_after_another_terminal_sold_is_fast_and_current(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    db = InventoryDB(path, use_cache=True)
+    db.add_products_bulk({'name': f"Product {i}", 'category': "Snacks", 'company': "Acme",
+                          'code': f"890{i:07d}", 'trade_price': 2.5, 'mfg_price': 2.0, 'quantity': 500}
+                         for i in range(PRODUCTS))
+    db.get_product_by_code("8900000000")
+    till = sqlite3.connect(path)
+
+    timings = []
+    for sale in range(1, 21):
+        # Another till sells one of the scanned product, then this till scans it
+        till.execute("UPDATE products SET quantity = quantity - 1 WHERE code = '8900000042'")
+        till.commit()
+        start = time.perf_counter()
+        product = db.get_product_by_code("8900000042")
+        timings.append(time.perf_counter() - start)
+        assert product['quantity'] == 500 - sale
+
+    till.close()
+    db.close()
+    # A full catalog reload takes tens of milliseconds at this size
+    assert sorted(timings)[len(timings) // 2] < 0.002
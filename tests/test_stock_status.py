@@ -0,0 +1,84 @@
+"""Stock status: derived by triggers from quantity and each product's low-stock threshold."""
+import sqlite3
+
+import pytest
+
+from database import InventoryDB, DEFAULT_LOW_STOCK_THRESHOLD
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = InventoryDB(str(tmp_path / "inventory.db"), use_cache=True)
+    yield db
+    db.close()
+
+
+def add(db, code, quantity, threshold=None):
+    product = {'name': f"Product {code}", 'category': "Snacks", 'company': "Acme", 'code': code,
+               'trade_price': 2.5, 'mfg_price': 2.0, 'quantity': quantity}
+    if threshold is not None:
+        product['low_stock_threshold'] = threshold
+    return db.add_product(product)
+
+
+def status(db, product_id):
+    return db.conn.execute("SELECT status FROM products WHERE id = ?", (product_id,)).fetchone()[0]
+
+
+@pytest.mark.parametrize("quantity, threshold, expected", [
+    (0, None, "Out of Stock"),
+    (DEFAULT_LOW_STOCK_THRESHOLD, None, "Low Stock"),
+    (DEFAULT_LOW_STOCK_THRESHOLD + 1, None, "In Stock"),
+    (25, 30, "Low Stock"),
+    (31, 30, "In Stock"),
+    (1, 0, "In Stock"),
+    (0, 0, "Out of Stock"),
+])
+def test_status_on_insert_follows_the_threshold(db, quantity, threshold, expected):
+    assert status(db, add(db, "P1", quantity, threshold)) == expected
+
+
+def test_stock_movements_move_the_status(db):
+    product_id = add(db, "P1", 12, threshold=5)
+
+    assert db.update_product_quantity(product_id, -7)
+    assert status(db, product_id) == "Low Stock"
+    assert db.update_product_quantity(product_id, -5)
+    assert status(db, product_id) == "Out of Stock"
+    # Never below zero: the sale is refused and nothing changes
+    assert not db.update_product_quantity(product_id, -1)
+    assert db.restock_product(product_id, 6)
+    assert status(db, product_id) == "In Stock"
+    # The cache sees the trigger's status too
+    assert db.get_product(product_id)['status'] == "In Stock"
+
+
+def test_changing_the_threshold_updates_the_status(db):
+    product_id = add(db, "P1", 15, threshold=10)
+    db.update_product(product_id, {'low_stock_threshold': 20})
+
+    assert status(db, product_id) == "Low Stock"
+
+
+def test_direct_writes_to_status_are_corrected(db):
+    product_id = add(db, "P1", 0)
+    db.conn.execute("UPDATE products SET status = 'In Stock' WHERE id = ?", (product_id,))
+    db.conn.commit()
+
+    assert status(db, product_id) == "Out of Stock"
+
+
+def test_rows_written_without_the_triggers_are_repaired_at_startup(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    InventoryDB(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TRIGGER products_status_insert")
+    conn.execute("INSERT INTO products (name, category, company, code, trade_price, mfg_price, quantity, status)"
+                 " VALUES ('Old', 'Snacks', 'Acme', 'OLD', 1, 1, 3, 'In Stock')")
+    conn.commit()
+    conn.close()
+
+    db = InventoryDB(path)
+    assert db.get_product_by_code("OLD")['status'] == "Low Stock"
+    assert db.refresh_product_status() == 0
+    db.close()